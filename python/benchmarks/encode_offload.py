@@ -0,0 +1,81 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT license.
+
+"""
+大消息序列化对事件循环延迟的影响
+
+对同一条大 input_audio_buffer.append（base64 编码 + JSON 序列化）分别在事件循环上、
+线程池和进程池中编码，用 LoopLagMonitor 记录期间事件循环的最大延迟，
+同时确认小消息走内联路径。
+
+用法:
+    python benchmarks/encode_offload.py --size-mb 8 --repeat 5
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from rtclient import RTLowLevelClient
+from rtclient.fast_messages import audio_append
+from rtclient.loop_monitor import LoopLagMonitor
+
+
+def encode_recording(raw: bytes) -> str:
+    """base64 编码并序列化整段录音，可以在工作进程中执行"""
+    return audio_append(base64.b64encode(raw).decode("utf-8")).model_dump_json()
+
+
+async def measure(name: str, work, repeat: int):
+    monitor = LoopLagMonitor(interval=0.001, stall_threshold=0.01)
+    async with monitor:
+        await asyncio.sleep(0.05)
+        for _ in range(repeat):
+            await work()
+            await asyncio.sleep(0.01)
+    stats = monitor.stats()
+    print(f"{name:<24} 最大延迟 {stats['max_ms']:7.1f} ms  p99 {stats['p99_ms']:6.1f} ms  卡顿 {stats['stalls']}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="大消息序列化对事件循环延迟的影响")
+    parser.add_argument("--size-mb", type=float, default=8, help="录音大小（MB）")
+    parser.add_argument("--repeat", type=int, default=5, help="每种方式的编码次数")
+    args = parser.parse_args()
+
+    raw = os.urandom(int(args.size_mb * 1024 * 1024))
+    message = audio_append(base64.b64encode(raw).decode("utf-8"))
+    loop = asyncio.get_running_loop()
+    thread_pool = ThreadPoolExecutor(2)
+    process_pool = ProcessPoolExecutor(1)
+    await loop.run_in_executor(process_pool, len, b"")  # 预先启动工作进程
+
+    threshold = 256 * 1024
+    inline = RTLowLevelClient("ws://unused", offload_threshold=None)
+    threaded = RTLowLevelClient("ws://unused", offload_threshold=threshold, encode_executor=thread_pool)
+    multiprocess = RTLowLevelClient("ws://unused", offload_threshold=threshold, encode_executor=process_pool)
+
+    async def encode_inline():
+        encode_recording(raw)
+
+    print(f"消息大小 {len(message.audio) / 1024 / 1024:.1f} MB (base64)")
+    await measure("事件循环上序列化", lambda: inline.encode(message), args.repeat)
+    await measure("线程池序列化", lambda: threaded.encode(message), args.repeat)
+    await measure("进程池序列化", lambda: multiprocess.encode(message), args.repeat)
+    await measure("事件循环上 base64+序列化", encode_inline, args.repeat)
+    await measure(
+        "进程池 base64+序列化", lambda: loop.run_in_executor(process_pool, encode_recording, raw), args.repeat
+    )
+    await threaded.encode(audio_append("AAAA"))
+    print(f"小消息走线程池的次数: {threaded.offloaded_messages - args.repeat}")
+
+    for client in (inline, threaded, multiprocess):
+        await client.close()
+    thread_pool.shutdown()
+    process_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
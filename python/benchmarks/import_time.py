@@ -0,0 +1,70 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT license.
+
+"""
+rtclient 冷启动导入耗时基准
+
+每个目标在全新的子进程中用 `python -X importtime` 导入若干次，取中位数，
+并列出累计耗时最高的模块，用于跟踪 import 开销的变化。
+
+用法:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --top 15 rtclient rtclient.models
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+DEFAULT_TARGETS = [
+    "rtclient",
+    "rtclient.models",
+    "rtclient.low_level_client",
+    "rtclient.video",
+]
+
+
+def import_time(statement: str) -> dict[str, int]:
+    """在子进程中执行导入语句，返回每个模块的累计导入耗时（微秒）"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # 格式: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        cumulative[name] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rtclient 导入耗时基准")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="要导入的模块")
+    parser.add_argument("--repeat", type=int, default=5, help="每个目标的重复次数")
+    parser.add_argument("--top", type=int, default=10, help="列出累计耗时最高的模块数")
+    args = parser.parse_args()
+
+    # 预热一次，让 .pyc 生成好，避免首次编译计入结果
+    import_time("import " + ", ".join(args.targets))
+
+    for target in args.targets:
+        runs = [import_time(f"import {target}") for _ in range(args.repeat)]
+        total = statistics.median(run.get(target, 0) for run in runs)
+        print(f"{target}: {total / 1000:.1f} ms (中位数, {args.repeat} 次)")
+        modules = {name: statistics.median(run.get(name, 0) for run in runs) for name in runs[0]}
+        heaviest = sorted(
+            (item for item in modules.items() if item[0] != target), key=lambda item: item[1], reverse=True
+        )
+        for name, us in heaviest[: args.top]:
+            print(f"    {us / 1000:8.1f} ms  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
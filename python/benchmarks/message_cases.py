@@ -0,0 +1,59 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT license.
+
+"""
+校验构造与 rtclient.fast_messages 免校验构造的对照用例
+
+benchmarks/message_construction.py 用来计时，tests/test_fast_messages.py 用来核对两者的
+序列化结果逐字节一致（pytest 通过 pythonpath 配置导入本模块）。
+"""
+
+import base64
+import os
+from collections.abc import Callable
+from typing import Any
+
+from rtclient import fast_messages
+from rtclient.models import (
+    InputAudioBufferAppendMessage,
+    InputAudioBufferClearMessage,
+    InputAudioBufferCommitMessage,
+    InputVideoFrameAppendMessage,
+    ResponseCancelMessage,
+    ResponseCreateMessage,
+    ResponseCreateParams,
+)
+
+
+def build_cases(audio_bytes: int = 3200, frame_bytes: int = 30 * 1024) -> dict[str, tuple[Callable[[], Any], ...]]:
+    """用例名 -> (校验构造, 免校验构造)
+
+    Args:
+        audio_bytes: 音频原始字节数，默认为 100ms 16kHz 16bit 单声道
+        frame_bytes: 视频帧原始字节数
+    """
+    audio = base64.b64encode(os.urandom(audio_bytes)).decode("utf-8")
+    frame = base64.b64encode(os.urandom(frame_bytes)).decode("utf-8")
+    params = ResponseCreateParams(commit=False, cancel_previous=False)
+    return {
+        "audio_append": (
+            lambda: InputAudioBufferAppendMessage(audio=audio),
+            lambda: fast_messages.audio_append(audio),
+        ),
+        "audio_append+ts": (
+            lambda: InputAudioBufferAppendMessage(audio=audio, event_id="evt_1", client_timestamp=1700000000000),
+            lambda: fast_messages.audio_append(audio, event_id="evt_1", client_timestamp=1700000000000),
+        ),
+        "video_frame_append": (
+            lambda: InputVideoFrameAppendMessage(video_frame=frame),
+            lambda: fast_messages.video_frame_append(frame),
+        ),
+        "audio_commit": (InputAudioBufferCommitMessage, fast_messages.audio_commit),
+        "audio_clear": (InputAudioBufferClearMessage, fast_messages.audio_clear),
+        "response_create": (ResponseCreateMessage, fast_messages.response_create),
+        "response_create+params": (
+            lambda: ResponseCreateMessage(response=params),
+            lambda: fast_messages.response_create(params),
+        ),
+        "response_cancel": (ResponseCancelMessage, fast_messages.response_cancel),
+    }
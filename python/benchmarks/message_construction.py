@@ -0,0 +1,43 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT license.
+
+"""
+客户端消息构造基准：pydantic 校验构造 vs rtclient.fast_messages
+
+分别计时构造和构造 + model_dump_json。用例定义在 benchmarks/message_cases.py，
+两种方式的 JSON 逐字节一致由 tests/test_fast_messages.py 用同一组用例保证。
+
+用法:
+    python benchmarks/message_construction.py --number 100000
+"""
+
+import argparse
+import timeit
+
+from message_cases import build_cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description="客户端消息构造基准")
+    parser.add_argument("--number", type=int, default=20000, help="每项的执行次数")
+    args = parser.parse_args()
+
+    print(f"{'消息':<24}{'校验构造':>10}{'免校验':>10}{'加速':>8}{'含序列化':>12}{'免校验':>10}{'加速':>8}")
+    for name, (validated, fast) in build_cases().items():
+        timings = [
+            timeit.timeit(func, number=args.number) / args.number * 1e6
+            for func in (
+                validated,
+                fast,
+                lambda: validated().model_dump_json(),
+                lambda: fast().model_dump_json(),
+            )
+        ]
+        print(
+            f"{name:<24}{timings[0]:>8.2f}us{timings[1]:>8.2f}us{timings[0] / timings[1]:>7.1f}x"
+            f"{timings[2]:>10.2f}us{timings[3]:>8.2f}us{timings[2] / timings[3]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
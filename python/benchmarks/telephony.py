@@ -0,0 +1,75 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT license.
+
+"""
+电话桥接的单核容量
+
+模拟一路通话每 20ms 的工作量：上行一个 8kHz G.711 RTP 负载解码并重采样到会话输入采样率，
+下行 20ms 的会话输出音频重采样到 8kHz 并编码为 G.711。据此估算单核能承载的并发通话数。
+Python 3.12 及以下有 audioop 时，同时核对 G.711 查找表与 audioop 的结果完全一致。
+
+用法:
+    python benchmarks/telephony.py --codec pcmu --input-rate 16000 --output-rate 24000
+"""
+
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from rtclient.audio_stream import PcmFormat
+from rtclient.telephony import TelephonyBridge, g711_decode, g711_encode
+
+
+def check_against_audioop(codec: str):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        try:
+            import audioop
+        except ImportError:
+            print("未找到 audioop，跳过 G.711 一致性检查")
+            return
+    decode, encode = (audioop.ulaw2lin, audioop.lin2ulaw) if codec == "pcmu" else (audioop.alaw2lin, audioop.lin2alaw)
+    codes = bytes(range(256))
+    pcm = np.arange(-32768, 32768, dtype=np.int16).tobytes()
+    assert g711_decode(codes, codec).tobytes() == decode(codes, 2), "解码表与 audioop 不一致"
+    assert g711_encode(pcm, codec) == encode(pcm, 2), "编码表与 audioop 不一致"
+    print(f"{codec} 编解码表与 audioop 一致")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="电话桥接的单核容量")
+    parser.add_argument("--codec", choices=["pcmu", "pcma"], default="pcmu")
+    parser.add_argument("--input-rate", type=int, default=16000, help="会话输入采样率")
+    parser.add_argument("--output-rate", type=int, default=24000, help="会话输出采样率")
+    parser.add_argument("--frames", type=int, default=20000, help="模拟的 20ms 帧数")
+    args = parser.parse_args()
+
+    check_against_audioop(args.codec)
+
+    class _NoClient:
+        input_pcm_format = PcmFormat(args.input_rate)
+
+    bridge = TelephonyBridge(_NoClient(), PcmFormat(args.output_rate), codec=args.codec)
+    rng = np.random.default_rng(0)
+    payload = g711_encode(rng.integers(-8000, 8000, 160, dtype=np.int16), args.codec)
+    outbound = rng.integers(-8000, 8000, args.output_rate // 50, dtype=np.int16).tobytes()
+
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        bridge.decode_inbound(payload)
+    inbound_us = (time.perf_counter() - start) / args.frames * 1e6
+
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        bridge.encode_outbound(outbound)
+    outbound_us = (time.perf_counter() - start) / args.frames * 1e6
+
+    per_call = (inbound_us + outbound_us) * 50 / 1e6
+    print(f"上行 {inbound_us:6.1f} us/帧  下行 {outbound_us:6.1f} us/帧")
+    print(f"每路通话占用 {per_call * 100:.2f}% 单核，约可承载 {int(1 / per_call)} 路（不含 WebSocket 和 JSON 开销）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,270 @@
 # Copyright (c) ZhiPu Corporation.
 # Licensed under the MIT License.
 
-from typing import Literal, Optional
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from rtclient.audio_ring import SharedAudioRing
+    from rtclient.audio_stream import AudioChunker, PcmFormat, WavSink
+    from rtclient.context_budget import ContextBudget, TurnUsage
+    from rtclient.conversation import ConversationStore
+    from rtclient.dispatcher import EventDispatcher, EventHandler, LaneOverflow
+    from rtclient.loop_monitor import LoopLagMonitor
+    from rtclient.low_level_client import RTLowLevelClient
+    from rtclient.manager import ManagedSession, SessionLimitError, SessionManager
+    from rtclient.models import (
+        AssistantContentPart,
+        AssistantMessageItem,
+        AudioFormat,
+        ClientMessageBase,
+        ClientVAD,
+        ErrorMessage,
+        FunctionCallItem,
+        FunctionCallOutputItem,
+        FunctionToolChoice,
+        InputAudioBufferAppendMessage,
+        InputAudioBufferClearMessage,
+        InputAudioBufferCommitMessage,
+        InputAudioBufferCommittedMessage,
+        InputAudioBufferSpeechStartedMessage,
+        InputAudioBufferSpeechStoppedMessage,
+        InputAudioContentPart,
+        InputAudioTranscription,
+        InputTextContentPart,
+        InputVideoFrameAppendMessage,
+        Item,
+        ItemCreatedMessage,
+        ItemCreateMessage,
+        ItemInputAudioTranscriptionCompletedMessage,
+        ItemParamStatus,
+        MessageItem,
+        MessageItemType,
+        MessageRole,
+        Modality,
+        NoTurnDetection,
+        OutputTextContentPart,
+        RealtimeError,
+        Response,
+        ResponseAudioDeltaMessage,
+        ResponseAudioTranscriptDeltaMessage,
+        ResponseAudioTranscriptDoneMessage,
+        ResponseCancelledDetails,
+        ResponseCancelMessage,
+        ResponseCreatedMessage,
+        ResponseCreateMessage,
+        ResponseCreateParams,
+        ResponseDoneMessage,
+        ResponseFailedDetails,
+        ResponseFunctionCallArgumentsDoneMessage,
+        ResponseFunctionCallItem,
+        ResponseFunctionCallOutputItem,
+        ResponseIncompleteDetails,
+        ResponseItem,
+        ResponseItemAudioContentPart,
+        ResponseItemBase,
+        ResponseItemContentPart,
+        ResponseItemInputAudioContentPart,
+        ResponseItemInputTextContentPart,
+        ResponseItemStatus,
+        ResponseItemTextContentPart,
+        ResponseMessageItem,
+        ResponseStatus,
+        ResponseStatusDetails,
+        ServerMessageBase,
+        ServerMessageType,
+        ServerVAD,
+        Session,
+        SessionCreatedMessage,
+        SessionUpdatedMessage,
+        SessionUpdateMessage,
+        SessionUpdateParams,
+        SystemContentPart,
+        SystemMessageItem,
+        Temperature,
+        ToolChoice,
+        ToolsDefinition,
+        TurnDetection,
+        Usage,
+        UserContentPart,
+        UserMessageItem,
+        UserMessageType,
+        Voice,
+        create_message_from_dict,
+    )
+    from rtclient.pacing import PacedStream, PacingScheduler
+    from rtclient.rate_control import MediaRateDecision, RateController
+    from rtclient.response_stream import ResponseStream, ResponseStreamOverflow
+    from rtclient.session import PreparedSessionUpdate, SessionConfigRegistry, SessionUpdateError, SessionUpdater
+    from rtclient.sharding import ShardSupervisor
+    from rtclient.telephony import TelephonyBridge
+    from rtclient.timing import LatencyTracker, TurnLatency
+    from rtclient.tools import ToolDispatcher, ToolResultCache, ToolSpec
+    from rtclient.transcript import TranscriptAggregator, TranscriptEvent
+    from rtclient.util.token import TokenProvider
+    from rtclient.video import FrameGate, VideoPreprocessor
+
+# 公开名称 -> 所在模块。按需导入：只用到模型时不会加载 aiohttp，不用视频功能时不会加载 Pillow / numpy
+_EXPORTS = {
+    "rtclient.low_level_client": ("RTLowLevelClient",),
+    "rtclient.models": (
+        "AssistantContentPart",
+        "AssistantMessageItem",
+        "AudioFormat",
+        "ClientMessageBase",
+        "ClientVAD",
+        "ErrorMessage",
+        "FunctionCallItem",
+        "FunctionCallOutputItem",
+        "FunctionToolChoice",
+        "InputAudioBufferAppendMessage",
+        "InputAudioBufferClearMessage",
+        "InputAudioBufferCommitMessage",
+        "InputAudioBufferCommittedMessage",
+        "InputAudioBufferSpeechStartedMessage",
+        "InputAudioBufferSpeechStoppedMessage",
+        "InputAudioContentPart",
+        "InputAudioTranscription",
+        "InputTextContentPart",
+        "InputVideoFrameAppendMessage",
+        "Item",
+        "ItemCreatedMessage",
+        "ItemCreateMessage",
+        "ItemInputAudioTranscriptionCompletedMessage",
+        "ItemParamStatus",
+        "MessageItem",
+        "MessageItemType",
+        "MessageRole",
+        "Modality",
+        "NoTurnDetection",
+        "OutputTextContentPart",
+        "RealtimeError",
+        "Response",
+        "ResponseAudioDeltaMessage",
+        "ResponseAudioTranscriptDeltaMessage",
+        "ResponseAudioTranscriptDoneMessage",
+        "ResponseCancelledDetails",
+        "ResponseCancelMessage",
+        "ResponseCreatedMessage",
+        "ResponseCreateMessage",
+        "ResponseCreateParams",
+        "ResponseDoneMessage",
+        "ResponseFailedDetails",
+        "ResponseFunctionCallArgumentsDoneMessage",
+        "ResponseFunctionCallItem",
+        "ResponseFunctionCallOutputItem",
+        "ResponseIncompleteDetails",
+        "ResponseItem",
+        "ResponseItemAudioContentPart",
+        "ResponseItemBase",
+        "ResponseItemContentPart",
+        "ResponseItemInputAudioContentPart",
+        "ResponseItemInputTextContentPart",
+        "ResponseItemStatus",
+        "ResponseItemTextContentPart",
+        "ResponseMessageItem",
+        "ResponseStatus",
+        "ResponseStatusDetails",
+        "ServerMessageBase",
+        "ServerMessageType",
+        "ServerVAD",
+        "Session",
+        "SessionCreatedMessage",
+        "SessionUpdatedMessage",
+        "SessionUpdateMessage",
+        "SessionUpdateParams",
+        "SystemContentPart",
+        "SystemMessageItem",
+        "Temperature",
+        "ToolChoice",
+        "ToolsDefinition",
+        "TurnDetection",
+        "Usage",
+        "UserContentPart",
+        "UserMessageItem",
+        "UserMessageType",
+        "Voice",
+        "create_message_from_dict",
+    ),
+    "rtclient.conversation": ("ConversationStore",),
+    "rtclient.rate_control": (
+        "MediaRateDecision",
+        "RateController",
+    ),
+    "rtclient.session": (
+        "PreparedSessionUpdate",
+        "SessionConfigRegistry",
+        "SessionUpdateError",
+        "SessionUpdater",
+    ),
+    "rtclient.tools": (
+        "ToolDispatcher",
+        "ToolResultCache",
+        "ToolSpec",
+    ),
+    "rtclient.transcript": (
+        "TranscriptAggregator",
+        "TranscriptEvent",
+    ),
+    "rtclient.util.token": ("TokenProvider",),
+    "rtclient.video": (
+        "FrameGate",
+        "VideoPreprocessor",
+    ),
+    "rtclient.manager": (
+        "ManagedSession",
+        "SessionLimitError",
+        "SessionManager",
+    ),
+    "rtclient.sharding": ("ShardSupervisor",),
+    "rtclient.audio_ring": ("SharedAudioRing",),
+    "rtclient.loop_monitor": ("LoopLagMonitor",),
+    "rtclient.audio_stream": (
+        "AudioChunker",
+        "PcmFormat",
+        "WavSink",
+    ),
+    "rtclient.pacing": (
+        "PacedStream",
+        "PacingScheduler",
+    ),
+    "rtclient.timing": (
+        "LatencyTracker",
+        "TurnLatency",
+    ),
+    "rtclient.dispatcher": (
+        "EventDispatcher",
+        "EventHandler",
+        "LaneOverflow",
+    ),
+    "rtclient.response_stream": (
+        "ResponseStream",
+        "ResponseStreamOverflow",
+    ),
+    "rtclient.telephony": ("TelephonyBridge",),
+    "rtclient.context_budget": (
+        "ContextBudget",
+        "TurnUsage",
+    ),
+}
+_LAZY_ATTRS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
-from rtclient.low_level_client import RTLowLevelClient
-from rtclient.models import (
-    AssistantContentPart,
-    AssistantMessageItem,
-    AudioFormat,
-    ClientMessageBase,
-    ClientVAD,
-    ErrorMessage,
-    FunctionCallItem,
-    FunctionCallOutputItem,
-    FunctionToolChoice,
-    InputAudioBufferAppendMessage,
-    InputAudioBufferClearMessage,
-    InputAudioBufferCommitMessage,
-    InputAudioBufferCommittedMessage,
-    InputAudioBufferSpeechStartedMessage,
-    InputAudioBufferSpeechStoppedMessage,
-    InputAudioContentPart,
-    InputAudioTranscription,
-    InputTextContentPart,
-    InputVideoFrameAppendMessage,
-    Item,
-    ItemCreatedMessage,
-    ItemCreateMessage,
-    ItemInputAudioTranscriptionCompletedMessage,
-    ItemParamStatus,
-    MessageItem,
-    MessageItemType,
-    MessageRole,
-    Modality,
-    NoTurnDetection,
-    OutputTextContentPart,
-    RealtimeError,
-    Response,
-    ResponseAudioDeltaMessage,
-    ResponseAudioTranscriptDeltaMessage,
-    ResponseAudioTranscriptDoneMessage,
-    ResponseCancelledDetails,
-    ResponseCancelMessage,
-    ResponseCreatedMessage,
-    ResponseCreateMessage,
-    ResponseCreateParams,
-    ResponseDoneMessage,
-    ResponseFailedDetails,
-    ResponseFunctionCallArgumentsDoneMessage,
-    ResponseFunctionCallItem,
-    ResponseFunctionCallOutputItem,
-    ResponseIncompleteDetails,
-    ResponseItem,
-    ResponseItemAudioContentPart,
-    ResponseItemBase,
-    ResponseItemContentPart,
-    ResponseItemInputAudioContentPart,
-    ResponseItemInputTextContentPart,
-    ResponseItemStatus,
-    ResponseItemTextContentPart,
-    ResponseMessageItem,
-    ResponseStatus,
-    ResponseStatusDetails,
-    ServerMessageBase,
-    ServerMessageType,
-    ServerVAD,
-    Session,
-    SessionCreatedMessage,
-    SessionUpdatedMessage,
-    SessionUpdateMessage,
-    SessionUpdateParams,
-    SystemContentPart,
-    SystemMessageItem,
-    Temperature,
-    ToolChoice,
-    ToolsDefinition,
-    TurnDetection,
-    Usage,
-    UserContentPart,
-    UserMessageItem,
-    UserMessageType,
-    Voice,
-    create_message_from_dict,
-)
 
 __all__ = [
     "RTLowLevelClient",
-    "RealtimeException",
     "Voice",
     "AudioFormat",
     "Modality",
@@ -164,4 +342,40 @@ __all__ = [
     "UserMessageType",
     "ServerMessageType",
     "create_message_from_dict",
+    "ConversationStore",
+    "MediaRateDecision",
+    "RateController",
+    "SessionUpdater",
+    "SessionConfigRegistry",
+    "PreparedSessionUpdate",
+    "SessionUpdateError",
+    "ToolDispatcher",
+    "ToolResultCache",
+    "ToolSpec",
+    "TranscriptAggregator",
+    "TranscriptEvent",
+    "TokenProvider",
+    "FrameGate",
+    "VideoPreprocessor",
+    "ManagedSession",
+    "SessionLimitError",
+    "SessionManager",
+    "ShardSupervisor",
+    "SharedAudioRing",
+    "LoopLagMonitor",
+    "AudioChunker",
+    "PcmFormat",
+    "WavSink",
+    "PacedStream",
+    "PacingScheduler",
+    "LatencyTracker",
+    "TurnLatency",
+    "EventDispatcher",
+    "EventHandler",
+    "LaneOverflow",
+    "ResponseStream",
+    "ResponseStreamOverflow",
+    "TelephonyBridge",
+    "ContextBudget",
+    "TurnUsage",
 ]
@@ -0,0 +1,243 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+import multiprocessing
+import os
+import struct
+import sys
+import zlib
+from collections.abc import AsyncIterator
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+_MAGIC = 0x52545242  # "RTRB"
+_VERSION = 2
+# 头部布局：元信息一行，生产者、消费者的字段各占一个缓存行，避免互相使缓存行失效
+_META = struct.Struct("<IHHII")  # magic, version, flags, slots, slot_size
+_INDEX = struct.Struct("<Q")
+_WRITE_OFFSET = 64
+_DROPPED_OFFSET = 72
+_CLOSED_OFFSET = 80
+_FINAL_OFFSET = 88
+_READ_OFFSET = 128
+_HEADER_SIZE = 192
+# 槽位头：代号、CRC32、长度
+_SLOT = struct.Struct("<QII")
+
+
+# 本进程创建的共享内存名称
+_created: set[str] = set()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    # Python 3.13 之前附加方也会向 resource_tracker 登记，进程退出时 tracker 会删除共享内存，
+    # 因此附加后撤销登记。创建方所在的进程和 multiprocessing 启动的子进程共用同一个 tracker，
+    # 同名登记只有一条，撤销会连带撤销创建方的登记，这两种情况保留登记
+    if os.name == "posix" and name not in _created and multiprocessing.parent_process() is None:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedAudioRing:
+    """共享内存中的单生产者单消费者音频环形缓冲区
+
+    固定数量、固定大小的槽位，每个槽位存放一帧 PCM（代号 + CRC32 + 长度 + 数据），
+    帧数据直接写入和读出共享内存，不经过 pickle。缓冲区满时新帧被丢弃并计入 dropped，
+    不会阻塞采集进程。只能有一个进程写、一个进程读。
+
+    Python 无法发出内存屏障，struct.pack_into 也不保证单次写入，另一个进程可能看到写了一半
+    或乱序到达的字段，因此两端都不依赖对方的计数器：每个槽位带一个代号，写位置为 n 的帧
+    写完数据后把代号设为 n + 1，消费者读完后设为 n + slots 表示可以复用。生产者只在代号恰好
+    等于自己的写位置时写入，消费者只在代号恰好等于读位置 + 1、且以代号为初值计算的 CRC32
+    与数据一致时读取；半新半旧的代号不会恰好等于期望值，数据先于代号写入但尚未可见时 CRC32
+    不一致，两种情况都当作尚未就绪，下次再读。头部的读写位置只用于统计和 len()。
+
+    输入方向：采集进程 create() 后写入，WebSocket 进程 attach() 后交给
+    RTLowLevelClient.send_audio_from()；输出方向：WebSocket 进程用 write_base64()
+    写入 response.audio.delta，播放进程读取。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        magic, version, _, slots, slot_size = _META.unpack_from(shm.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            shm.close()
+            raise ValueError(f"共享内存 {shm.name} 不是音频环形缓冲区")
+        self._shm = shm
+        self._buf = shm.buf
+        self._owner = owner
+        self.slots = slots
+        self.slot_size = slot_size
+        self._stride = (_SLOT.size + slot_size + 7) & ~7
+        # 两端各自维护自己的位置，头部中的值只在附加时读取一次
+        self._write_index = _INDEX.unpack_from(shm.buf, _WRITE_OFFSET)[0]
+        self._read_index = _INDEX.unpack_from(shm.buf, _READ_OFFSET)[0]
+
+    @classmethod
+    def create(cls, slots: int = 64, slot_size: int = 3200, name: Optional[str] = None) -> "SharedAudioRing":
+        """创建环形缓冲区
+
+        Args:
+            slots: 槽位数，至少为 2
+            slot_size: 每个槽位最多容纳的字节数，例如 16kHz 16bit 单声道 100ms 为 3200
+            name: 可选，共享内存名称，默认随机生成
+        """
+        if slots < 2:
+            raise ValueError("slots 至少为 2")
+        stride = (_SLOT.size + slot_size + 7) & ~7
+        shm = shared_memory.SharedMemory(name, create=True, size=_HEADER_SIZE + slots * stride)
+        shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        for index in range(slots):
+            _SLOT.pack_into(shm.buf, _HEADER_SIZE + index * stride, index, 0, 0)
+        _META.pack_into(shm.buf, 0, _MAGIC, _VERSION, 0, slots, slot_size)
+        _created.add(shm.name)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedAudioRing":
+        """在另一个进程中按名称打开已创建的环形缓冲区"""
+        return cls(_attach(name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, frame) -> bool:
+        """写入一帧（生产者调用）
+
+        Args:
+            frame: bytes、bytearray、memoryview 或 numpy 数组等支持缓冲区协议的对象
+
+        Returns:
+            缓冲区已满、帧被丢弃时返回 False
+        """
+        data = memoryview(frame).cast("B")
+        if len(data) > self.slot_size:
+            raise ValueError(f"帧大小 {len(data)} 超过槽位大小 {self.slot_size}")
+        buf = self._buf
+        write_index = self._write_index
+        offset = _HEADER_SIZE + (write_index % self.slots) * self._stride
+        if _SLOT.unpack_from(buf, offset)[0] != write_index:
+            # 消费者还没有释放这个槽位
+            _INDEX.pack_into(buf, _DROPPED_OFFSET, _INDEX.unpack_from(buf, _DROPPED_OFFSET)[0] + 1)
+            return False
+        start = offset + _SLOT.size
+        buf[start:start + len(data)] = data
+        generation = write_index + 1
+        # 数据写完之后才发布新的代号，CRC32 以代号为初值，旧帧的数据不会通过校验
+        _SLOT.pack_into(buf, offset, generation, zlib.crc32(data, generation & 0xFFFFFFFF), len(data))
+        self._write_index = generation
+        _INDEX.pack_into(buf, _WRITE_OFFSET, generation)
+        return True
+
+    def write_base64(self, data: str) -> int:
+        """把 base64 编码的音频（例如 response.audio.delta）解码后按槽位大小切分写入
+
+        Returns:
+            实际写入的字节数，缓冲区满时后面的部分被丢弃
+        """
+        decoded = memoryview(base64.b64decode(data))
+        written = 0
+        for start in range(0, len(decoded), self.slot_size):
+            if not self.write(decoded[start:start + self.slot_size]):
+                break
+            written += min(self.slot_size, len(decoded) - start)
+        return written
+
+    def peek(self) -> Optional[memoryview]:
+        """返回最早一帧的只读视图，没有数据时返回 None（消费者调用）
+
+        视图直接指向共享内存，在调用 advance() 之前有效。
+        """
+        buf = self._buf
+        offset = _HEADER_SIZE + (self._read_index % self.slots) * self._stride
+        generation, crc, length = _SLOT.unpack_from(buf, offset)
+        if generation != self._read_index + 1 or length > self.slot_size:
+            return None
+        start = offset + _SLOT.size
+        frame = buf[start:start + length].toreadonly()
+        if zlib.crc32(frame, generation & 0xFFFFFFFF) != crc:
+            frame.release()
+            return None
+        return frame
+
+    def advance(self):
+        """释放 peek() 返回的帧，槽位可以被生产者复用"""
+        read_index = self._read_index
+        offset = _HEADER_SIZE + (read_index % self.slots) * self._stride
+        if _SLOT.unpack_from(self._buf, offset)[0] != read_index + 1:
+            return
+        _SLOT.pack_into(self._buf, offset, read_index + self.slots, 0, 0)
+        self._read_index = read_index + 1
+        _INDEX.pack_into(self._buf, _READ_OFFSET, self._read_index)
+
+    def read(self) -> Optional[bytes]:
+        """复制并释放最早一帧，没有数据时返回 None"""
+        frame = self.peek()
+        if frame is None:
+            return None
+        data = bytes(frame)
+        frame.release()
+        self.advance()
+        return data
+
+    async def frames(self, poll_interval: float = 0.005) -> AsyncIterator[memoryview]:
+        """按顺序产出帧视图，生产者 close() 且数据读完后结束
+
+        每个视图在迭代到下一帧时释放，使用方如需保留数据需要自行复制。
+        """
+        while True:
+            frame = self.peek()
+            if frame is None:
+                # 生产者关闭时记下了最终写位置，读到该位置才结束，不会漏掉乱序可见的最后几帧
+                if self.closed and self._read_index == _INDEX.unpack_from(self._buf, _FINAL_OFFSET)[0]:
+                    return
+                await asyncio.sleep(poll_interval)
+                continue
+            try:
+                yield frame
+            finally:
+                frame.release()
+                self.advance()
+
+    def __len__(self) -> int:
+        """当前可读的帧数（近似值，由另一个进程发布的位置计算）"""
+        written = _INDEX.unpack_from(self._buf, _WRITE_OFFSET)[0]
+        return max(0, written - _INDEX.unpack_from(self._buf, _READ_OFFSET)[0])
+
+    @property
+    def dropped(self) -> int:
+        """缓冲区满时被丢弃的帧数"""
+        return _INDEX.unpack_from(self._buf, _DROPPED_OFFSET)[0]
+
+    @property
+    def closed(self) -> bool:
+        """生产者是否已经结束写入"""
+        return bool(self._buf[_CLOSED_OFFSET])
+
+    def close(self):
+        """标记生产者结束写入（生产者调用），消费者读完剩余数据后停止"""
+        _INDEX.pack_into(self._buf, _FINAL_OFFSET, self._write_index)
+        self._buf[_CLOSED_OFFSET] = 1
+
+    def release(self, unlink: Optional[bool] = None):
+        """解除本进程的映射
+
+        Args:
+            unlink: 是否删除共享内存，默认由创建方删除
+        """
+        self._buf = None
+        self._shm.close()
+        if self._owner if unlink is None else unlink:
+            self._shm.unlink()
+            _created.discard(self._shm.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
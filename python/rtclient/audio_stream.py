@@ -0,0 +1,293 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import base64
+import os
+import struct
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+_RIFF_HEADER = struct.Struct("<4sI4s")
+_CHUNK_HEADER = struct.Struct("<4sI")
+_FMT = struct.Struct("<HHIIHH")
+_WAV_FORMAT_PCM = 1
+_WAV_FORMAT_EXTENSIBLE = 0xFFFE
+
+_MAX_DATA_SIZE = 0xFFFFFFFF - 36
+
+BytesLike = Union[bytes, bytearray, memoryview]
+PathLike = Union[str, os.PathLike]
+
+
+@dataclass(frozen=True)
+class PcmFormat:
+    """PCM 音频格式"""
+
+    sample_rate: int = 16000
+    channels: int = 1
+    sample_width: int = 2
+
+    @property
+    def block_align(self) -> int:
+        """一个采样帧（所有声道）的字节数"""
+        return self.channels * self.sample_width
+
+    @property
+    def bytes_per_second(self) -> int:
+        return self.sample_rate * self.block_align
+
+    def chunk_bytes(self, duration_ms: float) -> int:
+        """duration_ms 毫秒对应的字节数，按采样帧对齐，至少一帧"""
+        return max(1, round(self.sample_rate * duration_ms / 1000)) * self.block_align
+
+    def duration_ms(self, size: int) -> float:
+        """size 字节音频的时长（毫秒）"""
+        return size * 1000 / self.bytes_per_second
+
+
+def wav_header(pcm_format: PcmFormat, data_size: int) -> bytes:
+    """44 字节的标准 PCM WAV 文件头"""
+    return (
+        _RIFF_HEADER.pack(b"RIFF", 36 + data_size, b"WAVE")
+        + _CHUNK_HEADER.pack(b"fmt ", _FMT.size)
+        + _FMT.pack(
+            _WAV_FORMAT_PCM,
+            pcm_format.channels,
+            pcm_format.sample_rate,
+            pcm_format.bytes_per_second,
+            pcm_format.block_align,
+            pcm_format.sample_width * 8,
+        )
+        + _CHUNK_HEADER.pack(b"data", data_size)
+    )
+
+
+def parse_wav(data: BytesLike) -> tuple[PcmFormat, memoryview]:
+    """解析 WAV 文件头
+
+    Returns:
+        (音频格式, 指向 data 块的视图)，不复制音频数据
+
+    Raises:
+        ValueError: 不是 PCM 编码的 WAV
+    """
+    view = memoryview(data).cast("B")
+    if len(view) < _RIFF_HEADER.size:
+        raise ValueError("WAV 数据过短")
+    riff, _, wave = _RIFF_HEADER.unpack_from(view, 0)
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise ValueError("不是 WAV 格式的音频")
+    pcm_format = None
+    offset = _RIFF_HEADER.size
+    while offset + _CHUNK_HEADER.size <= len(view):
+        chunk_id, size = _CHUNK_HEADER.unpack_from(view, offset)
+        body = offset + _CHUNK_HEADER.size
+        if chunk_id == b"fmt ":
+            tag, channels, sample_rate, _, _, bits = _FMT.unpack_from(view, body)
+            if tag not in (_WAV_FORMAT_PCM, _WAV_FORMAT_EXTENSIBLE) or bits % 8:
+                raise ValueError(f"不支持的 WAV 编码: format={tag}, bits={bits}")
+            pcm_format = PcmFormat(sample_rate=sample_rate, channels=channels, sample_width=bits // 8)
+        elif chunk_id == b"data":
+            if pcm_format is None:
+                raise ValueError("WAV 缺少 fmt 块")
+            # 流式写出的 WAV 可能把 data 大小写成 0 或 0xFFFFFFFF，以实际长度为准
+            end = len(view) if size in (0, 0xFFFFFFFF) else min(len(view), body + size)
+            end -= (end - body) % pcm_format.block_align
+            return pcm_format, view[body:end]
+        offset = body + size + (size & 1)
+    raise ValueError("WAV 缺少 data 块")
+
+
+class AudioChunker:
+    """把 PCM 音频按固定时长切分为可以直接放进 input_audio_buffer.append 的 base64 片段
+
+    input_audio_format 为 wav 时接口要求每条 append 都是完整的 WAV，因此每个片段都带 44 字节的
+    文件头。文件头只在片段长度变化时（通常只有最后一片）重新生成，片段在复用的缓冲区中拼接后
+    直接做 base64 编码，不经过 wave 模块重新封装。
+
+    wav 为 False 时用于 input_audio_format 为 pcm 的会话：片段不带文件头，直接对 PCM 做
+    base64 编码。两种模式都检查每个片段都是整数个采样帧。
+    """
+
+    def __init__(self, pcm_format: PcmFormat = PcmFormat(), chunk_ms: float = 100, wav: bool = True):
+        """初始化
+
+        Args:
+            pcm_format: 音频格式
+            chunk_ms: 每个片段的时长（毫秒），按采样帧对齐
+            wav: 是否为每个片段加 WAV 文件头
+        """
+        self.pcm_format = pcm_format
+        self.chunk_ms = chunk_ms
+        self.wav = wav
+        self.chunk_bytes = pcm_format.chunk_bytes(chunk_ms)
+        self._header_size = len(wav_header(pcm_format, 0)) if wav else 0
+        self._buffer = bytearray(self._header_size + self.chunk_bytes) if wav else None
+        self._header_for: Optional[int] = None
+
+    def encode(self, pcm: BytesLike) -> str:
+        """把一段不超过 chunk_bytes 的 PCM 编码为一条 append 的 audio 字段"""
+        size = len(pcm)
+        if size > self.chunk_bytes:
+            raise ValueError(f"片段大小 {size} 超过 {self.chunk_bytes}")
+        if size % self.pcm_format.block_align:
+            raise ValueError(f"PCM 片段大小 {size} 不是采样帧大小 {self.pcm_format.block_align} 的整数倍")
+        if not self.wav:
+            return base64.b64encode(pcm).decode("ascii")
+        if self._header_for != size:
+            self._buffer[:self._header_size] = wav_header(self.pcm_format, size)
+            self._header_for = size
+        end = self._header_size + size
+        self._buffer[self._header_size:end] = pcm
+        with memoryview(self._buffer) as view:
+            return base64.b64encode(view[:end]).decode("ascii")
+
+    def chunks(self, pcm: BytesLike) -> Iterator[str]:
+        """逐片产出 base64 编码的片段"""
+        view = memoryview(pcm).cast("B")
+        for start in range(0, len(view), self.chunk_bytes):
+            yield self.encode(view[start:start + self.chunk_bytes])
+
+
+def split_audio(
+    audio: BytesLike, chunk_ms: float = 100, pcm_format: Optional[PcmFormat] = None, wav: bool = True
+) -> tuple[AudioChunker, memoryview]:
+    """准备切分一段音频
+
+    Args:
+        audio: WAV 文件内容，或格式为 pcm_format 的原始 PCM
+        chunk_ms: 每个片段的时长（毫秒）
+        pcm_format: 原始 PCM 的格式；传入 WAV 时以文件头为准。wav 为 False 时是会话约定的
+            输入格式，传入的 WAV 必须与之一致
+        wav: 片段是否带 WAV 文件头，见 AudioChunker
+
+    Returns:
+        (切分器, PCM 数据视图)，用 chunker.chunks(pcm) 逐片编码
+    """
+    view = memoryview(audio).cast("B")
+    if view[:4] == b"RIFF":
+        file_format, view = parse_wav(view)
+        if not wav and pcm_format is not None and file_format != pcm_format:
+            raise ValueError(f"WAV 格式 {file_format} 与 PCM 输入格式 {pcm_format} 不一致")
+        pcm_format = file_format
+    elif pcm_format is None:
+        raise ValueError("原始 PCM 音频需要指定 pcm_format")
+    elif len(view) % pcm_format.block_align:
+        raise ValueError(f"PCM 长度 {len(view)} 不是采样帧大小 {pcm_format.block_align} 的整数倍")
+    return AudioChunker(pcm_format, chunk_ms, wav), view
+
+
+class WavSink:
+    """把响应音频边接收边写入 WAV 文件
+
+    先写入数据大小为 0 的文件头，之后每个 response.audio.delta 解码后直接追加到带缓冲的文件中，
+    内存占用与音频时长无关；finish() 时回填 RIFF 和 data 块大小。不足一个采样帧的尾部字节
+    暂存到下一次写入，文件中始终只有完整的采样帧。进程意外退出时文件头中的大小为 0，
+    parse_wav 等按实际长度读取的解析器仍然可以读出已写入的音频。
+
+    只适用于 output_audio_format 为 pcm 的会话，pcm_format 需要与服务端输出的音频格式一致。
+    """
+
+    def __init__(self, path: PathLike, pcm_format: PcmFormat, buffer_size: int = 64 * 1024):
+        """初始化并创建文件
+
+        Args:
+            path: 输出文件路径，已存在时覆盖
+            pcm_format: 响应音频的格式
+            buffer_size: 文件写缓冲区大小（字节）
+        """
+        self.path = path
+        self.pcm_format = pcm_format
+        self.data_size = 0
+        self._header_size = len(wav_header(pcm_format, 0))
+        self._pending = b""
+        self._file = open(path, "wb", buffering=buffer_size)
+        self._file.write(wav_header(pcm_format, 0))
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    @property
+    def duration_ms(self) -> float:
+        return self.pcm_format.duration_ms(self.data_size)
+
+    def write(self, pcm: BytesLike) -> int:
+        """追加一段 PCM，返回写入文件的字节数"""
+        if self._pending:
+            pcm = self._pending + bytes(pcm)
+        size = len(pcm) - len(pcm) % self.pcm_format.block_align
+        self._pending = bytes(pcm[size:])
+        if self.data_size + size > _MAX_DATA_SIZE:
+            raise ValueError("WAV 文件超过 4GB 上限")
+        if size:
+            self._file.write(pcm[:size] if size < len(pcm) else pcm)
+            self.data_size += size
+        return size
+
+    def write_base64(self, data: str) -> int:
+        """追加 base64 编码的音频（response.audio.delta 的 delta）"""
+        return self.write(base64.b64decode(data))
+
+    def handle(self, message: Any) -> bool:
+        """处理一条服务端消息：写入 response.audio.delta，收到 response.done 时 finish()
+
+        Returns:
+            文件是否已经完成
+        """
+        msg_type = message.get("type") if isinstance(message, dict) else getattr(message, "type", None)
+        if msg_type == "response.audio.delta":
+            delta = message.get("delta") if isinstance(message, dict) else message.delta
+            if delta:
+                self.write_base64(delta)
+        elif msg_type == "response.done":
+            self.finish()
+            return True
+        return False
+
+    def finish(self) -> float:
+        """丢弃不完整的尾帧、回填文件头并关闭文件，返回音频时长（毫秒）；重复调用无副作用"""
+        if self._file.closed:
+            return self.duration_ms
+        self._pending = b""
+        end = self._header_size + self.data_size
+        self._file.seek(0)
+        self._file.write(wav_header(self.pcm_format, self.data_size))
+        self._file.flush()
+        # 写缓冲区之外如果有多余数据（例如异常中断的写入），截断到最后一个完整采样帧
+        self._file.truncate(end)
+        self._file.close()
+        return self.duration_ms
+
+    def discard(self):
+        """关闭并删除文件"""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def record(self, stream: AsyncIterator[Any]) -> float:
+        """写入一个响应的全部音频，例如 client.response_stream() 返回的事件流
+
+        无论流正常结束、出错还是消费任务被取消，都会截断到已写入的完整采样帧并回填文件头，
+        得到的仍是可以播放的 WAV 文件。
+
+        Returns:
+            音频时长（毫秒）
+        """
+        try:
+            async for message in stream:
+                if self.handle(message):
+                    break
+        finally:
+            self.finish()
+        return self.duration_ms
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.finish()
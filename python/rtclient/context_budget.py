@@ -0,0 +1,256 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import inspect
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Optional, Union
+
+from rtclient.conversation import ConversationStore, has_audio, strip_audio, to_item_param
+from rtclient.models import InputTextContentPart, ResponseCreateParams, SystemMessageItem
+
+Summarizer = Callable[[list[Any], Optional[str]], Union[str, Awaitable[str]]]
+
+# 首个响应增量事件，收到即视为首 token
+_FIRST_DELTA_TYPES = frozenset({
+    "response.audio.delta",
+    "response.audio_transcript.delta",
+    "response.text.delta",
+    "response.function_call_arguments.delta",
+    "response.function_call_arguments.done",
+})
+
+
+def _field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+def _text_size(item) -> int:
+    """对话项中文本（音频按转写）、参数和函数输出的字符数"""
+    size = 0
+    for name in ("arguments", "output"):
+        value = getattr(item, name, None)
+        if isinstance(value, str):
+            size += len(value)
+    for part in getattr(item, "content", None) or ():
+        value = getattr(part, "text", None) or getattr(part, "transcript", None)
+        if isinstance(value, str):
+            size += len(value)
+    return size
+
+
+def _compact_item(item):
+    """转换为不带 id、不带音频的 Item，用于 input_items"""
+    param = to_item_param(item)
+    if has_audio(param):
+        param = strip_audio(param)
+    return param.model_copy(update={"id": ""})
+
+
+@dataclass
+class TurnUsage:
+    """一个响应的 token 用量和首 token 延迟"""
+
+    response_id: str
+    status: Optional[str]
+    input_tokens: int
+    cached_tokens: int
+    output_tokens: int
+    ttft_ms: Optional[float]
+    managed: bool
+    context_items: Optional[int]
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class ContextBudget:
+    """基于 Usage 统计的上下文窗口管理
+
+    服务端默认把整个会话作为每次推理的上下文，长通话中 input_tokens 逐轮增长，首 token 延迟
+    随之上升。handle() 从 response.done 中记录每轮的 input / cached / output tokens，并测量
+    response.created 到首个增量事件的耗时。
+
+    最近一轮的 input_tokens 达到 max_input_tokens 后进入托管模式：response_params() 返回
+    带 input_items 的 ResponseCreateParams，内容为开头的 system 消息、可选的历史摘要，以及
+    ConversationStore 中最近的一段对话（音频以转写文本代替）。保留的对话窗口估算超过
+    max_input_tokens 时才一次性裁剪到 target_ratio，并把移出窗口的对话项交给 summarizer
+    合并进摘要；两次裁剪之间上下文前缀保持不变，服务端可以命中缓存。
+
+    input_items 替换的是历史上下文，当前一轮的音频仍由 response.create 的 commit 提交，
+    因此托管模式下应直接发送 response.create，而不是先单独发送 input_audio_buffer.commit。
+    服务端 VAD 自动创建的响应不经过客户端，不受托管。
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        max_input_tokens: int = 8000,
+        target_ratio: float = 0.5,
+        summarizer: Optional[Summarizer] = None,
+        chars_per_token: float = 1.5,
+        history: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初始化
+
+        Args:
+            store: 接收循环中持续更新的 ConversationStore
+            max_input_tokens: 进入托管模式、以及托管模式下触发裁剪的输入 token 数
+            target_ratio: 裁剪后保留的 token 数占 max_input_tokens 的比例
+            summarizer: 可选，以 (移出窗口的对话项, 之前的摘要) 为参数返回新摘要的同步或异步函数；
+                None 时直接丢弃移出窗口的对话项
+            chars_per_token: 初始的每 token 字符数，收到文本 token 统计后自动校准
+            history: 保留的轮次记录数
+            clock: 单调时钟（秒），便于测试替换
+        """
+        if not 0 < target_ratio <= 1:
+            raise ValueError("target_ratio 必须在 (0, 1] 之间")
+        self.store = store
+        self.max_input_tokens = max_input_tokens
+        self.target_ratio = target_ratio
+        self.summarizer = summarizer
+        self.chars_per_token = chars_per_token
+        self._clock = clock
+        self.turns: deque[TurnUsage] = deque(maxlen=history)
+        self.managed = False
+        self.summary: Optional[str] = None
+        self.trims = 0
+        self._window_start: Optional[str] = None
+        self._last_context: Optional[tuple[int, int]] = None  # (对话项数, 字符数)
+        self._created: dict[str, float] = {}
+        self._ttft: dict[str, float] = {}
+        self._contexts: dict[str, tuple[int, int]] = {}
+
+    @property
+    def last_input_tokens(self) -> Optional[int]:
+        return self.turns[-1].input_tokens if self.turns else None
+
+    def handle(self, message: Any):
+        """处理一条服务器消息，需要在收到时调用"""
+        msg_type = _field(message, "type")
+        if msg_type in _FIRST_DELTA_TYPES:
+            response_id = _field(message, "response_id")
+            started = self._created.pop(response_id, None)
+            if started is not None:
+                self._ttft[response_id] = (self._clock() - started) * 1000
+        elif msg_type == "response.created":
+            response_id = _field(_field(message, "response"), "id")
+            self._created[response_id] = self._clock()
+            if self._last_context is not None:
+                self._contexts[response_id], self._last_context = self._last_context, None
+        elif msg_type == "response.done":
+            self._record(_field(message, "response"))
+
+    def _record(self, response):
+        response_id = _field(response, "id")
+        self._created.pop(response_id, None)
+        ttft = self._ttft.pop(response_id, None)
+        context = self._contexts.pop(response_id, None)
+        usage = _field(response, "usage")
+        if usage is None:
+            return
+        input_details = _field(usage, "input_token_details")
+        text_tokens = (_field(input_details, "text_tokens") or 0) if input_details is not None else 0
+        if context is not None and context[1] and text_tokens:
+            # 托管模式下发出的上下文字符数已知，用文本 token 数校准
+            self.chars_per_token = 0.8 * self.chars_per_token + 0.2 * (context[1] / text_tokens)
+        turn = TurnUsage(
+            response_id=response_id,
+            status=_field(response, "status"),
+            input_tokens=_field(usage, "input_tokens") or 0,
+            cached_tokens=(_field(input_details, "cached_tokens") or 0) if input_details is not None else 0,
+            output_tokens=_field(usage, "output_tokens") or 0,
+            ttft_ms=ttft,
+            managed=context is not None,
+            context_items=context[0] if context is not None else None,
+        )
+        self.turns.append(turn)
+        if turn.input_tokens >= self.max_input_tokens:
+            self.managed = True
+
+    def estimate_tokens(self, items: list[Any]) -> int:
+        """按当前校准的每 token 字符数估算对话项的 token 数"""
+        return int(sum(_text_size(item) for item in items) / self.chars_per_token)
+
+    async def response_params(self, **params) -> Optional[ResponseCreateParams]:
+        """生成下一次 response.create 的参数
+
+        未进入托管模式且没有其他参数时返回 None，使用服务端的完整上下文。
+
+        Args:
+            **params: ResponseCreateParams 的其他字段，例如 instructions
+        """
+        if not self.managed:
+            return ResponseCreateParams(**params) if params else None
+        items = list(self.store)
+        pinned = []
+        while items and getattr(items[0], "role", None) == "system":
+            pinned.append(items.pop(0))
+        start = next((i for i, item in enumerate(items) if item.id == self._window_start), 0)
+        window = items[start:]
+        if self._summary_tokens() + self.estimate_tokens(window) > self.max_input_tokens:
+            window = await self._trim(window)
+        input_items = [_compact_item(item) for item in pinned]
+        if self.summary:
+            input_items.append(SystemMessageItem(content=[InputTextContentPart(text=f"此前的对话摘要：{self.summary}")]))
+        input_items.extend(item for item in map(_compact_item, window) if _text_size(item) or item.type != "message")
+        self._last_context = (len(input_items), sum(_text_size(item) for item in input_items))
+        return ResponseCreateParams(input_items=input_items, **params)
+
+    def _summary_tokens(self) -> int:
+        return int(len(self.summary) / self.chars_per_token) if self.summary else 0
+
+    async def _trim(self, window: list[Any]) -> list[Any]:
+        budget = self.max_input_tokens * self.target_ratio
+        sizes = [_text_size(item) / self.chars_per_token for item in window]
+        total = sum(sizes) + self._summary_tokens()
+        cut = 0
+        while cut < len(window) - 1 and total > budget:
+            total -= sizes[cut]
+            cut += 1
+        # 函数调用结果不能脱离对应的函数调用单独出现在窗口开头
+        while cut < len(window) - 1 and window[cut].type == "function_call_output":
+            cut += 1
+        dropped, window = window[:cut], window[cut:]
+        if dropped:
+            self.trims += 1
+            self._window_start = window[0].id if window else None
+            if self.summarizer is not None:
+                summary = self.summarizer(dropped, self.summary)
+                self.summary = await summary if inspect.isawaitable(summary) else summary
+        return window
+
+    def stats(self) -> dict[str, Any]:
+        """token 用量和首 token 延迟，分别统计托管前后的轮次"""
+
+        def median(values: list[float]) -> Optional[float]:
+            values = sorted(values)
+            return values[len(values) // 2] if values else None
+
+        turns = list(self.turns)
+        timed = [(turn.input_tokens, turn.ttft_ms) for turn in turns if turn.ttft_ms is not None]
+        slope = None
+        if len(timed) >= 2:
+            mean_x = sum(x for x, _ in timed) / len(timed)
+            mean_y = sum(y for _, y in timed) / len(timed)
+            variance = sum((x - mean_x) ** 2 for x, _ in timed)
+            if variance:
+                slope = sum((x - mean_x) * (y - mean_y) for x, y in timed) / variance * 1000
+        input_tokens = sum(turn.input_tokens for turn in turns)
+        return {
+            "turns": len(turns),
+            "managed": self.managed,
+            "trims": self.trims,
+            "last_input_tokens": self.last_input_tokens,
+            "cached_ratio": sum(turn.cached_tokens for turn in turns) / input_tokens if input_tokens else None,
+            "ttft_p50_ms_unmanaged": median([turn.ttft_ms for turn in turns if not turn.managed and turn.ttft_ms]),
+            "ttft_p50_ms_managed": median([turn.ttft_ms for turn in turns if turn.managed and turn.ttft_ms]),
+            # 输入每增加 1000 token 首 token 延迟的增量（最小二乘斜率）
+            "ttft_ms_per_1k_input_tokens": slope,
+            "chars_per_token": self.chars_per_token,
+        }
@@ -0,0 +1,338 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+from collections.abc import Iterator
+from typing import Optional
+
+from rtclient.models import (
+    AssistantMessageItem,
+    FunctionCallItem,
+    FunctionCallOutputItem,
+    InputAudioContentPart,
+    InputTextContentPart,
+    ItemCreatedMessage,
+    ItemCreateMessage,
+    ItemInputAudioTranscriptionCompletedMessage,
+    OutputTextContentPart,
+    ResponseDoneMessage,
+    ResponseFunctionCallArgumentsDoneMessage,
+    ResponseFunctionCallItem,
+    ResponseFunctionCallOutputItem,
+    ResponseMessageItem,
+    SystemMessageItem,
+    UserMessageItem,
+)
+
+_SIZED_FIELDS = ("audio", "text", "transcript", "arguments", "output")
+
+
+def _estimate_size(item) -> int:
+    """估算对话项占用的字节数，只统计可能较大的文本/音频字段"""
+    size = 64
+    for name in _SIZED_FIELDS:
+        value = getattr(item, name, None)
+        if isinstance(value, str):
+            size += len(value)
+    for part in getattr(item, "content", None) or ():
+        size += 32
+        for name in _SIZED_FIELDS:
+            value = getattr(part, name, None)
+            if isinstance(value, str):
+                size += len(value)
+    return size
+
+
+def has_audio(item) -> bool:
+    """对话项是否带有 base64 音频"""
+    return any(isinstance(part, InputAudioContentPart) and part.audio for part in getattr(item, "content", None) or ())
+
+
+def strip_audio(item):
+    """去掉对话项中的 base64 音频，保留转写文本"""
+    content = [
+        InputTextContentPart(text=part.transcript or "") if isinstance(part, InputAudioContentPart) else part
+        for part in item.content
+    ]
+    return item.model_copy(update={"content": content})
+
+
+def to_item_param(item):
+    """把服务器返回的对话项转换为 conversation.item.create 可用的 Item
+
+    服务器不会回传用户音频，input_audio 内容以其转写文本代替。
+    """
+    match item:
+        case ResponseMessageItem():
+            texts = [
+                getattr(part, "text", None) or getattr(part, "transcript", None) or "" for part in item.content or ()
+            ]
+            match item.role:
+                case "system":
+                    return SystemMessageItem(id=item.id or "", content=[InputTextContentPart(text=t) for t in texts])
+                case "assistant":
+                    return AssistantMessageItem(
+                        id=item.id or "", content=[OutputTextContentPart(text=t) for t in texts]
+                    )
+                case _:
+                    return UserMessageItem(id=item.id or "", content=[InputTextContentPart(text=t) for t in texts])
+        case ResponseFunctionCallItem():
+            return FunctionCallItem(id=item.id or "", name=item.name, call_id=item.call_id, arguments=item.arguments)
+        case ResponseFunctionCallOutputItem():
+            return FunctionCallOutputItem(id=item.id or "", call_id=item.call_id, output=item.output)
+    return item
+
+
+class _Node:
+    __slots__ = ("item", "prev", "next", "response_id", "size")
+
+    def __init__(self, item, response_id: Optional[str]):
+        self.item = item
+        self.prev: Optional[str] = None
+        self.next: Optional[str] = None
+        self.response_id = response_id
+        self.size = _estimate_size(item)
+
+
+class ConversationStore:
+    """本地对话状态镜像
+
+    随服务器事件维护对话项，按 previous_item_id 保持顺序（双向链表），并建立
+    item id、response id、call_id 索引，查找为 O(1)，重连回放为 O(n)。
+
+    超出内存预算时先从最早的对话项开始丢弃 base64 音频（保留转写），
+    仍然超出时再淘汰最早的对话项。
+    """
+
+    def __init__(self, max_bytes: Optional[int] = 16 * 1024 * 1024, max_items: Optional[int] = None):
+        """初始化对话存储
+
+        Args:
+            max_bytes: 内存预算（估算字节数），None 表示不限制
+            max_items: 最多保留的对话项数，None 表示不限制
+        """
+        self._max_bytes = max_bytes
+        self._max_items = max_items
+        self._nodes: dict[str, _Node] = {}
+        self._head: Optional[str] = None
+        self._tail: Optional[str] = None
+        self._by_response: dict[str, dict[str, None]] = {}
+        self._by_call: dict[str, dict[str, None]] = {}
+        self._audio_ids: dict[str, None] = {}
+        self._size = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._nodes
+
+    def __iter__(self) -> Iterator:
+        node_id = self._head
+        while node_id is not None:
+            node = self._nodes[node_id]
+            yield node.item
+            node_id = node.next
+
+    @property
+    def size(self) -> int:
+        """当前估算占用的字节数"""
+        return self._size
+
+    def handle(self, message):
+        """处理一条服务器消息，非对话相关的消息会被忽略"""
+        match message:
+            case ItemCreatedMessage():
+                if message.item.id:
+                    self.put(message.item, previous_item_id=message.previous_item_id)
+            case ItemInputAudioTranscriptionCompletedMessage():
+                self._set_transcript(message.item_id, message.content_index or 0, message.transcript)
+            case ResponseFunctionCallArgumentsDoneMessage():
+                item = ResponseFunctionCallItem(
+                    id=message.item_id or None,
+                    status="completed",
+                    name=message.name,
+                    call_id=message.call_id,
+                    arguments=message.arguments,
+                )
+                if item.id:
+                    self.put(item, response_id=message.response_id)
+            case ResponseDoneMessage():
+                for item in message.response.output or ():
+                    if item.id:
+                        self.put(item, response_id=message.response.id)
+
+    def handle_sent(self, message: ItemCreateMessage):
+        """记录客户端发出的 conversation.item.create
+
+        没有 id 的对话项由服务器分配 id，等 conversation.item.created 回来再记录。
+        """
+        if message.item.id:
+            self.put(message.item, previous_item_id=message.previous_item_id)
+
+    def put(self, item, previous_item_id: Optional[str] = None, response_id: Optional[str] = None):
+        """插入或更新对话项
+
+        已存在的对话项原位替换，previous_item_id 变化时移到新位置，旧的 call_id 索引随之移除；
+        新对话项插在 previous_item_id 之后，previous_item_id 为空或已被淘汰时追加到末尾。
+        对话项必须带 id。
+        """
+        if not item.id:
+            raise ValueError("对话项缺少 id，无法存入 ConversationStore")
+        node = self._nodes.get(item.id)
+        if node is not None:
+            old_call_id = getattr(node.item, "call_id", None)
+            if old_call_id and old_call_id != getattr(item, "call_id", None):
+                self._unindex(self._by_call, old_call_id, item.id)
+            moved = previous_item_id not in (None, "", node.prev, item.id)
+            if moved and previous_item_id in self._nodes:
+                # 服务器调整了对话项的位置，按新的 previous_item_id 重新链接
+                self._unlink(node)
+                self._link(item.id, node, previous_item_id)
+            self._size -= node.size
+            node.item = item
+            node.size = _estimate_size(item)
+            self._size += node.size
+            if response_id and node.response_id != response_id:
+                self._unindex(self._by_response, node.response_id, item.id)
+                node.response_id = response_id
+                self._by_response.setdefault(response_id, {})[item.id] = None
+        else:
+            node = self._nodes[item.id] = _Node(item, response_id)
+            self._size += node.size
+            self._link(item.id, node, previous_item_id)
+            if response_id:
+                self._by_response.setdefault(response_id, {})[item.id] = None
+
+        call_id = getattr(item, "call_id", None)
+        if call_id:
+            self._by_call.setdefault(call_id, {})[item.id] = None
+        if has_audio(item):
+            self._audio_ids[item.id] = None
+        else:
+            self._audio_ids.pop(item.id, None)
+        self._enforce_budget()
+
+    def get(self, item_id: str):
+        node = self._nodes.get(item_id)
+        return node.item if node else None
+
+    def previous_id(self, item_id: str) -> Optional[str]:
+        node = self._nodes.get(item_id)
+        return node.prev if node else None
+
+    def by_response(self, response_id: str) -> list:
+        """返回某个响应产生的对话项"""
+        return [self._nodes[i].item for i in self._by_response.get(response_id, ())]
+
+    def function_call(self, call_id: str):
+        """按 call_id 查找函数调用项"""
+        for item_id in self._by_call.get(call_id, ()):
+            if self._nodes[item_id].item.type == "function_call":
+                return self._nodes[item_id].item
+        return None
+
+    def function_call_output(self, call_id: str):
+        """按 call_id 查找函数调用结果项"""
+        for item_id in self._by_call.get(call_id, ()):
+            if self._nodes[item_id].item.type == "function_call_output":
+                return self._nodes[item_id].item
+        return None
+
+    def remove(self, item_id: str):
+        node = self._nodes.pop(item_id, None)
+        if node is None:
+            return
+        self._unlink(node)
+        self._size -= node.size
+        self._unindex(self._by_response, node.response_id, item_id)
+        self._unindex(self._by_call, getattr(node.item, "call_id", None), item_id)
+        self._audio_ids.pop(item_id, None)
+
+    def clear(self):
+        self._nodes.clear()
+        self._by_response.clear()
+        self._by_call.clear()
+        self._audio_ids.clear()
+        self._head = self._tail = None
+        self._size = 0
+
+    def replay(self) -> list[ItemCreateMessage]:
+        """按对话顺序生成重连后重建上下文所需的 conversation.item.create 消息"""
+        messages = []
+        previous_item_id = None
+        for item in self:
+            param = to_item_param(item)
+            messages.append(ItemCreateMessage(previous_item_id=previous_item_id, item=param))
+            previous_item_id = param.id or previous_item_id
+        return messages
+
+    def compact(self, target_bytes: Optional[int] = None):
+        """丢弃最早对话项中的音频，直到估算大小不超过 target_bytes（默认全部丢弃）"""
+        for item_id in list(self._audio_ids):
+            if target_bytes is not None and self._size <= target_bytes:
+                return
+            node = self._nodes[item_id]
+            self._size -= node.size
+            node.item = strip_audio(node.item)
+            node.size = _estimate_size(node.item)
+            self._size += node.size
+            del self._audio_ids[item_id]
+
+    def _enforce_budget(self):
+        if self._max_bytes is not None and self._size > self._max_bytes:
+            self.compact(self._max_bytes)
+        while self._head is not None and (
+            (self._max_bytes is not None and self._size > self._max_bytes)
+            or (self._max_items is not None and len(self._nodes) > self._max_items)
+        ):
+            if self._head == self._tail:
+                break
+            self.remove(self._head)
+            self.evicted += 1
+
+    def _unlink(self, node: _Node):
+        if node.prev is not None:
+            self._nodes[node.prev].next = node.next
+        else:
+            self._head = node.next
+        if node.next is not None:
+            self._nodes[node.next].prev = node.prev
+        else:
+            self._tail = node.prev
+        node.prev = node.next = None
+
+    def _link(self, item_id: str, node: _Node, previous_item_id: Optional[str]):
+        prev = self._nodes.get(previous_item_id) if previous_item_id else None
+        if prev is None or previous_item_id == self._tail:
+            node.prev = self._tail
+            if self._tail is not None:
+                self._nodes[self._tail].next = item_id
+            else:
+                self._head = item_id
+            self._tail = item_id
+            return
+        node.prev = previous_item_id
+        node.next = prev.next
+        self._nodes[prev.next].prev = item_id
+        prev.next = item_id
+
+    def _set_transcript(self, item_id: Optional[str], content_index: int, transcript: Optional[str]):
+        node = self._nodes.get(item_id)
+        content = getattr(node.item, "content", None) if node else None
+        if not content or content_index >= len(content) or not hasattr(content[content_index], "transcript"):
+            return
+        content = list(content)
+        content[content_index] = content[content_index].model_copy(update={"transcript": transcript})
+        self.put(node.item.model_copy(update={"content": content}))
+
+    @staticmethod
+    def _unindex(index: dict[str, dict[str, None]], key: Optional[str], item_id: str):
+        if not key:
+            return
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.pop(item_id, None)
+        if not ids:
+            del index[key]
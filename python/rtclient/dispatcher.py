@@ -0,0 +1,224 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+ANY_EVENT = "*"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EventHandler:
+    """已注册的事件处理函数"""
+
+    event_type: str
+    func: Callable[[Any], Any]
+    is_async: bool
+    timeout: Optional[float]
+
+
+def _field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+class LaneOverflow(Exception):
+    """通道中排队的消息数已达上限，处理速度跟不上服务端输出"""
+
+
+def _lane(message: Any, msg_type: str) -> str:
+    # response.created / response.done 等生命周期事件不带 response_id，ID 在 response.id 中
+    response_id = _field(message, "response_id")
+    if response_id is None:
+        response_id = _field(_field(message, "response"), "id")
+    return response_id or msg_type
+
+
+def _log_error(error: BaseException, message: Any, handler: EventHandler):
+    name = getattr(handler.func, "__qualname__", handler.func)
+    logger.error("事件处理失败: %s -> %s", handler.event_type, name, exc_info=error)
+
+
+class EventDispatcher:
+    """按事件类型分发服务器消息
+
+    处理函数按事件类型注册在字典中，每条消息只查一次表，不再逐个比较 msg_type；
+    run() 直接迭代客户端，不需要为每次接收创建 wait_for 定时器。
+
+    concurrent 为 False 时在接收循环中依次执行处理函数。为 True 时按顺序通道并发执行：
+    属于某个响应的事件（带 response_id，或者像 response.created / response.done 那样带
+    response.id）按响应分通道，其余事件按事件类型分通道。同一通道内的事件按到达顺序逐条处理
+    （同一响应的 created、delta、done 依次处理），不同通道之间互不等待，接收循环只负责入队，
+    不会被处理函数阻塞。每个通道最多排队 max_queue 条消息，超出的消息被丢弃并以 LaneOverflow
+    交给 on_error，丢弃数和排队峰值计入 stats()。
+
+    处理函数抛出的异常和超时交给 on_error，不会中断接收循环。
+    """
+
+    def __init__(
+        self,
+        concurrent: bool = False,
+        default_timeout: Optional[float] = None,
+        on_error: Optional[Callable[[BaseException, Any, EventHandler], Any]] = None,
+        max_queue: int = 1024,
+    ):
+        """初始化分发器
+
+        Args:
+            concurrent: 是否按通道并发执行处理函数
+            default_timeout: 异步处理函数的默认超时（秒），None 表示不限制；同步处理函数不设超时
+            on_error: 可选，处理函数失败或超时时调用，参数为 (异常, 消息, 处理函数)，默认写入 rtclient.dispatcher 日志
+            max_queue: 并发模式下每个通道排队消息数的上限
+        """
+        self.concurrent = concurrent
+        self.default_timeout = default_timeout
+        self.on_error = on_error or _log_error
+        self.max_queue = max_queue
+        self._handlers: dict[str, list[EventHandler]] = {}
+        # 事件类型 -> 该类型的处理函数加上通配处理函数，注册时重建
+        self._routes: dict[str, tuple[EventHandler, ...]] = {}
+        self._wildcard: tuple[EventHandler, ...] = ()
+        # 通道 -> 待处理的消息；通道处理完后删除，已结束的响应不会残留
+        self._lanes: dict[str, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.dispatched = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.dropped = 0
+        self.max_queued = 0
+
+    def register(self, event_type: str, func: Callable[[Any], Any], *, timeout: Optional[float] = ...):
+        """注册处理函数
+
+        Args:
+            event_type: 事件类型，例如 response.audio.delta；"*" 表示所有事件
+            func: 以消息为参数的同步或异步函数，同一事件类型的多个处理函数按注册顺序执行
+            timeout: 超时（秒），默认使用 default_timeout，None 表示不限制
+        """
+        handler = EventHandler(
+            event_type=event_type,
+            func=func,
+            is_async=inspect.iscoroutinefunction(func),
+            timeout=self.default_timeout if timeout is ... else timeout,
+        )
+        self._handlers.setdefault(event_type, []).append(handler)
+        self._wildcard = tuple(self._handlers.get(ANY_EVENT, ()))
+        self._routes = {
+            name: tuple(handlers) + self._wildcard for name, handlers in self._handlers.items() if name != ANY_EVENT
+        }
+
+    def on(self, event_type: str, **options):
+        """以装饰器形式注册处理函数，参数同 register()"""
+
+        def decorator(func):
+            self.register(event_type, func, **options)
+            return func
+
+        return decorator
+
+    async def dispatch(self, message: Any):
+        """分发一条消息；并发模式下只入队，立即返回"""
+        if message is None:
+            return
+        msg_type = _field(message, "type")
+        handlers = self._routes.get(msg_type, self._wildcard)
+        if not handlers:
+            return
+        self.dispatched += 1
+        if not self.concurrent:
+            for handler in handlers:
+                await self._call(handler, message)
+            return
+        lane = _lane(message, msg_type)
+        queue = self._lanes.get(lane)
+        if queue is not None:
+            if len(queue) >= self.max_queue:
+                self.dropped += 1
+                error = LaneOverflow(f"通道 {lane} 排队的消息数已达上限 {self.max_queue}")
+                await self._report(error, message, handlers[0])
+                return
+            queue.append((handlers, message))
+            self.max_queued = max(self.max_queued, len(queue))
+            return
+        self._lanes[lane] = deque([(handlers, message)])
+        task = asyncio.create_task(self._drain(lane))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self, client):
+        """持续接收并分发消息，连接关闭后等待进行中的处理函数完成"""
+        try:
+            async for message in client:
+                await self.dispatch(message)
+        finally:
+            await self.join()
+
+    async def join(self):
+        """等待所有通道处理完毕"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def aclose(self):
+        """取消所有通道中尚未处理的消息"""
+        for task in list(self._tasks):
+            task.cancel()
+        await self.join()
+        self._lanes.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """分发计数、错误数、超时数、丢弃数，以及当前通道数、排队消息数和单个通道的排队峰值"""
+        return {
+            "dispatched": self.dispatched,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "dropped": self.dropped,
+            "max_queued": self.max_queued,
+            "lanes": len(self._lanes),
+            "queued": sum(len(queue) for queue in self._lanes.values()),
+        }
+
+    async def _drain(self, lane: str):
+        queue = self._lanes[lane]
+        try:
+            while queue:
+                handlers, message = queue[0]
+                for handler in handlers:
+                    await self._call(handler, message)
+                queue.popleft()
+        finally:
+            self._lanes.pop(lane, None)
+
+    async def _call(self, handler: EventHandler, message: Any):
+        try:
+            if not handler.is_async:
+                result = handler.func(message)
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, handler.timeout)
+            elif handler.timeout is None:
+                await handler.func(message)
+            else:
+                await asyncio.wait_for(handler.func(message), handler.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, TimeoutError):
+                self.timeouts += 1
+            else:
+                self.errors += 1
+            await self._report(e, message, handler)
+
+    async def _report(self, error: BaseException, message: Any, handler: EventHandler):
+        try:
+            result = self.on_error(error, message, handler)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("on_error 处理失败")
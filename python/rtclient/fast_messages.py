@@ -0,0 +1,76 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+"""
+高频客户端消息的免校验构造
+
+SDK 自己拼出来的消息不需要再走一遍 pydantic 校验和 ModelWithDefaults 的默认值回填，
+这里用 model_construct 直接构造。序列化结果（包括 exclude_unset 时）与正常构造完全一致，
+但调用方需要保证传入的值类型正确，例如 audio 必须是 base64 字符串。
+"""
+
+from typing import Any, Optional
+
+from rtclient.models import (
+    ClientMessageBase,
+    InputAudioBufferAppendMessage,
+    InputAudioBufferClearMessage,
+    InputAudioBufferCommitMessage,
+    InputVideoFrameAppendMessage,
+    ResponseCancelMessage,
+    ResponseCreateMessage,
+    ResponseCreateParams,
+)
+
+# 正常构造时 _add_defaults 会对默认值非 None 的字段重新赋值，这些字段因此总是计入 model_fields_set
+_DEFAULT_FIELDS: dict[type, frozenset[str]] = {}
+
+
+def _construct(cls: type[ClientMessageBase], event_id: str, client_timestamp: Optional[int], **values) -> Any:
+    # 不做成泛型：PEP 695 语法要求 Python 3.12，而包仍支持 3.10；返回类型由各个公开函数声明
+    default_fields = _DEFAULT_FIELDS.get(cls)
+    if default_fields is None:
+        default_fields = _DEFAULT_FIELDS[cls] = frozenset(
+            name for name, field in cls.model_fields.items() if field.default is not None
+        )
+    values["event_id"] = event_id
+    values["client_timestamp"] = client_timestamp
+    fields_set = set(default_fields)
+    fields_set.update(name for name, value in values.items() if value is not None)
+    return cls.model_construct(fields_set, **values)
+
+
+def audio_append(
+    audio: str, event_id: str = "", client_timestamp: Optional[int] = None
+) -> InputAudioBufferAppendMessage:
+    """input_audio_buffer.append，audio 为 base64 编码的音频"""
+    return _construct(InputAudioBufferAppendMessage, event_id, client_timestamp, audio=audio)
+
+
+def video_frame_append(
+    video_frame: str, event_id: str = "", client_timestamp: Optional[int] = None
+) -> InputVideoFrameAppendMessage:
+    """input_audio_buffer.append_video_frame，video_frame 为 base64 编码的图片"""
+    return _construct(InputVideoFrameAppendMessage, event_id, client_timestamp, video_frame=video_frame)
+
+
+def audio_commit(event_id: str = "", client_timestamp: Optional[int] = None) -> InputAudioBufferCommitMessage:
+    """input_audio_buffer.commit"""
+    return _construct(InputAudioBufferCommitMessage, event_id, client_timestamp)
+
+
+def audio_clear(event_id: str = "", client_timestamp: Optional[int] = None) -> InputAudioBufferClearMessage:
+    """input_audio_buffer.clear"""
+    return _construct(InputAudioBufferClearMessage, event_id, client_timestamp)
+
+
+def response_create(
+    response: Optional[ResponseCreateParams] = None, event_id: str = "", client_timestamp: Optional[int] = None
+) -> ResponseCreateMessage:
+    """response.create，response 需要是已经构造好的 ResponseCreateParams"""
+    return _construct(ResponseCreateMessage, event_id, client_timestamp, response=response)
+
+
+def response_cancel(event_id: str = "", client_timestamp: Optional[int] = None) -> ResponseCancelMessage:
+    """response.cancel"""
+    return _construct(ResponseCancelMessage, event_id, client_timestamp)
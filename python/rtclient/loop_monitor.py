@@ -0,0 +1,84 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+from collections import deque
+from typing import Any, Optional
+
+
+class LoopLagMonitor:
+    """事件循环延迟监测
+
+    周期性地 sleep(interval)，实际唤醒时间比预期晚多少即为事件循环被阻塞的时长。
+    用于观察大消息编码、同步 handler 等操作对同一事件循环上其他会话的影响。
+    """
+
+    def __init__(self, interval: float = 0.01, stall_threshold: float = 0.05, window: int = 1000):
+        """初始化监测器
+
+        Args:
+            interval: 采样间隔（秒）
+            stall_threshold: 延迟超过该值（秒）计为一次卡顿
+            window: 用于计算分位数的最近样本数
+        """
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self._samples: deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    def start(self):
+        """在当前事件循环中开始采样，重复调用无副作用"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def reset(self):
+        self._samples.clear()
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._samples.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.stall_threshold:
+                self.stalls += 1
+
+    def stats(self) -> dict[str, Any]:
+        """最近窗口内的延迟分位数（毫秒），以及启动以来的最大延迟和卡顿次数"""
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        return {
+            "samples": len(samples),
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": self.max_lag * 1000,
+            "stalls": self.stalls,
+        }
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
@@ -1,16 +1,101 @@
 # Copyright (c) ZhiPu Corporation.
 # Licensed under the MIT License.
 
+import asyncio
+import base64
+import contextlib
+import itertools
 import json
+import threading
 import uuid
 from collections.abc import AsyncIterator
-from typing import Any, Optional
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 from aiohttp import ClientSession, WSMsgType, WSServerHandshakeError
 
-from rtclient.models import ServerMessageType, UserMessageType, create_message_from_dict
 from rtclient.util.user_agent import get_user_agent
 
+# 可选功能在用到时才导入，from rtclient import RTLowLevelClient 不会连带导入 models、共享内存、进程池等模块
+if TYPE_CHECKING:
+    from rtclient.audio_ring import SharedAudioRing
+    from rtclient.audio_stream import BytesLike, PcmFormat
+    from rtclient.models import ServerMessageType, Session, SessionUpdateParams, UserMessageType
+    from rtclient.pacing import PacingScheduler
+    from rtclient.rate_control import RateController
+    from rtclient.response_stream import OverflowPolicy, ResponseStream, ResponseStreams
+    from rtclient.timing import LatencyTracker
+    from rtclient.util.token import TokenProvider
+
+
+def encode_message(message: Union["UserMessageType", dict[str, Any]]) -> str:
+    """把消息序列化为要发送的 JSON 文本"""
+    if hasattr(message, 'model_dump_json'):
+        return message.model_dump_json()
+    return json.dumps(message)
+
+
+def estimate_payload_size(message: Any, depth: int = 4) -> int:
+    """粗略估计消息序列化后的大小，只统计字符串和字节串字段的长度"""
+    if isinstance(message, (str, bytes, bytearray)):
+        return len(message)
+    if depth == 0:
+        return 0
+    if isinstance(message, dict):
+        values = message.values()
+    elif isinstance(message, (list, tuple)):
+        values = message
+    elif hasattr(message, "__dict__"):
+        values = message.__dict__.values()
+    else:
+        return 0
+    return sum(estimate_payload_size(value, depth - 1) for value in values)
+
+
+DEFAULT_OFFLOAD_THRESHOLD = 1024 * 1024
+
+
+class _LazyProcessPool(Executor):
+    """第一次提交任务时才创建的进程池"""
+
+    def __init__(self, max_workers: int):
+        self._max_workers = max_workers
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("进程池已关闭")
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # 调用方进程中已有事件循环和其他线程，fork 出的子进程可能继承到被占用的锁
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                context = multiprocessing.get_context(method)
+                self._pool = ProcessPoolExecutor(self._max_workers, mp_context=context)
+            pool = self._pool
+        return pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            pool = self._pool
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def create_encode_executor(max_workers: int = 2) -> Executor:
+    """创建序列化大消息用的进程池
+
+    序列化全程持有 GIL，线程池不能缩短事件循环的停顿，因此使用进程池，以 forkserver
+    （不支持时为 spawn）方式启动工作进程。进程池在第一次提交任务时才真正创建，多个客户端
+    可以共用一个，由创建方负责 shutdown()。
+    """
+    return _LazyProcessPool(max_workers)
+
 
 class ConnectionError(Exception):
     def __init__(self, message: str, headers=None):
@@ -24,6 +109,11 @@ class RTLowLevelClient:
         url: str,
         headers: Optional[dict[str, str]] = None,
         params: Optional[dict[str, Any]] = None,
+        token_provider: Optional["TokenProvider"] = None,
+        offload_threshold: Optional[int] = DEFAULT_OFFLOAD_THRESHOLD,
+        encode_executor: Optional[Executor] = None,
+        timing: Optional["LatencyTracker"] = None,
+        rate_controller: Optional["RateController"] = None,
     ):
         """初始化WebSocket客户端
 
@@ -31,13 +121,45 @@ class RTLowLevelClient:
             url: WebSocket服务器地址
             headers: 请求头
             params: URL参数
+            token_provider: 可选，JWT 令牌提供者，建连时用缓存的令牌生成 Authorization 请求头
+            offload_threshold: 估计大小超过该字节数（默认 1MB）的消息放到 encode_executor 中序列化，
+                None 表示总是在事件循环上序列化
+            encode_executor: 可选，序列化大消息使用的执行器，由调用方负责关闭；默认在第一次需要时
+                用 create_encode_executor() 创建本客户端自己的进程池，close() 时关闭
+            timing: 可选，延迟统计；设置后发出的消息自动补上 client_timestamp，收发事件和 RTT 计入统计
+            rate_controller: 可选，码率控制器。连接后在后台运行 rate_controller.run(client) 定期采样
+                写缓冲区和 RTT，每次发送的耗时计入出站等待时间；send_audio 的默认分片时长和
+                send_video_frame 的帧率使用它的当前决策
+
+        设置了 timing 或 rate_controller 时关闭 aiohttp 的 autoping，由 recv() 回复服务端 ping 并
+        处理 ping() 的 pong；否则保持 aiohttp 默认的 ping 处理，ping() 不可用。
         """
         self._url = url
         self._headers = headers or {}
+        self._token_provider = token_provider
+        self._token_started = False
         self._params = params or {}
         self._session = ClientSession()
         self.request_id: Optional[uuid.UUID] = None
         self.ws = None
+        self.last_rtt: Optional[float] = None
+        self.last_message_size = 0
+        self._ping_ids = itertools.count()
+        self._pings: dict[bytes, tuple[asyncio.Future, float]] = {}
+        from rtclient.session import SessionUpdater
+
+        self._session_updater = SessionUpdater(self)
+        self.offload_threshold = offload_threshold
+        self._encode_executor = encode_executor
+        self._owns_encode_executor = encode_executor is None
+        self.offloaded_messages = 0
+        self.timing = timing
+        self.rate_controller = rate_controller
+        self._rate_task: Optional[asyncio.Task] = None
+        self._last_video_frame: Optional[float] = None
+        # 第一次调用 response_stream() 时创建
+        self._response_streams: Optional[ResponseStreams] = None
+        self.input_pcm_format: Optional[PcmFormat] = None
 
     async def connect(self):
         """连接到WebSocket服务器"""
@@ -47,27 +169,233 @@ class RTLowLevelClient:
                 "User-Agent": get_user_agent(),
                 **self._headers
             }
+            if self._token_provider is not None:
+                if not self._token_started:
+                    self._token_provider.start()
+                    self._token_started = True
+                headers["Authorization"] = f"Bearer {self._token_provider.get_token()}"
             self.ws = await self._session.ws_connect(
                 self._url,
                 headers=headers,
-                params=self._params
+                params=self._params,
+                autoping=not self.measures_rtt,
             )
+            if self.rate_controller is not None:
+                self._rate_task = asyncio.create_task(self.rate_controller.run(self))
         except WSServerHandshakeError as e:
+            await self._stop_token_provider()
             await self._session.close()
             error_message = f"连接服务器失败，状态码: {e.status}"
             raise ConnectionError(error_message, e.headers) from e
 
-    async def send(self, message: UserMessageType | dict[str, Any]):
+    async def send(self, message: Union["UserMessageType", dict[str, Any]]):
         """发送消息到服务器
 
         Args:
             message: 要发送的消息，可以是 UserMessageType 或 dict
         """
-        if hasattr(message, 'model_dump_json'):
-            message_data = message.model_dump_json()
+        await self._send_text(await self.encode(message))
+
+    async def encode(self, message: Union["UserMessageType", dict[str, Any]]) -> str:
+        """按消息大小选择序列化位置
+
+        估计大小超过 offload_threshold 的消息（例如整段录音）放到 encode_executor 中序列化，
+        避免长时间阻塞同一事件循环上的其他会话，其余消息直接在事件循环上序列化。pydantic 序列化、
+        json 和 base64 在执行期间都持有 GIL，放到线程池中并不能缩短事件循环的停顿，因此默认使用
+        进程池，消息需要可以被 pickle。
+
+        放到执行器中的消息要多等一次跨进程往返：其他任务在此期间调用 send() 发出的消息可能先到达
+        服务端。需要保证顺序的消息应当在同一个任务中依次 await send()，或者交给 SessionManager
+        的发送队列。
+        """
+        if self.timing is not None:
+            from rtclient.timing import stamp
+
+            message = stamp(message, self.timing.clock)
+            self.timing.on_send(message)
+        if self.offload_threshold is None or estimate_payload_size(message) < self.offload_threshold:
+            return encode_message(message)
+        self.offloaded_messages += 1
+        if self._encode_executor is None:
+            self._encode_executor = create_encode_executor()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._encode_executor, encode_message, message)
+
+    async def send_str(self, data: str):
+        """发送已经序列化好的消息文本
+
+        Args:
+            data: JSON 文本，例如 PreparedSessionUpdate.frame() 的结果
+        """
+        await self._send_text(data)
+
+    async def _send_text(self, data: str):
+        if self.rate_controller is None:
+            await self.ws.send_str(data)
+            return
+        # 写缓冲区超过上限时 send_str 会等待 drain，这段等待就是出站队列的积压
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await self.ws.send_str(data)
+        self.rate_controller.observe_queue_delay(loop.time() - started)
+
+    def use_pcm_input(self, pcm_format: Optional["PcmFormat"] = None) -> asyncio.Future:
+        """切换为原始 PCM 输入
+
+        通过 session.update 把 input_audio_format 设为 pcm，之后 send_audio、send_pcm 和
+        send_audio_from 发送不带 WAV 文件头的 PCM 帧，每帧节省 44 字节文件头的拼接和 base64 编码，
+        服务端也不再需要逐条解析文件头。
+
+        协议中没有声明 PCM 采样率和位深的字段，pcm_format 是客户端一侧的约定：发送的音频必须
+        与服务端对 pcm 输入的假定一致（默认 16kHz 16bit 单声道），SDK 据此校验每一帧按采样帧对齐。
+
+        Args:
+            pcm_format: 发送的 PCM 格式，默认 16kHz 16bit 单声道
+
+        Returns:
+            session.updated 确认后完成的 Future
+        """
+        from rtclient.audio_stream import PcmFormat
+        from rtclient.models import SessionUpdateParams
+
+        self.input_pcm_format = pcm_format or PcmFormat()
+        return self.update_session(SessionUpdateParams(input_audio_format="pcm"))
+
+    async def send_pcm(self, frame: "BytesLike"):
+        """在 PCM 输入模式下发送一帧原始 PCM
+
+        Args:
+            frame: bytes、memoryview 或 numpy 数组等支持缓冲区协议的对象，长度必须是采样帧大小的整数倍
+        """
+        if self.input_pcm_format is None:
+            raise RuntimeError("未启用 PCM 输入，请先调用 use_pcm_input()")
+        from rtclient.fast_messages import audio_append
+
+        view = memoryview(frame).cast("B")
+        if len(view) % self.input_pcm_format.block_align:
+            raise ValueError(f"PCM 帧大小 {len(view)} 不是采样帧大小 {self.input_pcm_format.block_align} 的整数倍")
+        await self.send(audio_append(base64.b64encode(view).decode("ascii")))
+
+    async def send_audio(
+        self,
+        audio: bytes,
+        chunk_ms: Optional[float] = None,
+        pcm_format: Optional["PcmFormat"] = None,
+        pace: bool = False,
+        speed: float = 1.0,
+        scheduler: Optional["PacingScheduler"] = None,
+    ) -> int:
+        """把任意长度的音频切分为固定时长的片段依次发送 input_audio_buffer.append
+
+        WAV 文件头只解析一次，片段按采样帧对齐。每发送一片都会让出事件循环，其他任务发送的
+        response.cancel、input_audio_buffer.clear 等控制消息最多只需等待一个片段；
+        取消正在执行 send_audio 的任务即可停止发送剩余片段。
+
+        Args:
+            audio: WAV 文件内容，或格式为 pcm_format 的原始 PCM
+            chunk_ms: 每个片段的时长（毫秒），默认使用 rate_controller 当前的 audio_chunk_ms，
+                没有 rate_controller 时为 100
+            pcm_format: 原始 PCM 的格式；传入 WAV 时以文件头为准。PCM 输入模式下默认使用
+                use_pcm_input() 声明的格式，片段不带文件头
+            pace: 是否按音频时长实时发送，模拟麦克风输入
+            speed: pace 为 True 时的播放倍速，大于 1 时快于实时
+            scheduler: pace 为 True 时使用的 PacingScheduler，默认使用当前事件循环共享的调度器
+
+        Returns:
+            发送的片段数
+        """
+        from rtclient.audio_stream import split_audio
+        from rtclient.fast_messages import audio_append
+
+        if chunk_ms is None:
+            chunk_ms = self.rate_controller.decision.audio_chunk_ms if self.rate_controller is not None else 100
+        if self.input_pcm_format is None:
+            chunker, pcm = split_audio(audio, chunk_ms, pcm_format)
         else:
-            message_data = json.dumps(message)
-        await self.ws.send_str(message_data)
+            chunker, pcm = split_audio(audio, chunk_ms, pcm_format or self.input_pcm_format, wav=False)
+        messages = (audio_append(chunk) for chunk in chunker.chunks(pcm))
+        if pace:
+            if scheduler is None:
+                from rtclient.pacing import PacingScheduler
+
+                scheduler = PacingScheduler.for_loop()
+            interval_ms = chunker.pcm_format.duration_ms(chunker.chunk_bytes)
+            stream = scheduler.add(messages, self.send, interval_ms, speed=speed)
+            try:
+                return await stream
+            except asyncio.CancelledError:
+                stream.cancel()
+                raise
+        sent = 0
+        for message in messages:
+            await self.send(message)
+            sent += 1
+            await asyncio.sleep(0)
+        return sent
+
+    async def send_audio_from(
+        self, ring: "SharedAudioRing", poll_interval: float = 0.005, pcm_format: Optional["PcmFormat"] = None
+    ) -> int:
+        """从共享内存环形缓冲区逐帧读取原始 PCM 并发送 input_audio_buffer.append
+
+        PCM 输入模式下 base64 编码直接读取共享内存中的帧，不做额外复制；wav 输入模式下
+        每帧都要是完整的 WAV，因此按 pcm_format 加上文件头。生产者 close() 且缓冲区读完后返回。
+
+        Args:
+            ring: 采集进程写入的 SharedAudioRing，每帧为整数个采样帧的原始 PCM
+            poll_interval: 缓冲区为空时的轮询间隔（秒）
+            pcm_format: wav 输入模式下帧的音频格式，默认 16kHz 16bit 单声道；PCM 输入模式下
+                使用 use_pcm_input() 声明的格式
+
+        Returns:
+            发送的帧数
+        """
+        from rtclient.audio_stream import AudioChunker, PcmFormat
+        from rtclient.fast_messages import audio_append
+
+        chunker = None
+        if self.input_pcm_format is None:
+            pcm_format = pcm_format or PcmFormat()
+            # 帧都是整数个采样帧，片段上限取槽位能容纳的最大整帧长度
+            frame_bytes = ring.slot_size - ring.slot_size % pcm_format.block_align
+            if not frame_bytes:
+                raise ValueError(f"槽位大小 {ring.slot_size} 小于采样帧大小 {pcm_format.block_align}")
+            chunker = AudioChunker(pcm_format, pcm_format.duration_ms(frame_bytes))
+        sent = 0
+        # 发送出错或被取消时及时关闭生成器，释放它持有的共享内存视图
+        async with contextlib.aclosing(ring.frames(poll_interval)) as frames:
+            async for frame in frames:
+                if chunker is None:
+                    await self.send_pcm(frame)
+                else:
+                    await self.send(audio_append(chunker.encode(frame)))
+                sent += 1
+        return sent
+
+    async def send_video_frame(self, video_frame: str, client_timestamp: Optional[int] = None) -> bool:
+        """发送一帧视频 input_audio_buffer.append_video_frame
+
+        设置了 rate_controller 时按其当前的 video_fps 限流：距上一次发出的帧不足 video_interval_ms
+        的帧直接丢弃。JPEG 质量由生成帧的一方读取 rate_controller.decision.jpeg_quality，
+        例如以同一个 rate_controller 创建的 VideoPreprocessor。
+
+        Args:
+            video_frame: base64 编码的图片
+            client_timestamp: 可选，客户端时间戳（毫秒）
+
+        Returns:
+            是否发出了该帧
+        """
+        if self.rate_controller is not None:
+            now = asyncio.get_running_loop().time()
+            interval = self.rate_controller.decision.video_interval_ms / 1000
+            if self._last_video_frame is not None and now - self._last_video_frame < interval:
+                return False
+            self._last_video_frame = now
+        from rtclient.fast_messages import video_frame_append
+
+        await self.send(video_frame_append(video_frame, client_timestamp=client_timestamp))
+        return True
 
     async def send_json(self, message: dict[str, Any]):
         """发送JSON消息到服务器
@@ -77,23 +405,122 @@ class RTLowLevelClient:
         """
         await self.ws.send_json(message)
 
-    async def recv(self) -> Optional[ServerMessageType]:
+    async def recv(self) -> Optional["ServerMessageType"]:
         """接收服务器消息
 
         Returns:
             接收到的消息对象
         """
         if self.ws.closed:
+            self._close_response_streams()
             return None
         websocket_message = await self.ws.receive()
+        while websocket_message.type in (WSMsgType.PING, WSMsgType.PONG):
+            if websocket_message.type == WSMsgType.PING:
+                await self.ws.pong(websocket_message.data)
+            else:
+                self._handle_pong(websocket_message.data)
+            websocket_message = await self.ws.receive()
         if websocket_message.type == WSMsgType.TEXT:
+            self.last_message_size = len(websocket_message.data)
+            from rtclient.models import create_message_from_dict
+
             data = json.loads(websocket_message.data)
             msg = create_message_from_dict(data)
+            self._session_updater.handle(msg)
+            if self.timing is not None:
+                self.timing.handle(msg)
+            if self._response_streams is not None:
+                self._response_streams.handle(msg)
             return msg
         else:
+            self._close_response_streams()
             return None
 
-    def __aiter__(self) -> AsyncIterator[ServerMessageType]:
+    def response_stream(
+        self, response_id: Optional[str] = None, max_queue: int = 256, overflow: "OverflowPolicy" = "error"
+    ) -> "ResponseStream":
+        """订阅单个响应的事件流
+
+        async for 迭代该响应的 delta 等事件，收到 response.done 后结束；stream.audio() 只产出
+        解码后的音频，可以直接交给 RTP 发送。事件由 recv() 分发，需要有任务在持续接收消息；
+        订阅之前已经收到的事件不会补发，因此 response_id 为 None（订阅下一个响应）时
+        应在发送 response.create 之前调用。
+
+        Args:
+            response_id: 响应 ID；None 表示下一个 response.created 对应的响应
+            max_queue: 队列上限（条），入队从不阻塞接收循环
+            overflow: 队列满时的处理方式，error 结束迭代并抛出 ResponseStreamOverflow，drop_oldest 丢弃最早的事件
+        """
+        if self._response_streams is None:
+            from rtclient.response_stream import ResponseStreams
+
+            self._response_streams = ResponseStreams()
+        return self._response_streams.open(response_id, max_queue, overflow)
+
+    @property
+    def session(self) -> Optional["Session"]:
+        """服务端最近确认的会话配置"""
+        return self._session_updater.session
+
+    def update_session(self, params: "SessionUpdateParams") -> asyncio.Future:
+        """增量更新会话配置
+
+        只发送与已确认配置不同的字段，同一轮事件循环内的多次调用合并为一条 session.update。
+        返回的 Future 在对应的 session.updated 到达后完成，需要有任务在持续调用 recv()。
+        """
+        return self._session_updater.update(params)
+
+    @property
+    def measures_rtt(self) -> bool:
+        """是否由 recv() 处理 ping / pong 以测量 RTT"""
+        return self.timing is not None or self.rate_controller is not None
+
+    async def ping(self, timeout: float = 5.0) -> float:
+        """发送 WebSocket ping 并等待 pong，返回往返时延（秒）
+
+        需要以 timing 或 rate_controller 创建客户端；pong 由 recv() 处理，因此需要有任务在持续接收消息。
+        """
+        if not self.measures_rtt:
+            raise RuntimeError("ping() 需要创建客户端时传入 timing 或 rate_controller")
+        loop = asyncio.get_running_loop()
+        payload = str(next(self._ping_ids)).encode()
+        future = loop.create_future()
+        self._pings[payload] = (future, loop.time())
+        try:
+            await self.ws.ping(payload)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pings.pop(payload, None)
+
+    def _handle_pong(self, payload: bytes):
+        pending = self._pings.pop(payload, None)
+        if pending is None:
+            return
+        future, sent_at = pending
+        self.last_rtt = asyncio.get_running_loop().time() - sent_at
+        if self.timing is not None:
+            self.timing.add_rtt(self.last_rtt)
+        if self.rate_controller is not None:
+            self.rate_controller.observe_rtt(self.last_rtt)
+        if not future.done():
+            future.set_result(self.last_rtt)
+
+    @property
+    def write_buffer_size(self) -> int:
+        """底层传输层写缓冲区中尚未发出的字节数，无法获取时返回 0
+
+        aiohttp 没有公开 WebSocket 的传输层对象，这里尽力读取其内部的 writer，读取失败时不影响发送。
+        """
+        transport = getattr(getattr(self.ws, "_writer", None), "transport", None)
+        try:
+            if transport is None or transport.is_closing():
+                return 0
+            return transport.get_write_buffer_size()
+        except (AttributeError, NotImplementedError):
+            return 0
+
+    def __aiter__(self) -> AsyncIterator["ServerMessageType"]:
         return self
 
     async def __anext__(self):
@@ -104,9 +531,26 @@ class RTLowLevelClient:
 
     async def close(self):
         """关闭连接"""
+        self._close_response_streams()
+        if self._rate_task is not None:
+            self._rate_task.cancel()
+            self._rate_task = None
         if self.ws:
             await self.ws.close()
+        await self._stop_token_provider()
         await self._session.close()
+        if self._owns_encode_executor and self._encode_executor is not None:
+            self._encode_executor.shutdown(wait=False, cancel_futures=True)
+            self._encode_executor = None
+
+    def _close_response_streams(self):
+        if self._response_streams is not None:
+            self._response_streams.close()
+
+    async def _stop_token_provider(self):
+        if self._token_started:
+            self._token_started = False
+            await self._token_provider.stop()
 
     @property
     def closed(self) -> bool:
@@ -0,0 +1,387 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import inspect
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor
+from typing import Any, Optional, Union
+
+from rtclient.low_level_client import RTLowLevelClient, create_encode_executor
+from rtclient.models import ServerMessageType, UserMessageType
+from rtclient.util.token import TokenProvider
+
+OutgoingMessage = Union[UserMessageType, dict[str, Any], str]
+SessionHandler = Callable[["ManagedSession", ServerMessageType], Union[None, Awaitable[None]]]
+
+_DRAIN = object()
+
+
+class SessionLimitError(Exception):
+    """会话数已达上限或管理器正在排空，拒绝新会话"""
+
+
+class ManagedSession:
+    """由 SessionManager 管理的单个会话
+
+    每个会话有各自的读任务和写任务：读任务持续调用 recv() 并把消息交给 handler，
+    写任务从有界的发送队列中取消息发送。任一任务异常退出时关闭整个会话，
+    异常记录在 error 中，不影响同一事件循环上的其他会话。
+    """
+
+    def __init__(
+        self,
+        manager: "SessionManager",
+        session_id: str,
+        client: RTLowLevelClient,
+        handler: SessionHandler,
+        max_queue: int,
+    ):
+        self.id = session_id
+        self.client = client
+        self._manager = manager
+        self._handler = handler
+        self._outbox: asyncio.Queue = asyncio.Queue(max_queue)
+        self._tasks: list[asyncio.Task] = []
+        self._closed = asyncio.Event()
+        self.state = "open"
+        self.error: Optional[BaseException] = None
+        self.opened_at = time.monotonic()
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.send_time = 0.0
+        self.handler_time = 0.0
+        self.max_queue_delay = 0.0
+
+    async def send(self, message: OutgoingMessage):
+        """把消息放入发送队列，队列已满时等待
+
+        等待期间会话关闭（例如写任务出错退出）时抛出 RuntimeError，不会一直阻塞。
+
+        Args:
+            message: 消息模型、dict，或已经序列化好的 JSON 文本
+        """
+        self._check_open()
+        await self._put((message, time.monotonic()))
+
+    def send_nowait(self, message: OutgoingMessage):
+        """把消息放入发送队列，队列已满时抛出 asyncio.QueueFull"""
+        self._check_open()
+        self._outbox.put_nowait((message, time.monotonic()))
+
+    async def close(self, timeout: Optional[float] = None):
+        """发送完队列中已有的消息后关闭会话
+
+        Args:
+            timeout: 最长等待时间（秒），超时后丢弃剩余消息直接关闭；None 表示一直等待
+        """
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except TimeoutError:
+            self.abort()
+            await self._closed.wait()
+
+    async def _drain(self):
+        if self.state == "open":
+            self.state = "draining"
+            try:
+                await self._put(_DRAIN)
+            except RuntimeError:
+                pass
+        await self._closed.wait()
+
+    async def _put(self, item):
+        if not self._outbox.full():
+            self._outbox.put_nowait(item)
+            return
+        # 写任务退出后队列不会再被取走，等待入队的同时等待会话关闭
+        put = asyncio.ensure_future(self._outbox.put(item))
+        closed = asyncio.ensure_future(self._closed.wait())
+        try:
+            await asyncio.wait((put, closed), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not put.done():
+                put.cancel()
+        if not put.done() or put.cancelled():
+            raise RuntimeError(f"会话 {self.id} 已关闭") from self.error
+
+    def abort(self):
+        """立即关闭会话，丢弃发送队列中的消息"""
+        self.state = "closing"
+        for task in self._tasks[:2]:
+            task.cancel()
+
+    async def wait_closed(self):
+        await self._closed.wait()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    @property
+    def queued(self) -> int:
+        """发送队列中等待发送的消息数"""
+        return self._outbox.qsize()
+
+    def stats(self) -> dict[str, Any]:
+        """会话的资源占用统计
+
+        send_time 和 handler_time 是序列化发送和执行 handler 占用事件循环的时间（秒），
+        用于找出占用事件循环最多的会话；在线程池中序列化的大消息按等待时间计入。
+        """
+        return {
+            "id": self.id,
+            "state": self.state,
+            "uptime": time.monotonic() - self.opened_at,
+            "queued": self._outbox.qsize(),
+            "messages_sent": self.messages_sent,
+            "messages_received": self.messages_received,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "send_time": self.send_time,
+            "handler_time": self.handler_time,
+            "max_queue_delay": self.max_queue_delay,
+            "write_buffer": self.client.write_buffer_size,
+            "error": repr(self.error) if self.error is not None else None,
+        }
+
+    def _check_open(self):
+        writer_done = len(self._tasks) > 1 and self._tasks[1].done()
+        if self.state != "open" or writer_done:
+            raise RuntimeError(f"会话 {self.id} 已关闭") from self.error
+
+    def _start(self):
+        self._tasks = [
+            asyncio.create_task(self._read(), name=f"rtclient-read-{self.id}"),
+            asyncio.create_task(self._write(), name=f"rtclient-write-{self.id}"),
+        ]
+        self._tasks.append(asyncio.create_task(self._supervise(), name=f"rtclient-supervise-{self.id}"))
+
+    async def _read(self):
+        quantum = self._manager.quantum_bytes
+        credit = quantum
+        while True:
+            message = await self.client.recv()
+            if message is None:
+                return
+            size = self.client.last_message_size
+            self.messages_received += 1
+            self.bytes_received += size
+            started = time.perf_counter()
+            result = self._handler(self, message)
+            if inspect.isawaitable(result):
+                await result
+            self.handler_time += time.perf_counter() - started
+            # 缓冲区里有数据时 recv() 不会让出事件循环，按字节配额主动让出，避免挤占其他会话
+            credit -= size
+            if credit <= 0:
+                credit += quantum
+                await asyncio.sleep(0)
+
+    async def _write(self):
+        quantum = self._manager.quantum_bytes
+        credit = quantum
+        while True:
+            item = await self._outbox.get()
+            if item is _DRAIN:
+                return
+            message, enqueued_at = item
+            started = time.perf_counter()
+            data = message if isinstance(message, str) else await self.client.encode(message)
+            await self.client.send_str(data)
+            finished = time.perf_counter()
+            self.send_time += finished - started
+            self.max_queue_delay = max(self.max_queue_delay, time.monotonic() - enqueued_at)
+            self.messages_sent += 1
+            self.bytes_sent += len(data)
+            # 赤字轮询：每发送 quantum 字节让出一次事件循环，各会话的写任务按就绪顺序轮流发送
+            credit -= len(data)
+            if credit <= 0:
+                credit += quantum
+                await asyncio.sleep(0)
+
+    async def _supervise(self):
+        reader, writer = self._tasks[:2]
+        await asyncio.wait((reader, writer), return_when=asyncio.FIRST_COMPLETED)
+        for task in (reader, writer):
+            if task.done() and not task.cancelled() and task.exception() is not None and self.error is None:
+                self.error = task.exception()
+        self.state = "closing"
+        try:
+            await self.client.close()
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+        for task in (reader, writer):
+            task.cancel()
+        await asyncio.gather(reader, writer, return_exceptions=True)
+        self.state = "closed"
+        self._manager._discard(self)
+        self._closed.set()
+
+
+class SessionManager:
+    """在一个事件循环上管理大量会话
+
+    负责建连准入（会话总数上限、同时握手数上限）、为每个会话启动受监督的读写任务、
+    在会话之间公平调度发送，以及批量排空关闭。会话之间按字节配额轮流占用事件循环，
+    单个高流量会话不会饿死其他会话。
+
+    用法::
+
+        async with SessionManager(url, token_provider=provider, max_sessions=500) as manager:
+            session = await manager.open(handler)
+            await session.send(message)
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        token_provider: Optional[TokenProvider] = None,
+        max_sessions: int = 256,
+        max_connecting: int = 16,
+        max_queue: int = 256,
+        quantum_bytes: int = 64 * 1024,
+        encode_executor: Optional[Executor] = None,
+    ):
+        """初始化会话管理器
+
+        Args:
+            url: WebSocket服务器地址
+            headers: 请求头
+            params: URL参数
+            token_provider: 可选，所有会话共用的 JWT 令牌提供者
+            max_sessions: 同时存在的会话数上限（含正在握手的会话）
+            max_connecting: 同时进行握手的会话数上限
+            max_queue: 每个会话发送队列的长度上限
+            quantum_bytes: 每个会话每轮最多连续收发的字节数，超过后让出事件循环
+            encode_executor: 可选，所有会话序列化大消息共用的执行器，由调用方负责关闭；默认创建一个
+                共用的进程池，drain() / close() 时关闭
+        """
+        self._url = url
+        self._headers = headers
+        self._params = params
+        self._token_provider = token_provider
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.quantum_bytes = quantum_bytes
+        # 进程池在第一次提交任务时才真正创建
+        self._encode_executor = encode_executor or create_encode_executor()
+        self._owns_encode_executor = encode_executor is None
+        self._handshakes = asyncio.Semaphore(max_connecting)
+        self._sessions: dict[str, ManagedSession] = {}
+        self._connecting = 0
+        self._draining = False
+        self.opened = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def open(
+        self,
+        handler: SessionHandler,
+        session_id: Optional[str] = None,
+        params: Optional[dict[str, Any]] = None,
+    ) -> ManagedSession:
+        """建立一个新会话
+
+        Args:
+            handler: 处理服务器消息的回调 handler(session, message)，可以是异步函数；
+                在该会话的读任务中按顺序调用
+            session_id: 可选，会话标识，默认随机生成
+            params: 可选，该会话额外的 URL 参数
+
+        Raises:
+            SessionLimitError: 会话数已达上限或管理器正在排空
+        """
+        if self._draining:
+            self.rejected += 1
+            raise SessionLimitError("会话管理器正在关闭")
+        if len(self._sessions) + self._connecting >= self.max_sessions:
+            self.rejected += 1
+            raise SessionLimitError(f"会话数已达上限 {self.max_sessions}")
+        session_id = session_id or uuid.uuid4().hex
+        if session_id in self._sessions:
+            raise ValueError(f"会话 {session_id} 已存在")
+        self._connecting += 1
+        try:
+            async with self._handshakes:
+                client = RTLowLevelClient(
+                    self._url,
+                    headers=self._headers,
+                    params={**(self._params or {}), **(params or {})},
+                    token_provider=self._token_provider,
+                    encode_executor=self._encode_executor,
+                )
+                try:
+                    await client.connect()
+                except BaseException:
+                    self.failed += 1
+                    await client.close()
+                    raise
+        finally:
+            self._connecting -= 1
+        session = ManagedSession(self, session_id, client, handler, self.max_queue)
+        self._sessions[session_id] = session
+        self.opened += 1
+        session._start()
+        return session
+
+    def get(self, session_id: str) -> Optional[ManagedSession]:
+        return self._sessions.get(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    async def drain(self, timeout: Optional[float] = None):
+        """停止接受新会话，所有会话发送完已排队的消息后关闭
+
+        Args:
+            timeout: 最长等待时间（秒），超时后强制关闭剩余会话
+        """
+        self._draining = True
+        await asyncio.gather(
+            *(session.close(timeout) for session in list(self._sessions.values())), return_exceptions=True
+        )
+        if self._owns_encode_executor:
+            self._encode_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def close(self):
+        """立即关闭所有会话"""
+        await self.drain(timeout=0)
+
+    def stats(self) -> dict[str, Any]:
+        """管理器和所有会话的统计"""
+        sessions = [session.stats() for session in self._sessions.values()]
+        return {
+            "sessions": len(sessions),
+            "connecting": self._connecting,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "queued": sum(s["queued"] for s in sessions),
+            "bytes_sent": sum(s["bytes_sent"] for s in sessions),
+            "bytes_received": sum(s["bytes_received"] for s in sessions),
+            "send_time": sum(s["send_time"] for s in sessions),
+            "handler_time": sum(s["handler_time"] for s in sessions),
+            "per_session": sessions,
+        }
+
+    def _discard(self, session: ManagedSession):
+        if self._sessions.get(session.id) is session:
+            del self._sessions[session.id]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.drain()
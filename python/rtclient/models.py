@@ -4,11 +4,11 @@
 from typing import Annotated, Any, Literal, Optional, Union
 
 from pydantic import (
-    BaseModel,
+    ConfigDict,
     Field,
 )
 
-from rtclient.util.model_helpers import ModelWithDefaults
+from rtclient.util.model_helpers import DeferredModel, ModelWithDefaults
 
 Voice = str
 
@@ -45,7 +45,7 @@ ToolChoice = Literal["auto", "none", "required", ""] | FunctionToolChoice
 MessageRole = Literal["system", "assistant", "user"]
 
 
-class InputAudioTranscription(BaseModel):
+class InputAudioTranscription(DeferredModel):
     model: Literal["whisper-1"]
 
 
@@ -61,7 +61,7 @@ ToolsDefinition = list[Any]
 MaxTokensType = Union[int, Literal["inf"]]
 
 
-class SessionUpdateParams(BaseModel):
+class SessionUpdateParams(DeferredModel):
     model: Optional[str] = None
     modalities: Optional[set[Modality]] = None
     voice: Optional[Voice] = None
@@ -92,6 +92,9 @@ class InputAudioBufferAppendMessage(ClientMessageBase):
     input_audio_format in the session config.
     """
 
+    # 高频消息，导入时即构建
+    model_config = ConfigDict(defer_build=False)
+
     type: Literal["input_audio_buffer.append"] = "input_audio_buffer.append"
     audio: str # base64编码的音频数据
 
@@ -101,6 +104,9 @@ class InputVideoFrameAppendMessage(ClientMessageBase):
     在视频通话模式中上报视频帧。
     """
 
+    # 高频消息，导入时即构建
+    model_config = ConfigDict(defer_build=False)
+
     type: Literal["input_audio_buffer.append_video_frame"] = "input_audio_buffer.append_video_frame"
     video_frame: str  # base64编码的图片数据
 
@@ -209,7 +215,7 @@ class ItemCreateMessage(ClientMessageBase):
 
 
 
-class ResponseCreateParams(BaseModel):
+class ResponseCreateParams(DeferredModel):
     commit: bool = True
     cancel_previous: bool = True
     append_input_items: Optional[list[Item]] = None
@@ -237,7 +243,7 @@ class ResponseCancelMessage(ClientMessageBase):
     type: Literal["response.cancel"] = "response.cancel"
 
 
-class RealtimeError(BaseModel):
+class RealtimeError(DeferredModel):
     message: str
     type: Optional[str] = None
     code: Optional[str] = None
@@ -245,7 +251,7 @@ class RealtimeError(BaseModel):
     event_id: Optional[str] = None
 
 
-class ServerMessageBase(BaseModel):
+class ServerMessageBase(DeferredModel):
     event_id: Optional[str] = None
 
 
@@ -254,7 +260,7 @@ class ErrorMessage(ServerMessageBase):
     error: RealtimeError
 
 
-class Session(BaseModel):
+class Session(DeferredModel):
     id: str
     model: str
     modalities: set[Modality]
@@ -319,28 +325,28 @@ class InputAudioBufferSpeechStoppedMessage(ServerMessageBase):
 ResponseItemStatus = Literal["in_progress", "completed", "incomplete"]
 
 
-class ResponseItemInputTextContentPart(BaseModel):
+class ResponseItemInputTextContentPart(DeferredModel):
     """响应项文本输入内容部分"""
 
     type: Literal["input_text"] = "input_text"
     text: str
 
 
-class ResponseItemInputAudioContentPart(BaseModel):
+class ResponseItemInputAudioContentPart(DeferredModel):
     """响应项音频输入内容部分"""
 
     type: Literal["input_audio"] = "input_audio"
     transcript: Optional[str] = None
 
 
-class ResponseItemTextContentPart(BaseModel):
+class ResponseItemTextContentPart(DeferredModel):
     """响应项文本内容部分"""
 
     type: Literal["text"] = "text"
     text: str
 
 
-class ResponseItemAudioContentPart(BaseModel):
+class ResponseItemAudioContentPart(DeferredModel):
     """响应项音频内容部分"""
 
     type: Literal["audio"] = "audio"
@@ -358,7 +364,7 @@ ResponseItemContentPart = Annotated[
 ]
 
 
-class ResponseItemBase(BaseModel):
+class ResponseItemBase(DeferredModel):
     id: Optional[str]
 
 
@@ -413,17 +419,17 @@ class ItemInputAudioTranscriptionCompletedMessage(ServerMessageBase):
 ResponseStatus = Literal["in_progress", "completed", "cancelled", "incomplete", "failed"]
 
 
-class ResponseCancelledDetails(BaseModel):
+class ResponseCancelledDetails(DeferredModel):
     type: Literal["cancelled"] = "cancelled"
     reason: Literal["turn_detected", "client_cancelled"]
 
 
-class ResponseIncompleteDetails(BaseModel):
+class ResponseIncompleteDetails(DeferredModel):
     type: Literal["incomplete"] = "incomplete"
     reason: Literal["max_output_tokens", "content_filter"]
 
 
-class ResponseFailedDetails(BaseModel):
+class ResponseFailedDetails(DeferredModel):
     type: Literal["failed"] = "failed"
     error: Any
 
@@ -434,18 +440,18 @@ ResponseStatusDetails = Annotated[
 ]
 
 
-class InputTokenDetails(BaseModel):
+class InputTokenDetails(DeferredModel):
     cached_tokens: Optional[int] = 0
     text_tokens: Optional[int] = 0
     audio_tokens: Optional[int] = 0
 
 
-class OutputTokenDetails(BaseModel):
+class OutputTokenDetails(DeferredModel):
     text_tokens: Optional[int] = 0
     audio_tokens: Optional[int] = 0
 
 
-class Usage(BaseModel):
+class Usage(DeferredModel):
     total_tokens: Optional[int] = 0
     input_tokens: Optional[int] = 0
     output_tokens: Optional[int] = 0
@@ -453,7 +459,7 @@ class Usage(BaseModel):
     output_token_details: Optional[OutputTokenDetails] = None
 
 
-class Response(BaseModel):
+class Response(DeferredModel):
     """服务器返回的响应对象结构"""
 
     id: str
@@ -475,6 +481,9 @@ class ResponseDoneMessage(ServerMessageBase):
 
 
 class ResponseAudioTranscriptDeltaMessage(ServerMessageBase):
+    # 高频消息，导入时即构建
+    model_config = ConfigDict(defer_build=False)
+
     type: Literal["response.audio_transcript.delta"] = "response.audio_transcript.delta"
     response_id: Optional[str] = None
     item_id: Optional[str] = None
@@ -493,6 +502,9 @@ class ResponseAudioTranscriptDoneMessage(ServerMessageBase):
 
 
 class ResponseAudioDeltaMessage(ServerMessageBase):
+    # 高频消息，导入时即构建
+    model_config = ConfigDict(defer_build=False)
+
     type: Literal["response.audio.delta"] = "response.audio.delta"
     response_id: Optional[str] = None
     item_id: Optional[str] = None
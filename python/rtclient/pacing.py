@@ -0,0 +1,230 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import heapq
+import itertools
+import weakref
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, Optional
+
+
+class PacedStream:
+    """PacingScheduler 中的一路定时发送流
+
+    同一时间最多只有一帧在发送：调度器取出一帧后交给该流自己的发送任务，不等待发送完成；
+    发送完成后流才按下一帧的计划时刻重新入堆，发送落后时到期即补发。
+    """
+
+    def __init__(
+        self,
+        scheduler: "PacingScheduler",
+        frames: Iterable[Any],
+        send: Callable[[Any], Awaitable[Any]],
+        interval: float,
+        start: float,
+    ):
+        self._scheduler = scheduler
+        self._frames = iter(frames)
+        self._send = send
+        self.interval = interval
+        self.start = start
+        self.frames_issued = 0
+        self.frames_sent = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self.rebased = 0
+        self._sending: Optional[asyncio.Future] = None
+        self._done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def next_deadline(self) -> float:
+        return self.start + self.frames_issued * self.interval
+
+    @property
+    def busy(self) -> bool:
+        """是否有一帧正在发送"""
+        return self._sending is not None and not self._sending.done()
+
+    @property
+    def done(self) -> bool:
+        return self._done.done()
+
+    def cancel(self):
+        """停止发送剩余的帧，正在发送的一帧会发送完"""
+        if not self._done.done():
+            self._done.cancel()
+        self._scheduler._wakeup()
+
+    async def wait(self) -> int:
+        """等待发送结束，返回发送的帧数"""
+        return await asyncio.shield(self._done)
+
+    def __await__(self):
+        return self.wait().__await__()
+
+    def stats(self) -> dict[str, Any]:
+        """发送帧数和相对计划时刻的延迟（毫秒）"""
+        return {
+            "frames_sent": self.frames_sent,
+            "max_lateness_ms": self.max_lateness * 1000,
+            "mean_lateness_ms": self.total_lateness / self.frames_issued * 1000 if self.frames_issued else 0.0,
+            "rebased": self.rebased,
+        }
+
+    def _fire(self, now: float):
+        """取出下一帧交给发送任务，不等待发送完成"""
+        try:
+            frame = next(self._frames)
+            lateness = now - self.next_deadline
+            self.max_lateness = max(self.max_lateness, lateness)
+            self.total_lateness += max(0.0, lateness)
+            self.frames_issued += 1
+            self._sending = asyncio.ensure_future(self._send(frame))
+        except StopIteration:
+            self._done.set_result(self.frames_sent)
+            return
+        except Exception as e:
+            self._done.set_exception(e)
+            return
+        self._sending.add_done_callback(self._on_sent)
+
+    def _on_sent(self, sending: asyncio.Future):
+        if self._done.done():
+            return
+        if sending.cancelled():
+            self._done.cancel()
+        elif sending.exception() is not None:
+            self._done.set_exception(sending.exception())
+        else:
+            self.frames_sent += 1
+            self._scheduler._schedule(self)
+
+
+class PacingScheduler:
+    """按绝对时间点定时发送的调度器
+
+    每路流的第 n 帧在 start + n * interval / speed 发送，计划时刻只由起始时间和帧序号决定，
+    发送耗时和定时器误差不会累积成漂移；事件循环卡顿后落后的帧会立即补发追上进度，
+    多路落后的流按计划时刻轮流补发。同一事件循环上的所有流共用一个调度任务和一个
+    按截止时间排序的堆，而不是每路流每帧各 sleep 一次。
+
+    调度任务只负责到期时把帧交给各流的发送任务，从不等待发送本身：某一路的连接写缓冲区
+    积压或序列化放到执行器中时，只有这一路暂停（发送完成后再按计划补发），其他流照常按时发送。
+
+    speed 大于 1 时快于实时发送，用于压测和离线批处理。
+    """
+
+    _instances: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PacingScheduler]" = weakref.WeakKeyDictionary()
+
+    def __init__(self, speed: float = 1.0, max_lag: Optional[float] = None):
+        """初始化调度器
+
+        Args:
+            speed: 发送倍速，作用于之后加入的所有流
+            max_lag: 一路流落后超过该时长（秒）时不再补发，以当前时刻重新计时；None 表示全部补发
+        """
+        if speed <= 0:
+            raise ValueError("speed 必须大于 0")
+        self.speed = speed
+        self.max_lag = max_lag
+        self._heap: list[tuple[float, int, PacedStream]] = []
+        # 所有未结束的流，包括正在发送、暂时不在堆中的流
+        self._streams: set[PacedStream] = set()
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @classmethod
+    def for_loop(cls) -> "PacingScheduler":
+        """当前事件循环共享的调度器"""
+        loop = asyncio.get_running_loop()
+        scheduler = cls._instances.get(loop)
+        if scheduler is None:
+            scheduler = cls._instances[loop] = cls()
+        return scheduler
+
+    def add(
+        self,
+        frames: Iterable[Any],
+        send: Callable[[Any], Awaitable[Any]],
+        interval_ms: float,
+        speed: Optional[float] = None,
+        start: Optional[float] = None,
+    ) -> PacedStream:
+        """加入一路定时发送流
+
+        Args:
+            frames: 要发送的帧，按需迭代（可以是惰性编码的生成器）
+            send: 发送一帧的协程函数，例如 client.send
+            interval_ms: 帧间隔（毫秒，按实时计）
+            speed: 可选，覆盖调度器的 speed
+            start: 可选，第一帧的发送时刻（loop.time()），默认立即开始
+
+        Returns:
+            PacedStream，可以 await 等待发送结束
+        """
+        loop = asyncio.get_running_loop()
+        interval = interval_ms / 1000 / (speed or self.speed)
+        stream = PacedStream(self, frames, send, interval, loop.time() if start is None else start)
+        self._streams.add(stream)
+        stream._done.add_done_callback(lambda _: self._streams.discard(stream))
+        self._schedule(stream)
+        return stream
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    async def aclose(self):
+        """取消所有流并停止调度任务"""
+        for stream in list(self._streams):
+            stream.cancel()
+        self._heap.clear()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _schedule(self, stream: PacedStream):
+        heapq.heappush(self._heap, (stream.next_deadline, next(self._seq), stream))
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        else:
+            self._wakeup()
+
+    def _wakeup(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        fired = 0
+        while self._heap:
+            deadline, _, stream = self._heap[0]
+            delay = deadline - loop.time()
+            if delay > 0:
+                fired = 0
+                # 新加入的流可能更早到期，等待期间可以被唤醒
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            if stream.done:
+                continue
+            now = loop.time()
+            if self.max_lag is not None and now - deadline > self.max_lag:
+                # 落后太多时放弃追赶，从当前时刻重新计时
+                stream.start = now - stream.frames_issued * stream.interval
+                stream.rebased += 1
+            # 发送完成后由发送任务按下一帧的计划时刻重新入堆，多路落后的流轮流补发
+            stream._fire(now)
+            fired += 1
+            if fired % 64 == 0:
+                await asyncio.sleep(0)
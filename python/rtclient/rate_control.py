@@ -0,0 +1,176 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from aiohttp import ClientError
+
+
+@dataclass(slots=True)
+class MediaRateDecision:
+    """当前的媒体发送参数"""
+
+    video_fps: float
+    jpeg_quality: int
+    audio_chunk_ms: int
+
+    @property
+    def video_interval_ms(self) -> int:
+        return int(1000 / self.video_fps)
+
+
+class RateController:
+    """根据发送时延自适应调整媒体码率
+
+    观测三个拥塞信号：出站队列等待时间、传输层写缓冲区积压和 ping 往返时延
+    （与观测到的最小 RTT 比较）。任一信号超限即视为拥塞，按乘性减小视频帧率和
+    JPEG 质量、增大音频分片时长（减少消息数）；连续若干次评估都没有拥塞时再
+    按加性恢复，所有参数都限制在配置的上下限之内。
+    """
+
+    def __init__(
+        self,
+        fps_range: tuple[float, float] = (0.5, 2.0),
+        quality_range: tuple[int, int] = (30, 85),
+        audio_chunk_range: tuple[int, int] = (32, 200),
+        target_queue_delay_ms: float = 150,
+        max_write_buffer: int = 256 * 1024,
+        rtt_tolerance_ms: float = 100,
+        decrease_factor: float = 0.7,
+        quality_decrease: int = 10,
+        audio_chunk_increase_factor: float = 1.5,
+        fps_recover_ratio: float = 0.1,
+        quality_increase: int = 5,
+        audio_chunk_decrease_ms: int = 16,
+        recover_after: int = 3,
+        smoothing: float = 0.3,
+    ):
+        """初始化码率控制器
+
+        Args:
+            fps_range: 视频帧率范围 (最小, 最大)
+            quality_range: JPEG 质量范围 (最小, 最大)
+            audio_chunk_range: 音频分片时长范围（毫秒）
+            target_queue_delay_ms: 出站队列平均等待时间上限
+            max_write_buffer: 写缓冲区积压上限（字节）
+            rtt_tolerance_ms: RTT 超过最小 RTT 多少毫秒视为拥塞
+            decrease_factor: 拥塞时帧率的乘性减小系数
+            quality_decrease: 拥塞时 JPEG 质量每次降低的值
+            audio_chunk_increase_factor: 拥塞时音频分片时长的乘性增大系数
+            fps_recover_ratio: 恢复时帧率每次增加帧率范围的比例
+            quality_increase: 恢复时 JPEG 质量每次提高的值
+            audio_chunk_decrease_ms: 恢复时音频分片时长每次减小的毫秒数
+            recover_after: 连续多少次评估无拥塞后开始恢复
+            smoothing: 队列等待时间和 RTT 的指数平滑系数
+        """
+        self.fps_range = fps_range
+        self.quality_range = quality_range
+        self.audio_chunk_range = audio_chunk_range
+        self.target_queue_delay = target_queue_delay_ms / 1000
+        self.max_write_buffer = max_write_buffer
+        self.rtt_tolerance = rtt_tolerance_ms / 1000
+        self.decrease_factor = decrease_factor
+        self.quality_decrease = quality_decrease
+        self.audio_chunk_increase_factor = audio_chunk_increase_factor
+        self.fps_recover_ratio = fps_recover_ratio
+        self.quality_increase = quality_increase
+        self.audio_chunk_decrease_ms = audio_chunk_decrease_ms
+        self.recover_after = recover_after
+        self.smoothing = smoothing
+
+        self.decision = MediaRateDecision(
+            video_fps=fps_range[1],
+            jpeg_quality=quality_range[1],
+            audio_chunk_ms=audio_chunk_range[0],
+        )
+        self.queue_delay: Optional[float] = None
+        self.write_buffer = 0
+        self.rtt: Optional[float] = None
+        self.min_rtt: Optional[float] = None
+        self.congested = False
+        self.congestion_events = 0
+        self._clear_rounds = 0
+
+    def observe_queue_delay(self, seconds: float):
+        """记录一条消息从入队到发出的等待时间"""
+        self.queue_delay = self._smooth(self.queue_delay, seconds)
+
+    def observe_write_buffer(self, size: int):
+        """记录传输层写缓冲区当前积压的字节数"""
+        self.write_buffer = size
+
+    def observe_rtt(self, seconds: float):
+        """记录一次 ping 往返时延"""
+        self.rtt = self._smooth(self.rtt, seconds)
+        if self.min_rtt is None or seconds < self.min_rtt:
+            self.min_rtt = seconds
+
+    def update(self) -> MediaRateDecision:
+        """根据已记录的观测值重新计算发送参数"""
+        congested = (
+            (self.queue_delay is not None and self.queue_delay > self.target_queue_delay)
+            or self.write_buffer > self.max_write_buffer
+            or (self.rtt is not None and self.min_rtt is not None and self.rtt - self.min_rtt > self.rtt_tolerance)
+        )
+        decision = self.decision
+        min_fps, max_fps = self.fps_range
+        min_quality, max_quality = self.quality_range
+        min_chunk, max_chunk = self.audio_chunk_range
+        if congested:
+            if not self.congested:
+                self.congestion_events += 1
+            self._clear_rounds = 0
+            decision.video_fps = max(min_fps, decision.video_fps * self.decrease_factor)
+            decision.jpeg_quality = max(min_quality, decision.jpeg_quality - self.quality_decrease)
+            decision.audio_chunk_ms = min(max_chunk, int(decision.audio_chunk_ms * self.audio_chunk_increase_factor))
+        else:
+            self._clear_rounds += 1
+            if self._clear_rounds >= self.recover_after:
+                decision.video_fps = min(max_fps, decision.video_fps + (max_fps - min_fps) * self.fps_recover_ratio)
+                decision.jpeg_quality = min(max_quality, decision.jpeg_quality + self.quality_increase)
+                decision.audio_chunk_ms = max(min_chunk, decision.audio_chunk_ms - self.audio_chunk_decrease_ms)
+        self.congested = congested
+        return decision
+
+    async def run(self, client, interval: float = 1.0, ping_timeout: float = 2.0):
+        """周期性地从客户端采样写缓冲区和 RTT 并更新发送参数，直到连接关闭
+
+        以 rate_controller=self 创建的 RTLowLevelClient 在连接后自动运行本方法，并在收到 pong 和
+        每次发送后记录 RTT 和出站等待时间；pong 由 recv() 处理，需要有任务在持续接收消息。
+        ping 超时按 ping_timeout 计入 RTT；ping 时连接出错视为拥塞同样计入 ping_timeout，
+        连接已关闭则返回。
+        """
+        while not client.closed:
+            self.observe_write_buffer(client.write_buffer_size)
+            try:
+                rtt = await client.ping(timeout=ping_timeout)
+                if getattr(client, "rate_controller", None) is not self:
+                    self.observe_rtt(rtt)
+            except TimeoutError:
+                self.observe_rtt(ping_timeout)
+            except (OSError, ClientError):
+                if client.closed:
+                    return
+                self.observe_rtt(ping_timeout)
+            self.update()
+            await asyncio.sleep(interval)
+
+    def metrics(self) -> dict[str, Any]:
+        """当前的发送参数和观测值"""
+        return {
+            **asdict(self.decision),
+            "video_interval_ms": self.decision.video_interval_ms,
+            "queue_delay_ms": self.queue_delay * 1000 if self.queue_delay is not None else None,
+            "write_buffer": self.write_buffer,
+            "rtt_ms": self.rtt * 1000 if self.rtt is not None else None,
+            "min_rtt_ms": self.min_rtt * 1000 if self.min_rtt is not None else None,
+            "congested": self.congested,
+            "congestion_events": self.congestion_events,
+        }
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
@@ -0,0 +1,213 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Any, Literal, Optional
+
+OverflowPolicy = Literal["error", "drop_oldest"]
+
+_END = object()
+
+
+class ResponseStreamOverflow(Exception):
+    """响应流的队列已满，消费速度跟不上服务端输出"""
+
+
+def _field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+class ResponseStream:
+    """单个响应的事件流
+
+    依次产出该响应的 delta / done 等事件（带 response_id 的消息），收到 response.done
+    或连接关闭后结束。队列有上限，入队从不等待，不会阻塞接收循环：队列满时按 overflow
+    处理，error 会让迭代以 ResponseStreamOverflow 结束，drop_oldest 丢弃最早的事件并计入 dropped。
+
+    提前退出迭代或调用 close() 后立即注销并清空队列。
+    """
+
+    def __init__(
+        self,
+        registry: "ResponseStreams",
+        response_id: Optional[str],
+        max_queue: int = 256,
+        overflow: OverflowPolicy = "error",
+    ):
+        self._registry = registry
+        self.response_id = response_id
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.response = None
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._waiter: Optional[asyncio.Future] = None
+        self._error: Optional[BaseException] = None
+        self._ended = False
+
+    @property
+    def closed(self) -> bool:
+        return self._ended
+
+    def _put(self, item: Any):
+        if self._ended:
+            return
+        if item is not _END and len(self._queue) >= self.max_queue:
+            if self.overflow == "drop_oldest":
+                self._queue.popleft()
+                self.dropped += 1
+            else:
+                self._fail(ResponseStreamOverflow(f"响应 {self.response_id} 的队列已满（{self.max_queue}）"))
+                return
+        self._queue.append(item)
+        self._wake()
+
+    def _fail(self, error: BaseException):
+        self._error = error
+        self._queue.clear()
+        self._queue.append(_END)
+        self._registry._discard(self)
+        self._wake()
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def close(self):
+        """停止接收并丢弃尚未读取的事件"""
+        self._queue.clear()
+        self._ended = True
+        self._registry._discard(self)
+        self._wake()
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self._queue:
+            if self._ended:
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            except asyncio.CancelledError:
+                self.close()
+                raise
+            finally:
+                self._waiter = None
+        item = self._queue.popleft()
+        if item is _END:
+            self.close()
+            if self._error is not None:
+                raise self._error
+            raise StopAsyncIteration
+        return item
+
+    async def audio(self) -> AsyncIterator[bytes]:
+        """只产出解码后的 response.audio.delta 音频"""
+        try:
+            async for message in self:
+                if _field(message, "type") == "response.audio.delta" and _field(message, "delta"):
+                    yield base64.b64decode(_field(message, "delta"))
+        finally:
+            self.close()
+
+    async def text(self) -> AsyncIterator[str]:
+        """只产出 response.audio_transcript.delta / response.text.delta 的文本"""
+        try:
+            async for message in self:
+                if _field(message, "type") in ("response.audio_transcript.delta", "response.text.delta"):
+                    delta = _field(message, "delta")
+                    if delta:
+                        yield delta
+        finally:
+            self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+class ResponseStreams:
+    """按 response_id 把服务端消息分发到各个 ResponseStream
+
+    RTLowLevelClient.recv() 对每条消息调用 handle()；没有订阅者的响应不占用任何内存。
+    """
+
+    def __init__(self):
+        self._streams: dict[str, ResponseStream] = {}
+        # 等待下一个 response.created 的订阅者
+        self._next: deque[ResponseStream] = deque()
+
+    def open(
+        self, response_id: Optional[str] = None, max_queue: int = 256, overflow: OverflowPolicy = "error"
+    ) -> ResponseStream:
+        """订阅一个响应
+
+        Args:
+            response_id: 响应 ID；None 表示下一个 response.created 对应的响应
+            max_queue: 队列上限（条）
+            overflow: 队列满时的处理方式，error 或 drop_oldest
+        """
+        stream = ResponseStream(self, response_id, max_queue, overflow)
+        if response_id is None:
+            self._next.append(stream)
+        else:
+            previous = self._streams.get(response_id)
+            if previous is not None:
+                previous.close()
+            self._streams[response_id] = stream
+        return stream
+
+    def __len__(self) -> int:
+        return len(self._streams) + len(self._next)
+
+    def handle(self, message: Any):
+        """处理一条服务器消息"""
+        if not (self._streams or self._next):
+            return
+        msg_type = _field(message, "type")
+        if msg_type == "response.created":
+            if self._next:
+                stream = self._next.popleft()
+                stream.response_id = _field(_field(message, "response"), "id")
+                self._streams[stream.response_id] = stream
+            return
+        if msg_type == "response.done":
+            response = _field(message, "response")
+            stream = self._streams.pop(_field(response, "id"), None)
+            if stream is not None:
+                stream.response = response
+                stream._put(message)
+                stream._put(_END)
+            return
+        response_id = _field(message, "response_id")
+        if response_id is not None:
+            stream = self._streams.get(response_id)
+            if stream is not None:
+                stream._put(message)
+
+    def close(self):
+        """连接关闭：结束所有订阅，已入队的事件仍可读完"""
+        streams = list(self._streams.values()) + list(self._next)
+        self._streams.clear()
+        self._next.clear()
+        for stream in streams:
+            stream._put(_END)
+
+    def _discard(self, stream: ResponseStream):
+        if self._streams.get(stream.response_id) is stream:
+            del self._streams[stream.response_id]
+        else:
+            try:
+                self._next.remove(stream)
+            except ValueError:
+                pass
@@ -0,0 +1,314 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Optional, Union
+
+from rtclient.models import (
+    ErrorMessage,
+    Session,
+    SessionCreatedMessage,
+    SessionUpdatedMessage,
+    SessionUpdateMessage,
+    SessionUpdateParams,
+)
+from rtclient.util.id_generator import generate_id
+
+
+def _normalize(name: str, value: Any) -> Any:
+    if name == "modalities" and value is not None:
+        return sorted(value)
+    return value
+
+
+def diff_session_params(current: dict[str, Any], params: SessionUpdateParams) -> dict[str, Any]:
+    """计算 params 中与 current 不同的字段
+
+    Args:
+        current: 当前会话配置（JSON 模式的 dict）
+        params: 新的会话配置，只比较其中非 None 的字段
+
+    Returns:
+        需要发送的字段（JSON 模式的 dict）
+    """
+    requested = params.model_dump(mode="json", exclude_none=True)
+    diff = {
+        name: value
+        for name, value in requested.items()
+        if _normalize(name, value) != _normalize(name, current.get(name))
+    }
+    # 服务端在更新 tools 时会把未携带的 turn_detection 重置为客户端 VAD，因此需要一并带上
+    if "tools" in diff and "turn_detection" not in diff:
+        turn_detection = requested.get("turn_detection", current.get("turn_detection"))
+        if turn_detection is not None:
+            diff["turn_detection"] = turn_detection
+    return diff
+
+
+def _satisfies(acknowledged: Any, requested: Any) -> bool:
+    """acknowledged 是否包含 requested 中的所有取值，服务端补全的其他字段不影响结果"""
+    if isinstance(requested, dict):
+        return isinstance(acknowledged, dict) and all(
+            _satisfies(acknowledged.get(name), value) for name, value in requested.items()
+        )
+    if isinstance(requested, list):
+        return (
+            isinstance(acknowledged, list)
+            and len(acknowledged) == len(requested)
+            and all(_satisfies(a, r) for a, r in zip(acknowledged, requested))
+        )
+    return acknowledged == requested
+
+
+def _acknowledges(session: dict[str, Any], diff: dict[str, Any]) -> bool:
+    return all(_satisfies(_normalize(name, session.get(name)), _normalize(name, value)) for name, value in diff.items())
+
+
+class SessionUpdateError(Exception):
+    def __init__(self, message: str, error=None):
+        super().__init__(message)
+        self.error = error
+
+
+class SessionUpdater:
+    """增量 session.update
+
+    记录服务端最近确认（session.created / session.updated）的 Session，新的更新只发送
+    与之不同的字段；同一时间窗口内的多次更新合并为一条消息。与尚未确认的更新比较时
+    以“已确认配置 + 在途更新”为基准，避免与在途更新互相覆盖。
+
+    update() 返回的 Future 在对应的 session.updated 到达时完成，结果为确认后的 Session；
+    服务端针对该更新返回 error 时以 SessionUpdateError 失败。session.updated 不带请求的
+    event_id，因此按内容匹配：确认的配置包含某个在途更新的全部字段时才认为是它的确认，
+    其他途径发出的 session.update（例如 PreparedSessionUpdate）的确认只会更新已确认配置。
+    """
+
+    def __init__(self, client, coalesce_ms: float = 0):
+        """初始化
+
+        Args:
+            client: 用于发送消息的 RTLowLevelClient
+            coalesce_ms: 合并更新的时间窗口（毫秒），0 表示合并同一轮事件循环内的更新
+        """
+        self._client = client
+        self._coalesce = coalesce_ms / 1000
+        self.session: Optional[Session] = None
+        self._acknowledged: dict[str, Any] = {}
+        self._pending: dict[str, Any] = {}
+        self._pending_future: Optional[asyncio.Future] = None
+        self._in_flight: list[tuple[str, dict[str, Any], asyncio.Future]] = []
+        self.sent_updates = 0
+        self.coalesced_updates = 0
+
+    def update(self, params: SessionUpdateParams) -> asyncio.Future:
+        """提交一次会话配置更新
+
+        Returns:
+            在 session.updated 确认后完成的 Future；没有需要发送的字段时立即完成
+        """
+        loop = asyncio.get_running_loop()
+        if self._pending_future is None:
+            self._pending_future = loop.create_future()
+            loop.call_later(self._coalesce, self._flush)
+        else:
+            self.coalesced_updates += 1
+        self._pending.update(params.model_dump(exclude_none=True))
+        return self._pending_future
+
+    def handle(self, message):
+        """处理一条服务器消息，非会话相关的消息会被忽略"""
+        match message:
+            case SessionCreatedMessage() | SessionUpdatedMessage():
+                self.session = message.session
+                self._acknowledged = message.session.model_dump(mode="json")
+                if isinstance(message, SessionUpdatedMessage):
+                    self._resolve(message.session)
+            case ErrorMessage():
+                for index, (event_id, _, future) in enumerate(self._in_flight):
+                    if event_id == message.error.event_id:
+                        del self._in_flight[index]
+                        if not future.done():
+                            future.set_exception(SessionUpdateError(message.error.message, message.error))
+                        break
+
+    def _resolve(self, session: Session):
+        for index, (_, diff, future) in enumerate(self._in_flight):
+            if _acknowledges(self._acknowledged, diff):
+                del self._in_flight[index]
+                if not future.done():
+                    future.set_result(session)
+                return
+
+    def expected(self) -> dict[str, Any]:
+        """已确认配置叠加所有在途更新后的预期配置"""
+        expected = dict(self._acknowledged)
+        for _, diff, _ in self._in_flight:
+            expected.update(diff)
+        return expected
+
+    def _flush(self):
+        future, self._pending_future = self._pending_future, None
+        pending, self._pending = self._pending, {}
+        try:
+            diff = diff_session_params(self.expected(), SessionUpdateParams(**pending))
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not diff:
+            # 请求的字段与预期配置一致；其中还在途的字段要等对应的 session.updated 到达后再完成
+            requested = SessionUpdateParams(**pending).model_dump(mode="json", exclude_none=True)
+            waiting = [waiter for _, sent, waiter in self._in_flight if not sent.keys().isdisjoint(requested)]
+            if waiting:
+                asyncio.gather(*waiting).add_done_callback(lambda done: self._chain(done, future))
+            elif not future.done():
+                future.set_result(self.session)
+            return
+        event_id = generate_id("event")
+        self._in_flight.append((event_id, diff, future))
+        # 只发送差异字段，未设置的字段不序列化为 null
+        message = SessionUpdateMessage(event_id=event_id, session=SessionUpdateParams(**diff))
+        message = message.model_dump(mode="json", exclude_none=True)
+        self.sent_updates += 1
+        task = asyncio.create_task(self._client.send(message))
+        task.add_done_callback(lambda t: self._on_sent(t, event_id))
+
+    def _chain(self, done: asyncio.Future, future: asyncio.Future):
+        if future.done():
+            if not done.cancelled():
+                done.exception()
+            return
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(self.session)
+
+    def _on_sent(self, task: asyncio.Future, event_id: str):
+        if task.cancelled() or task.exception() is None:
+            return
+        for index, (pending_id, _, future) in enumerate(self._in_flight):
+            if pending_id == event_id:
+                del self._in_flight[index]
+                if not future.done():
+                    future.set_exception(task.exception())
+                break
+
+
+class PreparedSessionUpdate:
+    """预先校验并序列化好的 session.update 消息
+
+    发送时只替换 event_id 和 client_timestamp，其余部分直接复用。
+    """
+
+    __slots__ = ("key", "params", "source", "_tail")
+
+    def __init__(self, key: str, params: SessionUpdateParams, source: Any = None):
+        self.key = key
+        self.params = params
+        # 最近一次注册时传入的原始对象，SessionConfigRegistry 据此按对象身份命中缓存
+        self.source = params if source is None else source
+        message = SessionUpdateMessage(session=params).model_dump_json(exclude_none=True)
+        # 序列化结果以 event_id 开头（client_timestamp 为 None 被省略），发送时替换这一段
+        head = '{"event_id":"",'
+        if not message.startswith(head):
+            raise ValueError(f"无法预序列化会话配置: {message[:64]}")
+        self._tail = message[len(head):]
+
+    def frame(self, event_id: Optional[str] = None, client_timestamp: Optional[int] = None) -> str:
+        """生成可直接发送的 JSON 文本
+
+        Args:
+            event_id: 事件 ID，默认生成一个新的 ID
+            client_timestamp: 可选，客户端时间戳（毫秒）
+        """
+        if event_id is None:
+            event_id = generate_id("event")
+        head = f'{{"event_id":{json.dumps(event_id, ensure_ascii=False)},'
+        if client_timestamp is not None:
+            head += f'"client_timestamp":{int(client_timestamp)},'
+        return head + self._tail
+
+    def __len__(self) -> int:
+        return len(self._tail)
+
+
+class SessionConfigRegistry:
+    """会话配置注册表
+
+    大量会话共用少数几种配置（通常带有很大的 tools 定义）时，每种配置只校验、序列化一次，
+    按内容哈希去重，之后每次建连只需拼接 event_id。可以通过 shared() 在进程内共享。
+
+    再次注册同一个对象（按对象身份判断）时直接返回已有结果，不再校验、序列化和计算哈希，
+    因此注册后的配置对象不应再被修改；每次都构造新的 dict 时会退化为按内容哈希去重，
+    这种情况应注册一次后用 get(name) 取出。
+    """
+
+    _shared: Optional["SessionConfigRegistry"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._by_key: dict[str, PreparedSessionUpdate] = {}
+        self._by_name: dict[str, PreparedSessionUpdate] = {}
+        # id(每种配置最近一次注册时传入的对象) -> 结果；结果持有该对象的引用，id 不会被复用
+        self._by_identity: dict[int, PreparedSessionUpdate] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "SessionConfigRegistry":
+        """进程内共享的注册表实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def content_key(params: Union[SessionUpdateParams, dict[str, Any]]) -> str:
+        """配置内容的哈希，字段顺序不影响结果"""
+        if isinstance(params, SessionUpdateParams):
+            params = params.model_dump(mode="json", exclude_none=True)
+        params = {name: _normalize(name, value) for name, value in params.items()}
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def register(
+        self, params: Union[SessionUpdateParams, dict[str, Any]], name: Optional[str] = None
+    ) -> PreparedSessionUpdate:
+        """注册一种会话配置，内容相同的配置共用同一个序列化结果
+
+        Args:
+            params: 会话配置，dict 会按 SessionUpdateParams 校验
+            name: 可选的名称，之后可以用 get(name) 直接取出
+        """
+        prepared = self._by_identity.get(id(params))
+        if prepared is not None and prepared.source is params:
+            if name is not None:
+                self._by_name[name] = prepared
+            return prepared
+        source = params
+        if not isinstance(params, SessionUpdateParams):
+            params = SessionUpdateParams(**params)
+        key = self.content_key(params)
+        with self._lock:
+            prepared = self._by_key.get(key)
+            if prepared is None:
+                prepared = self._by_key[key] = PreparedSessionUpdate(key, params, source)
+            elif prepared.source is not source:
+                if self._by_identity.get(id(prepared.source)) is prepared:
+                    del self._by_identity[id(prepared.source)]
+                prepared.source = source
+            self._by_identity[id(source)] = prepared
+            if name is not None:
+                self._by_name[name] = prepared
+        return prepared
+
+    def get(self, name_or_key: str) -> Optional[PreparedSessionUpdate]:
+        """按名称或内容哈希取出已注册的配置"""
+        return self._by_name.get(name_or_key) or self._by_key.get(name_or_key)
+
+    def __len__(self) -> int:
+        return len(self._by_key)
@@ -0,0 +1,450 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from rtclient.manager import SessionHandler, SessionLimitError, SessionManager
+from rtclient.util.token import TokenProvider
+
+# 需要跨进程汇总的数值指标
+_SUMMED_METRICS = (
+    "sessions",
+    "connecting",
+    "opened",
+    "rejected",
+    "failed",
+    "queued",
+    "bytes_sent",
+    "bytes_received",
+    "send_time",
+    "handler_time",
+)
+
+
+def _ignore_message(session, message):
+    pass
+
+
+@dataclass
+class ShardOptions:
+    """传给工作进程的配置，必须可以被 pickle"""
+
+    url: str
+    headers: Optional[dict[str, str]] = None
+    params: Optional[dict[str, Any]] = None
+    api_key: Optional[str] = None
+    handler_factory: Optional[Callable[[], SessionHandler]] = None
+    max_sessions: int = 256
+    max_connecting: int = 16
+    max_queue: int = 256
+    quantum_bytes: int = 64 * 1024
+    metrics_interval: float = 1.0
+
+
+class _ShardWorker:
+    """工作进程中运行的事件循环，管理本进程的 SessionManager"""
+
+    def __init__(self, index: int, options: ShardOptions, commands, events):
+        self._index = index
+        self._options = options
+        self._commands = commands
+        self._events = events
+        self._stopped: Optional[asyncio.Event] = None
+        self._manager: Optional[SessionManager] = None
+        self._handler: SessionHandler = _ignore_message
+        self._tasks: set[asyncio.Task] = set()
+        # request_id -> 尚未完成的建连任务
+        self._opening: dict[str, asyncio.Task] = {}
+        self.dropped = 0
+
+    async def run(self):
+        options = self._options
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        token_provider = TokenProvider.for_key(options.api_key) if options.api_key else None
+        self._manager = SessionManager(
+            options.url,
+            headers=options.headers,
+            params=options.params,
+            token_provider=token_provider,
+            max_sessions=options.max_sessions,
+            max_connecting=options.max_connecting,
+            max_queue=options.max_queue,
+            quantum_bytes=options.quantum_bytes,
+        )
+        if options.handler_factory is not None:
+            self._handler = options.handler_factory()
+        threading.Thread(target=self._read_commands, args=(loop,), daemon=True).start()
+        metrics = loop.create_task(self._report_metrics())
+        self._events.put(("ready", self._index, os.getpid()))
+        await self._stopped.wait()
+        metrics.cancel()
+        self._report()
+
+    def _read_commands(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            command = self._commands.get()
+            loop.call_soon_threadsafe(self._dispatch, command)
+            if command[0] == "stop":
+                return
+
+    def _dispatch(self, command: tuple):
+        match command:
+            case ("open", request_id, session_id, params):
+                self._opening[request_id] = self._spawn(self._open(request_id, session_id, params))
+            case ("cancel", request_id, session_id):
+                # 管理进程等待建连超时：取消仍在进行的建连，已经建立的会话直接关闭
+                task = self._opening.pop(request_id, None)
+                if task is not None:
+                    task.cancel()
+                else:
+                    session = self._manager.get(session_id)
+                    if session is not None:
+                        session.abort()
+            case ("send", session_id, message):
+                session = self._manager.get(session_id)
+                try:
+                    if session is None:
+                        raise KeyError(session_id)
+                    session.send_nowait(message)
+                except (KeyError, RuntimeError, asyncio.QueueFull):
+                    self.dropped += 1
+            case ("close", session_id, timeout):
+                session = self._manager.get(session_id)
+                if session is not None:
+                    self._spawn(session.close(timeout))
+            case ("stop", timeout):
+                self._spawn(self._stop(timeout))
+
+    async def _open(self, request_id: str, session_id: str, params: Optional[dict[str, Any]]):
+        try:
+            session = await self._manager.open(self._handler, session_id=session_id, params=params)
+        except Exception as e:
+            self._events.put(("opened", self._index, request_id, session_id, repr(e)))
+            return
+        finally:
+            self._opening.pop(request_id, None)
+        self._events.put(("opened", self._index, request_id, session_id, None))
+        await session.wait_closed()
+        error = repr(session.error) if session.error is not None else None
+        self._events.put(("closed", self._index, session_id, error))
+
+    async def _stop(self, timeout: Optional[float]):
+        await self._manager.drain(timeout)
+        self._stopped.set()
+
+    async def _report_metrics(self):
+        while True:
+            await asyncio.sleep(self._options.metrics_interval)
+            self._report()
+
+    def _report(self):
+        stats = self._manager.stats()
+        stats.pop("per_session")
+        stats["dropped"] = self.dropped
+        self._events.put(("metrics", self._index, stats))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+
+def _worker_main(index: int, options: ShardOptions, commands, events):
+    asyncio.run(_ShardWorker(index, options, commands, events).run())
+
+
+@dataclass
+class _WorkerHandle:
+    index: int
+    process: Any = None
+    commands: Any = None
+    pid: Optional[int] = None
+    sessions: set[str] = field(default_factory=set)
+    pending: int = 0
+    metrics: dict[str, Any] = field(default_factory=dict)
+    restarts: int = 0
+
+    @property
+    def load(self) -> int:
+        return len(self.sessions) + self.pending
+
+
+class ShardSupervisor:
+    """多进程会话分片
+
+    启动 N 个工作进程，每个进程有独立的事件循环和 SessionManager，用满多核。
+    新会话分配给当前负载（会话数 + 正在建立的会话数）最低的进程；调用方只通过
+    session_id 操作会话，不需要知道会话在哪个进程上。工作进程意外退出时自动重启，
+    其上的会话按原来的 session_id 和参数重新分配到负载最低的进程（服务端对话状态会丢失）。
+
+    收到的服务器消息在工作进程内由 handler_factory() 创建的 handler 处理，
+    音频编解码等重活也应当放在 handler 中完成；handler_factory 必须可以被 pickle
+    （模块级函数）。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        workers: Optional[int] = None,
+        handler_factory: Optional[Callable[[], SessionHandler]] = None,
+        api_key: Optional[str] = None,
+        headers: Optional[dict[str, str]] = None,
+        params: Optional[dict[str, Any]] = None,
+        sessions_per_worker: int = 256,
+        reopen_lost_sessions: bool = True,
+        metrics_interval: float = 1.0,
+        check_interval: float = 0.5,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None,
+        **manager_options,
+    ):
+        """初始化分片管理器
+
+        Args:
+            url: WebSocket服务器地址
+            workers: 工作进程数，默认等于 CPU 核数
+            handler_factory: 在每个工作进程中调用一次，返回处理服务器消息的 handler(session, message)
+            api_key: 可选，API Key，每个工作进程各自签发和缓存 JWT
+            headers: 请求头
+            params: URL参数
+            sessions_per_worker: 每个工作进程的会话数上限
+            reopen_lost_sessions: 工作进程退出后是否重建它的会话
+            metrics_interval: 工作进程上报指标的间隔（秒）
+            check_interval: 检查工作进程存活的间隔（秒）
+            mp_context: multiprocessing 上下文，默认使用 spawn
+            manager_options: 传给 SessionManager 的其他参数（max_connecting、max_queue、quantum_bytes）
+        """
+        self._options = ShardOptions(
+            url=url,
+            headers=headers,
+            params=params,
+            api_key=api_key,
+            handler_factory=handler_factory,
+            max_sessions=sessions_per_worker,
+            metrics_interval=metrics_interval,
+            **manager_options,
+        )
+        self._context = mp_context or multiprocessing.get_context("spawn")
+        self._workers = [_WorkerHandle(index) for index in range(workers or os.cpu_count() or 1)]
+        self._reopen = reopen_lost_sessions
+        self._check_interval = check_interval
+        self._events = self._context.Queue()
+        self._placement: dict[str, int] = {}
+        self._session_params: dict[str, Optional[dict[str, Any]]] = {}
+        self._opening: dict[str, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = False
+        self.lost_sessions = 0
+
+    async def start(self):
+        """启动所有工作进程"""
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._read_events, daemon=True).start()
+        for worker in self._workers:
+            self._start_worker(worker)
+        self._monitor = self._loop.create_task(self._watch_workers())
+
+    async def open(self, session_id: Optional[str] = None, params: Optional[dict[str, Any]] = None,
+                   timeout: Optional[float] = 30.0) -> str:
+        """在负载最低的工作进程上建立会话
+
+        Args:
+            session_id: 可选，会话标识，默认随机生成
+            params: 可选，该会话额外的 URL 参数
+            timeout: 等待建连完成的时间（秒），超时后工作进程取消建连或关闭已建立的会话
+
+        Returns:
+            会话标识
+
+        Raises:
+            SessionLimitError: 所有工作进程都已满或正在关闭
+        """
+        if self._stopping:
+            raise SessionLimitError("分片管理器正在关闭")
+        session_id = session_id or uuid.uuid4().hex
+        if session_id in self._placement:
+            raise ValueError(f"会话 {session_id} 已存在")
+        candidates = [
+            worker for worker in self._workers
+            if worker.process is not None and worker.process.is_alive()
+            and worker.load < self._options.max_sessions
+        ]
+        if not candidates:
+            raise SessionLimitError("所有工作进程的会话数均已达上限")
+        worker = min(candidates, key=lambda w: (w.load, w.metrics.get("send_time", 0.0)))
+        request_id = str(next(self._request_ids))
+        future = self._loop.create_future()
+        self._opening[request_id] = future
+        worker.pending += 1
+        self._placement[session_id] = worker.index
+        self._session_params[session_id] = params
+        try:
+            worker.commands.put(("open", request_id, session_id, params))
+            error = await asyncio.wait_for(future, timeout)
+        except BaseException:
+            # 超时或被取消时工作进程可能仍在建连，通知它放弃，避免留下无人关闭的会话
+            worker.commands.put(("cancel", request_id, session_id))
+            self._forget(session_id)
+            raise
+        finally:
+            worker.pending -= 1
+            self._opening.pop(request_id, None)
+        if error is not None:
+            self._forget(session_id)
+            raise ConnectionError(f"会话 {session_id} 建连失败: {error}")
+        return session_id
+
+    def send(self, session_id: str, message):
+        """把消息转发给会话所在的工作进程，不等待发送完成
+
+        Args:
+            session_id: 会话标识
+            message: 消息模型、dict 或 JSON 文本，需要可以被 pickle
+        """
+        index = self._placement.get(session_id)
+        if index is None:
+            raise KeyError(session_id)
+        self._workers[index].commands.put(("send", session_id, message))
+
+    def close_session(self, session_id: str, timeout: Optional[float] = None):
+        """发送完已排队的消息后关闭会话"""
+        index = self._placement.get(session_id)
+        if index is not None:
+            self._session_params.pop(session_id, None)
+            self._workers[index].commands.put(("close", session_id, timeout))
+
+    def worker_of(self, session_id: str) -> Optional[int]:
+        """会话所在的工作进程序号，仅用于排查问题"""
+        return self._placement.get(session_id)
+
+    def metrics(self) -> dict[str, Any]:
+        """所有工作进程的汇总指标，以及每个进程最近一次上报的指标"""
+        totals: dict[str, Any] = {name: 0 for name in _SUMMED_METRICS}
+        totals["dropped"] = 0
+        for worker in self._workers:
+            for name in totals:
+                totals[name] += worker.metrics.get(name, 0)
+        totals["workers"] = [
+            {
+                "index": worker.index,
+                "pid": worker.pid,
+                "alive": worker.process is not None and worker.process.is_alive(),
+                "assigned": len(worker.sessions),
+                "restarts": worker.restarts,
+                **worker.metrics,
+            }
+            for worker in self._workers
+        ]
+        totals["restarts"] = sum(worker.restarts for worker in self._workers)
+        totals["lost_sessions"] = self.lost_sessions
+        return totals
+
+    async def stop(self, timeout: Optional[float] = 10.0):
+        """排空所有会话并停止工作进程"""
+        self._stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.commands.put(("stop", timeout))
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            join_timeout = timeout + 5 if timeout is not None else None
+            await self._loop.run_in_executor(None, worker.process.join, join_timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self._events.put(None)
+
+    def _start_worker(self, worker: _WorkerHandle):
+        worker.commands = self._context.Queue()
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(worker.index, self._options, worker.commands, self._events),
+            name=f"rtclient-shard-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.pid = worker.process.pid
+        worker.metrics = {}
+
+    async def _watch_workers(self):
+        while True:
+            await asyncio.sleep(self._check_interval)
+            for worker in self._workers:
+                if self._stopping or worker.process.is_alive():
+                    continue
+                lost = list(worker.sessions)
+                worker.sessions.clear()
+                worker.restarts += 1
+                self.lost_sessions += len(lost)
+                self._start_worker(worker)
+                for session_id in lost:
+                    params = self._session_params.get(session_id)
+                    self._forget(session_id)
+                    if self._reopen:
+                        self._spawn(self._reopen_session(session_id, params))
+
+    async def _reopen_session(self, session_id: str, params: Optional[dict[str, Any]]):
+        try:
+            await self.open(session_id, params)
+        except Exception:
+            # 重建失败时该会话视为已丢失，已计入 lost_sessions
+            pass
+
+    def _read_events(self):
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError, queue.Empty):
+                return
+            if event is None:
+                return
+            self._loop.call_soon_threadsafe(self._handle_event, event)
+
+    def _handle_event(self, event: tuple):
+        match event:
+            case ("ready", index, pid):
+                self._workers[index].pid = pid
+            case ("metrics", index, stats):
+                self._workers[index].metrics = stats
+            case ("opened", index, request_id, session_id, error):
+                if error is None and self._placement.get(session_id) == index:
+                    self._workers[index].sessions.add(session_id)
+                future = self._opening.get(request_id)
+                if future is not None and not future.done():
+                    future.set_result(error)
+            case ("closed", index, session_id, _):
+                if session_id in self._workers[index].sessions:
+                    self._forget(session_id)
+
+    def _forget(self, session_id: str):
+        index = self._placement.pop(session_id, None)
+        self._session_params.pop(session_id, None)
+        if index is not None:
+            self._workers[index].sessions.discard(session_id)
+
+    def _spawn(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
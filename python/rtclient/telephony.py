@@ -0,0 +1,296 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import base64
+import math
+from collections.abc import Callable
+from typing import Any, Literal, Optional
+
+from rtclient.audio_stream import BytesLike, PcmFormat, wav_header
+from rtclient.fast_messages import audio_append
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy 为可选依赖
+    np = None
+
+G711Codec = Literal["pcmu", "pcma"]
+TELEPHONY_FORMAT = PcmFormat(sample_rate=8000, channels=1, sample_width=2)
+
+_tables: dict[str, tuple[Any, Any]] = {}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("电话桥接需要安装 numpy")
+
+
+def _ulaw_tables():
+    codes = np.arange(256, dtype=np.int32)
+    u = ~codes & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = ((((u & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    decode = np.where(u & 0x80, -magnitude, magnitude).astype(np.int16)
+
+    # 与 ITU-T G.711 参考实现（g711.c）相同：取高 14 位，加偏置后按段编码
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    biased = np.minimum(np.abs(pcm), 8159) + 0x21
+    segment = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), biased)
+    value = np.where(segment >= 8, 0x7F, (np.minimum(segment, 7) << 4) | ((biased >> (segment + 1)) & 0x0F))
+    encode = (value ^ mask).astype(np.uint8)
+    # 按 int16 的位模式（uint16）索引，编码时不需要转换类型
+    return decode, np.roll(encode, -32768)
+
+
+def _alaw_tables():
+    codes = np.arange(256, dtype=np.int32)
+    a = codes ^ 0x55
+    exponent = (a >> 4) & 0x07
+    mantissa = (a & 0x0F) << 4
+    magnitude = np.where(exponent == 0, mantissa + 8, (mantissa + 0x108) << np.maximum(exponent - 1, 0))
+    decode = np.where(a & 0x80, magnitude, -magnitude).astype(np.int16)
+
+    pcm = np.arange(-32768, 32768, dtype=np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    pcm = np.where(pcm >= 0, pcm, -pcm - 1)
+    segment = np.searchsorted(np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]), pcm)
+    shift = np.where(segment < 2, 1, segment)
+    value = np.where(segment >= 8, 0x7F, (np.minimum(segment, 7) << 4) | ((pcm >> shift) & 0x0F))
+    encode = ((value ^ mask) & 0xFF).astype(np.uint8)
+    return decode, np.roll(encode, -32768)
+
+
+def g711_tables(codec: G711Codec) -> tuple[Any, Any]:
+    """G.711 查找表：(256 项的解码表 -> int16，65536 项的编码表，按 int16 位模式索引 -> uint8)"""
+    _require_numpy()
+    tables = _tables.get(codec)
+    if tables is None:
+        if codec == "pcmu":
+            tables = _ulaw_tables()
+        elif codec == "pcma":
+            tables = _alaw_tables()
+        else:
+            raise ValueError(f"不支持的 G.711 编码: {codec}")
+        _tables[codec] = tables
+    return tables
+
+
+def g711_decode(payload: BytesLike, codec: G711Codec = "pcmu"):
+    """G.711 负载解码为 int16 数组"""
+    decode, _ = g711_tables(codec)
+    return decode[np.frombuffer(payload, dtype=np.uint8)]
+
+
+def g711_encode(pcm, codec: G711Codec = "pcmu") -> bytes:
+    """int16 PCM（数组或字节）编码为 G.711 负载"""
+    _, encode = g711_tables(codec)
+    samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+    return encode[samples.astype(np.int16, copy=False).view(np.uint16)].tobytes()
+
+
+class Resampler:
+    """有状态的多相 FIR 重采样器
+
+    按 out_rate / in_rate 的最简分数 L / M 做多相分解：每个相位的滤波用 np.convolve 计算，
+    块与块之间保留滤波器长度的历史样本和相位位置，连续处理任意长度的块与一次性处理整段的
+    结果相同，分块边界不会产生咔哒声。输出下标按 (块长, 相位) 缓存，固定帧长时每块只有
+    L 次卷积和一次取值。
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 16):
+        """初始化
+
+        Args:
+            in_rate: 输入采样率
+            out_rate: 输出采样率
+            taps_per_phase: 每个相位的滤波器阶数，越大过渡带越窄、计算量越大
+        """
+        _require_numpy()
+        divisor = math.gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        factor = max(self.up, self.down)
+        taps = taps_per_phase * factor if self.up != self.down else 1
+        taps += -taps % self.up
+        # 以上采样后的速率归一化，截止频率取输入、输出奈奎斯特频率中较低者，Kaiser 窗
+        n = np.arange(taps) - (taps - 1) / 2
+        cutoff = 0.5 / factor
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(taps, 8.0) if taps > 1 else np.ones(1)
+        h *= self.up / h.sum()
+        # phases[p, j] = h[p + j * up]
+        self._phases = h.reshape(-1, self.up).T.astype(np.float32).copy()
+        self._history = np.zeros(self._phases.shape[1] - 1, dtype=np.float32)
+        # 下一个输出样本在上采样坐标中相对当前块起点的位置
+        self._position = 0
+        self._index_cache: dict[tuple[int, int], tuple[Any, Any, int]] = {}
+
+    @property
+    def delay(self) -> float:
+        """滤波器群延迟（输出样本）"""
+        return (self._phases.size - 1) / 2 / self.down
+
+    def reset(self):
+        """清空滤波器状态，例如响应被取消后"""
+        self._history[:] = 0
+        self._position = 0
+
+    def _indices(self, size: int) -> tuple[Any, Any, int]:
+        key = (size, self._position)
+        cached = self._index_cache.get(key)
+        if cached is None:
+            end = size * self.up
+            positions = np.arange(self._position, end, self.down)
+            next_position = (positions[-1] + self.down - end) if len(positions) else self._position - end
+            cached = (positions % self.up, positions // self.up, next_position)
+            if len(self._index_cache) < 64:
+                self._index_cache[key] = cached
+        return cached
+
+    def process(self, samples) -> Any:
+        """重采样一块 float32 / int16 样本，返回 float32 数组"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.up == self.down:
+            return samples
+        buffer = np.concatenate((self._history, samples)) if len(self._history) else samples
+        phase, index, self._position = self._indices(len(samples))
+        if self.up == 1:
+            output = np.convolve(buffer, self._phases[0], "valid")[index]
+        else:
+            filtered = np.stack([np.convolve(buffer, taps, "valid") for taps in self._phases])
+            output = filtered[phase, index]
+        if len(self._history):
+            self._history = buffer[-len(self._history):]
+        return output
+
+
+def _to_int16(samples) -> Any:
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+
+class TelephonyBridge:
+    """电话线路（8kHz G.711）与实时会话之间的音频桥接
+
+    上行：RTP 负载按查找表解码为 PCM，重采样到会话输入采样率，凑够 append_ms 后发送
+    input_audio_buffer.append（PCM 输入模式下发送原始帧，否则封装为 WAV）。
+    下行：response.audio.delta 解码后重采样到 8kHz，按查找表编码，切成 frame_ms 的 G.711 帧，
+    不足一帧的尾部留到下一个 delta。
+
+    编解码只做 numpy 查表，重采样器跨包保存滤波器状态，每路通话每个方向一个实例，
+    适合在一个事件循环上承载大量并发通话。音频只支持单声道 16bit。
+    """
+
+    def __init__(
+        self,
+        client,
+        output_format: PcmFormat,
+        codec: G711Codec = "pcmu",
+        input_format: Optional[PcmFormat] = None,
+        frame_ms: int = 20,
+        append_ms: int = 20,
+        on_frame: Optional[Callable[[bytes], Any]] = None,
+    ):
+        """初始化
+
+        Args:
+            client: RTLowLevelClient，用于发送上行音频
+            output_format: 会话 output_audio_format 为 pcm 时服务端输出的音频格式
+            codec: pcmu（μ-law）或 pcma（A-law）
+            input_format: 会话输入音频格式，默认使用 client.input_pcm_format，未启用 PCM 输入时为 16kHz
+            frame_ms: 下行 G.711 帧时长（毫秒）
+            append_ms: 上行每条 append 的最短时长（毫秒），大于 RTP 包长时合并多个包
+            on_frame: 可选，每产生一帧下行 G.711 数据时调用，例如 RTP 发送函数
+        """
+        _require_numpy()
+        self.client = client
+        self.codec = codec
+        self.wav = getattr(client, "input_pcm_format", None) is None
+        self.input_format = input_format or getattr(client, "input_pcm_format", None) or PcmFormat()
+        self.output_format = output_format
+        for pcm_format in (self.input_format, self.output_format):
+            if pcm_format.channels != 1 or pcm_format.sample_width != 2:
+                raise ValueError(f"电话桥接只支持单声道 16bit 音频: {pcm_format}")
+        self.on_frame = on_frame
+        self.frame_bytes = TELEPHONY_FORMAT.sample_rate * frame_ms // 1000
+        self._decode, self._encode = g711_tables(codec)
+        self._upsampler = Resampler(TELEPHONY_FORMAT.sample_rate, self.input_format.sample_rate)
+        self._downsampler = Resampler(self.output_format.sample_rate, TELEPHONY_FORMAT.sample_rate)
+        self._append_samples = self.input_format.sample_rate * append_ms // 1000
+        self._inbound: list = []
+        self._inbound_samples = 0
+        self._outbound = b""
+        self._odd_byte = b""
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def decode_inbound(self, payload: BytesLike) -> bytes:
+        """把一个 RTP 负载转换为会话输入格式的 PCM"""
+        samples = self._decode[np.frombuffer(payload, dtype=np.uint8)]
+        return _to_int16(self._upsampler.process(samples)).tobytes()
+
+    async def send_inbound(self, payload: BytesLike):
+        """处理一个上行 RTP 负载，累计到 append_ms 后发送 input_audio_buffer.append"""
+        self.frames_in += 1
+        pcm = self.decode_inbound(payload)
+        self._inbound.append(pcm)
+        self._inbound_samples += len(pcm) // 2
+        if self._inbound_samples >= self._append_samples:
+            await self.flush_inbound()
+
+    async def flush_inbound(self):
+        """立即发送尚未发送的上行音频"""
+        if not self._inbound:
+            return
+        pcm = b"".join(self._inbound) if len(self._inbound) > 1 else self._inbound[0]
+        self._inbound.clear()
+        self._inbound_samples = 0
+        if self.wav:
+            pcm = wav_header(self.input_format, len(pcm)) + pcm
+        await self.client.send(audio_append(base64.b64encode(pcm).decode("ascii")))
+
+    def encode_outbound(self, pcm: BytesLike) -> list[bytes]:
+        """把一段会话输出格式的 PCM 转换为 G.711 帧，返回凑满的帧"""
+        if self._odd_byte:
+            pcm = self._odd_byte + bytes(pcm)
+        usable = len(pcm) - len(pcm) % 2
+        self._odd_byte = bytes(pcm[usable:])
+        samples = np.frombuffer(pcm, dtype=np.int16, count=usable // 2)
+        encoded = self._encode[_to_int16(self._downsampler.process(samples)).view(np.uint16)].tobytes()
+        data = self._outbound + encoded if self._outbound else encoded
+        size = self.frame_bytes
+        whole = len(data) - len(data) % size
+        self._outbound = data[whole:]
+        frames = [data[start:start + size] for start in range(0, whole, size)]
+        self.frames_out += len(frames)
+        if self.on_frame is not None:
+            for frame in frames:
+                self.on_frame(frame)
+        return frames
+
+    def handle(self, message: Any) -> list[bytes]:
+        """处理一条服务端消息，response.audio.delta 转换为下行 G.711 帧，其余消息返回空列表"""
+        msg_type = message.get("type") if isinstance(message, dict) else getattr(message, "type", None)
+        if msg_type != "response.audio.delta":
+            return []
+        delta = message.get("delta") if isinstance(message, dict) else message.delta
+        return self.encode_outbound(base64.b64decode(delta)) if delta else []
+
+    def flush_outbound(self) -> Optional[bytes]:
+        """用静音补齐最后一帧，例如在 response.done 之后调用"""
+        if not self._outbound:
+            return None
+        silence = self._encode[0]
+        frame = self._outbound + bytes([silence]) * (self.frame_bytes - len(self._outbound))
+        self._outbound = b""
+        self.frames_out += 1
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        return frame
+
+    def clear_outbound(self):
+        """丢弃未发出的下行音频并重置滤波器，用于用户打断、response.cancel 之后"""
+        self._outbound = b""
+        self._odd_byte = b""
+        self._downsampler.reset()
@@ -0,0 +1,241 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import base64
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from rtclient.audio_stream import PcmFormat, parse_wav
+
+# 首个响应增量事件，收到即视为模型开始输出
+_FIRST_DELTA_TYPES = frozenset({
+    "response.audio.delta",
+    "response.audio_transcript.delta",
+    "response.text.delta",
+    "response.function_call_arguments.delta",
+    "response.function_call_arguments.done",
+})
+_WAV_HEADER_SIZE = 44
+
+
+class Clock:
+    """以墙上时间为起点、按单调时钟递增的时钟
+
+    time.time() 会被 NTP 校时调整，loop.time() 没有绝对起点，两者混用时
+    client_timestamp 之间无法直接相减。这里在创建时记下一次墙上时间，之后只按
+    time.monotonic() 累加：数值可以当作 Unix 毫秒时间戳发送给服务端，差值又不受校时影响。
+    """
+
+    def __init__(self):
+        self._wall = time.time()
+        self._monotonic = time.monotonic()
+
+    def now(self) -> float:
+        """当前时间（秒）"""
+        return self._wall + (time.monotonic() - self._monotonic)
+
+    def now_ms(self) -> int:
+        """当前时间（整数毫秒），用于 client_timestamp"""
+        return int(self.now() * 1000)
+
+
+_clock = Clock()
+
+
+def timestamp_ms() -> int:
+    """进程内统一的 client_timestamp（毫秒）"""
+    return _clock.now_ms()
+
+
+def stamp(message: Any, clock: Clock = _clock) -> Any:
+    """为没有 client_timestamp 的消息补上时间戳
+
+    pydantic 消息直接赋值；dict 消息返回浅拷贝，不修改调用方的对象。
+    """
+    if isinstance(message, dict):
+        if message.get("client_timestamp") is None:
+            return {**message, "client_timestamp": clock.now_ms()}
+        return message
+    if getattr(message, "client_timestamp", 0) is None:
+        message.client_timestamp = clock.now_ms()
+    return message
+
+
+def _field(message: Any, name: str) -> Any:
+    if isinstance(message, dict):
+        return message.get(name)
+    return getattr(message, name, None)
+
+
+@dataclass
+class TurnLatency:
+    """一轮对话从用户说完到收到首个响应增量的耗时拆分（毫秒）
+
+    upload + vad + model + download == total。服务端事件不带服务端时间，服务端侧的时刻
+    按单程时延 = RTT / 2 推算；没有 RTT 样本时 upload 和 download 为 0，rtt_ms 为 None。
+    """
+
+    response_id: Optional[str]
+    item_id: Optional[str]
+    audio_end_ms: Optional[int]
+    total_ms: float
+    upload_ms: float
+    vad_ms: float
+    model_ms: float
+    download_ms: float
+    rtt_ms: Optional[float]
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class LatencyTracker:
+    """按轮次拆分端到端延迟
+
+    记录每条 input_audio_buffer.append 发出的时刻和累计音频时长，建立音频流位置与本地时间的
+    对应关系。服务端 VAD 的 speech_stopped 只给出音频流中的位置 audio_end_ms，据此找到这段音频
+    实际发出的时刻，再结合 ping 得到的 RTT，把延迟拆分为：
+
+    - upload: 音频从发出到到达服务端（RTT / 2）
+    - vad: 音频到达服务端到服务端判定说话结束（含静音等待时长）
+    - model: 判定说话结束（手动提交时为 commit / response.create 到达服务端）到发出首个响应增量
+    - download: 首个响应增量从服务端到达客户端（RTT / 2）
+
+    audio_end_ms 按会话开始以来累计发送的音频计算。传给 RTLowLevelClient 的 timing 参数后，
+    客户端会自动调用 on_send / handle / add_rtt；RTT 需要定期调用 client.ping() 采样。
+    """
+
+    def __init__(
+        self,
+        pcm_format: PcmFormat = PcmFormat(),
+        clock: Clock = _clock,
+        rtt_window: int = 16,
+        history: int = 1000,
+        send_log: int = 4096,
+        on_turn: Optional[Callable[[TurnLatency], Any]] = None,
+    ):
+        """初始化
+
+        Args:
+            pcm_format: 不带 WAV 文件头的 append 音频的格式，用于计算时长
+            clock: 时钟，默认使用进程内共享的时钟
+            rtt_window: 取最近多少个 RTT 样本的最小值作为无排队时的往返时延
+            history: 保留的轮次数
+            send_log: 保留的 append 发送记录数，需要覆盖 VAD 静音时长加上服务端处理时间
+            on_turn: 可选，每完成一轮调用一次
+        """
+        self.pcm_format = pcm_format
+        self.clock = clock
+        self.on_turn = on_turn
+        self.turns: deque[TurnLatency] = deque(maxlen=history)
+        self._rtts: deque[float] = deque(maxlen=rtt_window)
+        # (音频流结束位置 ms, 发出时刻 s)
+        self._sent: deque[tuple[float, float]] = deque(maxlen=send_log)
+        self.audio_position_ms = 0.0
+        self._manual_anchor: Optional[float] = None
+        # 等待 response.created 的轮次：(发出时刻, 服务端判定时刻, item_id, audio_end_ms)
+        self._pending: Optional[tuple[float, float, Optional[str], Optional[int]]] = None
+        self._responses: dict[str, tuple[float, float, Optional[str], Optional[int]]] = {}
+
+    @property
+    def rtt(self) -> Optional[float]:
+        """最近窗口内的最小 RTT（秒）"""
+        return min(self._rtts) if self._rtts else None
+
+    def add_rtt(self, rtt: float):
+        """记录一次 ping 往返时延（秒）"""
+        self._rtts.append(rtt)
+
+    def _one_way(self) -> float:
+        rtt = self.rtt
+        return rtt / 2 if rtt is not None else 0.0
+
+    def on_send(self, message: Any):
+        """记录一条发出的消息，需要在发送时调用"""
+        msg_type = _field(message, "type")
+        if msg_type == "input_audio_buffer.append":
+            audio = _field(message, "audio")
+            if audio:
+                self.audio_position_ms += self._audio_duration_ms(audio)
+                self._sent.append((self.audio_position_ms, self.clock.now()))
+        elif msg_type in ("input_audio_buffer.commit", "response.create"):
+            self._manual_anchor = self.clock.now()
+
+    def _audio_duration_ms(self, audio: str) -> float:
+        size = len(audio) // 4 * 3 - (audio.endswith("=") + audio.endswith("=="))
+        pcm_format = self.pcm_format
+        if audio.startswith("UklGR"):  # base64("RIFF")
+            try:
+                pcm_format, _ = parse_wav(base64.b64decode(audio[:60]))
+            except ValueError:
+                pass
+            size -= _WAV_HEADER_SIZE
+        return pcm_format.duration_ms(max(0, size))
+
+    def sent_at(self, audio_ms: float) -> Optional[float]:
+        """音频流中 audio_ms 位置所在的片段发出的时刻（秒），超出记录范围时返回 None"""
+        for end, sent_at in self._sent:
+            if end >= audio_ms:
+                return sent_at
+        return None
+
+    def handle(self, message: Any):
+        """处理收到的服务端消息，需要在收到时调用"""
+        msg_type = _field(message, "type")
+        if msg_type == "input_audio_buffer.speech_stopped":
+            now = self.clock.now()
+            audio_end_ms = _field(message, "audio_end_ms")
+            sent_at = self.sent_at(audio_end_ms) if audio_end_ms is not None else None
+            if sent_at is None and self._sent:
+                sent_at = self._sent[-1][1]
+            if sent_at is not None:
+                self._pending = (sent_at, now - self._one_way(), _field(message, "item_id"), audio_end_ms)
+                self._manual_anchor = None
+        elif msg_type == "response.created":
+            response_id = _field(_field(message, "response"), "id")
+            pending, self._pending = self._pending, None
+            if pending is None and self._manual_anchor is not None:
+                anchor, self._manual_anchor = self._manual_anchor, None
+                pending = (anchor, anchor + self._one_way(), None, None)
+            if pending is not None:
+                self._responses[response_id] = pending
+        elif msg_type in _FIRST_DELTA_TYPES:
+            pending = self._responses.pop(_field(message, "response_id"), None)
+            if pending is not None:
+                self._finish(_field(message, "response_id"), pending)
+        elif msg_type == "response.done":
+            self._responses.pop(_field(_field(message, "response"), "id"), None)
+
+    def _finish(self, response_id: Optional[str], pending: tuple[float, float, Optional[str], Optional[int]]):
+        sent_at, decided_at, item_id, audio_end_ms = pending
+        received_at = self.clock.now()
+        one_way = self._one_way()
+        arrived_at = sent_at + one_way
+        first_delta_at = received_at - one_way
+        rtt = self.rtt
+        turn = TurnLatency(
+            response_id=response_id,
+            item_id=item_id,
+            audio_end_ms=audio_end_ms,
+            total_ms=(received_at - sent_at) * 1000,
+            upload_ms=one_way * 1000,
+            vad_ms=(decided_at - arrived_at) * 1000,
+            model_ms=(first_delta_at - decided_at) * 1000,
+            download_ms=one_way * 1000,
+            rtt_ms=rtt * 1000 if rtt is not None else None,
+        )
+        self.turns.append(turn)
+        if self.on_turn is not None:
+            self.on_turn(turn)
+
+    def stats(self) -> dict[str, Any]:
+        """已完成轮次各阶段耗时的中位数和 p90（毫秒）"""
+        result: dict[str, Any] = {"turns": len(self.turns)}
+        for name in ("total", "upload", "vad", "model", "download"):
+            values = sorted(getattr(turn, f"{name}_ms") for turn in self.turns)
+            for label, p in (("p50", 0.5), ("p90", 0.9)):
+                result[f"{name}_{label}_ms"] = values[min(len(values) - 1, int(p * len(values)))] if values else None
+        return result
@@ -0,0 +1,376 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
+
+from rtclient.fast_messages import response_create
+from rtclient.models import (
+    FunctionCallOutputItem,
+    ItemCreateMessage,
+    ResponseDoneMessage,
+    ResponseFunctionCallArgumentsDoneMessage,
+)
+
+ToolExecutor = Literal["thread", "process", "inline"]
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolSpec:
+    """已注册工具的配置"""
+
+    name: str
+    func: Callable[..., Any]
+    is_async: bool
+    executor: ToolExecutor
+    timeout: Optional[float]
+    semaphore: Optional[asyncio.Semaphore]
+    description: Optional[str] = None
+    parameters: Optional[dict[str, Any]] = None
+    cache_ttl: Optional[float] = None
+
+    def definition(self) -> dict[str, Any]:
+        """session.update 中 tools 字段使用的函数定义"""
+        definition: dict[str, Any] = {"type": "function", "name": self.name}
+        if self.description is not None:
+            definition["description"] = self.description
+        if self.parameters is not None:
+            definition["parameters"] = self.parameters
+        return definition
+
+
+def _log_error(error: BaseException, message: Any):
+    logger.error("函数调用结果回传失败: %s", getattr(message, "type", message), exc_info=error)
+
+
+def _format_output(result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, ensure_ascii=False)
+
+
+class ToolResultCache:
+    """工具结果缓存
+
+    以工具名加规范化后的 JSON 参数（键排序、紧凑分隔符）为键，按工具分别设置 TTL，
+    超出容量时按 LRU 淘汰。同一进程内的多个会话可以通过 shared() 共用一个实例。
+    """
+
+    _shared: Optional["ToolResultCache"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        """初始化缓存
+
+        Args:
+            max_entries: 最多缓存的结果数
+            clock: 单调时钟（秒），便于测试替换
+        """
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: dict[str, list[int]] = {}
+
+    @classmethod
+    def shared(cls) -> "ToolResultCache":
+        """进程内共享的缓存实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def make_key(name: str, arguments: Any) -> str:
+        """工具名加规范化 JSON 参数组成的缓存键"""
+        return name + "\0" + json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+    def get(self, name: str, key: str) -> Optional[str]:
+        """查询缓存，过期的条目视为未命中"""
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0])
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    stats[0] += 1
+                    return entry[1]
+                del self._entries[key]
+            stats[1] += 1
+            return None
+
+    def set(self, key: str, output: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """按工具统计的命中数、未命中数和命中率"""
+        with self._lock:
+            return {
+                name: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                for name, (hits, misses) in self._stats.items()
+            }
+
+
+class ToolDispatcher:
+    """函数调用分发器
+
+    收到 response.function_call_arguments.done 后在后台任务中执行对应的工具，
+    不阻塞接收循环：异步工具直接在事件循环上运行，同步工具按注册时的配置放到
+    线程池或进程池中执行，每个工具可以单独设置超时和并发上限。
+
+    工具执行完成后自动发送 function_call_output 对话项；同一个响应中的所有
+    函数调用都完成、且该响应的 response.done 已经到达后，再发送一次 response.create。
+    因此接收循环需要把 response.done 也交给 handle()。
+
+    回传失败（例如连接已断开）时交给 on_error，该响应不再自动发送 response.create；
+    被取消或失败的响应不会自动续接。连接断开后 response.done 可能不再到达，aclose()
+    或 discard() 会清除这些响应的记录。
+    """
+
+    def __init__(
+        self,
+        client,
+        max_thread_workers: Optional[int] = None,
+        max_process_workers: Optional[int] = None,
+        default_timeout: Optional[float] = 30.0,
+        auto_response: bool = True,
+        cache: Optional[ToolResultCache] = None,
+        on_error: Optional[Callable[[BaseException, Any], Any]] = None,
+    ):
+        """初始化分发器
+
+        Args:
+            client: 用于回传结果的 RTLowLevelClient
+            max_thread_workers: 线程池大小
+            max_process_workers: 进程池大小
+            default_timeout: 工具默认超时（秒），None 表示不限制
+            auto_response: 结果回传后是否自动发送 response.create
+            cache: 可选，工具结果缓存，只对注册时设置了 cache_ttl 的工具生效
+            on_error: 可选，发送 function_call_output 或 response.create 失败时调用，参数为 (异常, 触发的消息)，
+                默认写入 rtclient.tools 日志
+        """
+        self._client = client
+        self._max_thread_workers = max_thread_workers
+        self._max_process_workers = max_process_workers
+        self._thread_pool: Optional[Executor] = None
+        self._process_pool: Optional[Executor] = None
+        self._default_timeout = default_timeout
+        self._auto_response = auto_response
+        self.cache = cache
+        self.on_error = on_error or _log_error
+        self._tools: dict[str, ToolSpec] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # response_id -> [未完成的函数调用数, response.done 是否已到达]
+        self._responses: dict[str, list] = {}
+
+    def register(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        *,
+        executor: ToolExecutor = "thread",
+        timeout: Optional[float] = ...,
+        max_concurrency: Optional[int] = None,
+        description: Optional[str] = None,
+        parameters: Optional[dict[str, Any]] = None,
+        cache_ttl: Optional[float] = None,
+    ):
+        """注册工具
+
+        工具以关键字参数接收模型生成的 arguments，返回值为字符串时原样回传，
+        否则按 JSON 序列化。
+
+        Args:
+            name: 工具名，对应函数调用的 name
+            func: 同步或异步函数；executor 为 process 时必须可以被 pickle
+            executor: 同步函数的执行位置，thread / process / inline（直接在事件循环上执行）
+            timeout: 超时（秒），默认使用 default_timeout，None 表示不限制
+            max_concurrency: 同时执行的上限，None 表示不限制
+            description: 工具描述，用于 definitions()
+            parameters: 参数的 JSON Schema，用于 definitions()
+            cache_ttl: 结果缓存时长（秒），None 表示不缓存；只适用于幂等的查询类工具
+        """
+        is_async = inspect.iscoroutinefunction(func)
+        if is_async and executor == "process":
+            raise ValueError(f"异步工具 {name} 不能在进程池中执行")
+        self._tools[name] = ToolSpec(
+            name=name,
+            func=func,
+            is_async=is_async,
+            executor=executor,
+            timeout=self._default_timeout if timeout is ... else timeout,
+            semaphore=asyncio.Semaphore(max_concurrency) if max_concurrency else None,
+            description=description,
+            parameters=parameters,
+            cache_ttl=cache_ttl,
+        )
+
+    def tool(self, name: Optional[str] = None, **options):
+        """以装饰器形式注册工具，参数同 register()"""
+
+        def decorator(func):
+            self.register(name or func.__name__, func, **options)
+            return func
+
+        return decorator
+
+    def definitions(self) -> list[dict[str, Any]]:
+        """所有已注册工具的定义，可直接作为 SessionUpdateParams.tools"""
+        return [spec.definition() for spec in self._tools.values()]
+
+    def handle(self, message) -> Optional[asyncio.Task]:
+        """处理一条服务器消息，函数调用会在后台任务中执行并返回该任务"""
+        match message:
+            case ResponseFunctionCallArgumentsDoneMessage():
+                self._responses.setdefault(message.response_id, [0, False])[0] += 1
+                return self._spawn(self._run(message))
+            case ResponseDoneMessage():
+                if message.response.status in ("cancelled", "failed"):
+                    self.discard(message.response.id)
+                    return None
+                state = self._responses.get(message.response.id)
+                if state is not None:
+                    state[1] = True
+                    if not state[0]:
+                        return self._spawn(self._respond(message.response.id, message))
+        return None
+
+    def discard(self, response_id: Optional[str] = None):
+        """不再为该响应（None 表示所有响应）自动发送 response.create
+
+        尚未开始的函数调用不再执行；进行中的函数调用仍会执行完并回传结果。
+        """
+        if response_id is None:
+            self._responses.clear()
+        else:
+            self._responses.pop(response_id, None)
+
+    async def call(self, name: str, arguments: str) -> str:
+        """执行工具并返回要回传的输出，失败和超时以 JSON 错误信息返回"""
+        spec = self._tools.get(name)
+        if spec is None:
+            return _format_output({"error": f"未注册的工具: {name}"})
+        try:
+            kwargs = json.loads(arguments) if arguments else {}
+        except json.JSONDecodeError as e:
+            return _format_output({"error": f"解析函数调用参数失败: {e}"})
+        cache_key = None
+        if self.cache is not None and spec.cache_ttl is not None:
+            cache_key = ToolResultCache.make_key(name, kwargs)
+            output = self.cache.get(name, cache_key)
+            if output is not None:
+                return output
+        try:
+            if spec.semaphore is None:
+                result = await asyncio.wait_for(self._invoke(spec, kwargs), spec.timeout)
+            else:
+                async with spec.semaphore:
+                    result = await asyncio.wait_for(self._invoke(spec, kwargs), spec.timeout)
+        except TimeoutError:
+            return _format_output({"error": f"工具 {name} 执行超时"})
+        except Exception as e:
+            return _format_output({"error": f"工具 {name} 执行失败: {e}"})
+        output = _format_output(result)
+        if cache_key is not None:
+            self.cache.set(cache_key, output, spec.cache_ttl)
+        return output
+
+    async def wait(self):
+        """等待所有进行中的函数调用完成"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def aclose(self):
+        """等待进行中的函数调用完成，清除未结束的响应记录并关闭线程池和进程池"""
+        await self.wait()
+        self._responses.clear()
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        self._thread_pool = self._process_pool = None
+
+    async def _invoke(self, spec: ToolSpec, kwargs: dict[str, Any]):
+        if spec.is_async:
+            return await spec.func(**kwargs)
+        if spec.executor == "inline":
+            return spec.func(**kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(spec.executor), _call_with_kwargs, spec.func, kwargs)
+
+    def _pool(self, executor: ToolExecutor) -> Executor:
+        if executor == "process":
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(self._max_process_workers)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(self._max_thread_workers, thread_name_prefix="rtclient-tool")
+        return self._thread_pool
+
+    async def _run(self, message: ResponseFunctionCallArgumentsDoneMessage):
+        state = self._responses.get(message.response_id)
+        if state is None:
+            # 任务开始前响应已被取消或 discard()
+            return
+        try:
+            output = await self.call(message.name, message.arguments)
+            await self._client.send(
+                ItemCreateMessage(item=FunctionCallOutputItem(call_id=message.call_id, output=output))
+            )
+        except Exception as e:
+            # 结果没有送达，不能再为这个响应续接
+            self.discard(message.response_id)
+            await self._report(e, message)
+            return
+        finally:
+            state[0] -= 1
+        if not state[0] and state[1]:
+            await self._respond(message.response_id, message)
+
+    async def _respond(self, response_id: str, trigger: Any):
+        if self._responses.pop(response_id, None) is None or not self._auto_response:
+            return
+        try:
+            await self._client.send(response_create())
+        except Exception as e:
+            await self._report(e, trigger)
+
+    async def _report(self, error: BaseException, message: Any):
+        try:
+            result = self.on_error(error, message)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("on_error 处理失败")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+
+def _call_with_kwargs(func: Callable[..., Any], kwargs: dict[str, Any]):
+    return func(**kwargs)
@@ -0,0 +1,227 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Optional
+
+from rtclient.models import (
+    ItemInputAudioTranscriptionCompletedMessage,
+    ResponseAudioTranscriptDeltaMessage,
+    ResponseAudioTranscriptDoneMessage,
+    ResponseDoneMessage,
+)
+
+# (response_id, item_id, content_index)，用户输入音频的转写没有 response_id，记为 None
+TranscriptKey = tuple[Optional[str], Optional[str], int]
+
+
+@dataclass(slots=True)
+class TranscriptEvent:
+    """转写增量事件
+
+    final 为 True 时 text 为完整文本，delta 为本次新增的部分（可能为空）。
+    """
+
+    key: TranscriptKey
+    delta: str
+    final: bool = False
+    text: Optional[str] = None
+
+    @property
+    def response_id(self) -> Optional[str]:
+        return self.key[0]
+
+    @property
+    def item_id(self) -> Optional[str]:
+        return self.key[1]
+
+    @property
+    def content_index(self) -> int:
+        return self.key[2]
+
+
+class _ActiveTranscript:
+    __slots__ = ("chunks", "length")
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.length = 0
+
+
+class _Subscriber:
+    """单个订阅者的事件队列，只有未定稿的增量事件计入上限"""
+
+    __slots__ = ("events", "partials", "waiter")
+
+    def __init__(self):
+        self.events: deque[Optional[TranscriptEvent]] = deque()
+        self.partials = 0
+        self.waiter: Optional[asyncio.Future] = None
+
+    def wake(self):
+        waiter = self.waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+
+class TranscriptAggregator:
+    """按 (response_id, item_id, content_index) 聚合转写文本
+
+    增量文本以分片列表保存，只在定稿时 join 一次，避免逐段字符串拼接带来的二次方开销。
+    模型输出的转写在 response.audio_transcript.done 时定稿；被打断的响应不会收到 done，
+    会在对应的 response.done 到达时用已收到的分片定稿。用户输入音频的转写
+    （conversation.item.input_audio_transcription.completed）一次到达，直接定稿。
+    """
+
+    def __init__(self, max_active: int = 64, max_finished: int = 256, queue_size: int = 1024):
+        """初始化转写聚合器
+
+        Args:
+            max_active: 最多同时跟踪的未定稿转写数，超出时按最早开始的顺序强制定稿
+            max_finished: 最多保留的已定稿转写数，超出时淘汰最早定稿的
+            queue_size: 每个订阅者排队的未定稿增量事件数上限
+        """
+        self._max_active = max_active
+        self._max_finished = max_finished
+        self._queue_size = queue_size
+        self._active: OrderedDict[TranscriptKey, _ActiveTranscript] = OrderedDict()
+        self._finished: OrderedDict[TranscriptKey, str] = OrderedDict()
+        self._by_response: dict[Optional[str], set[TranscriptKey]] = {}
+        self._subscribers: list[_Subscriber] = []
+        self.dropped_events = 0
+
+    def handle(self, message) -> Optional[TranscriptEvent]:
+        """处理一条服务器消息，非转写相关的消息会被忽略
+
+        Returns:
+            产生的转写事件，没有产生事件时返回 None
+        """
+        match message:
+            case ResponseAudioTranscriptDeltaMessage():
+                if not message.delta:
+                    return None
+                key = (message.response_id, message.item_id, message.content_index or 0)
+                return self._append(key, message.delta)
+            case ResponseAudioTranscriptDoneMessage():
+                key = (message.response_id, message.item_id, message.content_index or 0)
+                return self._finalize(key, message.transcript)
+            case ItemInputAudioTranscriptionCompletedMessage():
+                key = (None, message.item_id, message.content_index or 0)
+                return self._finalize(key, message.transcript or "")
+            case ResponseDoneMessage():
+                event = None
+                for key in list(self._by_response.get(message.response.id, ())):
+                    event = self._finalize(key, None)
+                return event
+        return None
+
+    def get(self, response_id: Optional[str], item_id: Optional[str], content_index: int = 0) -> Optional[str]:
+        """获取转写文本，未定稿的转写返回目前已收到的部分"""
+        key = (response_id, item_id, content_index)
+        if key in self._finished:
+            return self._finished[key]
+        active = self._active.get(key)
+        if active is None:
+            return None
+        return "".join(active.chunks)
+
+    def finished(self) -> list[tuple[TranscriptKey, str]]:
+        """按定稿顺序返回保留中的已定稿转写"""
+        return list(self._finished.items())
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def clear(self):
+        """丢弃所有转写，不影响订阅者"""
+        self._active.clear()
+        self._finished.clear()
+        self._by_response.clear()
+
+    async def stream(self) -> AsyncIterator[TranscriptEvent]:
+        """订阅转写事件的异步迭代器（从开始迭代时起生效），调用 close() 后结束
+
+        订阅者消费过慢、排队的增量事件达到 queue_size 时丢弃新到的增量事件并计入
+        dropped_events；定稿事件和结束标记总会送达，定稿事件携带完整文本，消费方可以据此对齐。
+        """
+        subscriber = _Subscriber()
+        self._subscribers.append(subscriber)
+        try:
+            while True:
+                while not subscriber.events:
+                    subscriber.waiter = asyncio.get_running_loop().create_future()
+                    try:
+                        await subscriber.waiter
+                    finally:
+                        subscriber.waiter = None
+                event = subscriber.events.popleft()
+                if event is None:
+                    return
+                if not event.final:
+                    subscriber.partials -= 1
+                yield event
+        finally:
+            self._subscribers.remove(subscriber)
+
+    def close(self):
+        """结束所有订阅"""
+        for subscriber in self._subscribers:
+            self._offer(subscriber, None)
+
+    def _append(self, key: TranscriptKey, delta: str) -> TranscriptEvent:
+        active = self._active.get(key)
+        if active is None:
+            if len(self._active) >= self._max_active:
+                self._finalize(next(iter(self._active)), None)
+            active = self._active[key] = _ActiveTranscript()
+            self._by_response.setdefault(key[0], set()).add(key)
+        active.chunks.append(delta)
+        active.length += len(delta)
+        event = TranscriptEvent(key, delta)
+        self._publish(event)
+        return event
+
+    def _finalize(self, key: TranscriptKey, transcript: Optional[str]) -> TranscriptEvent:
+        active = self._active.pop(key, None)
+        delta = ""
+        if active is not None:
+            keys = self._by_response.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_response[key[0]]
+            received = "".join(active.chunks)
+            if transcript is None:
+                transcript = received
+            elif transcript.startswith(received):
+                delta = transcript[active.length:]
+        elif transcript is None:
+            transcript = ""
+        else:
+            delta = transcript
+
+        self._finished[key] = transcript
+        self._finished.move_to_end(key)
+        while len(self._finished) > self._max_finished:
+            self._finished.popitem(last=False)
+
+        event = TranscriptEvent(key, delta, final=True, text=transcript)
+        self._publish(event)
+        return event
+
+    def _publish(self, event: TranscriptEvent):
+        for subscriber in self._subscribers:
+            self._offer(subscriber, event)
+
+    def _offer(self, subscriber: _Subscriber, event: Optional[TranscriptEvent]):
+        if event is not None and not event.final:
+            if subscriber.partials >= self._queue_size:
+                self.dropped_events += 1
+                return
+            subscriber.partials += 1
+        subscriber.events.append(event)
+        subscriber.wake()
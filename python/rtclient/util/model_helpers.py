@@ -1,10 +1,20 @@
 # Copyright (c) ZhiPu Corporation.
 # Licensed under the MIT license.
 
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ConfigDict, model_validator
 
 
-class ModelWithDefaults(BaseModel):
+class DeferredModel(BaseModel):
+    """首次校验或序列化时才构建 schema 的模型基类
+
+    大部分消息类型在一次会话中很少用到甚至用不到，推迟构建可以缩短 import rtclient.models 的时间；
+    高频消息可以在子类中设置 defer_build=False 在导入时构建，避免第一次使用时的额外开销。
+    """
+
+    model_config = ConfigDict(defer_build=True)
+
+
+class ModelWithDefaults(DeferredModel):
     @model_validator(mode="after")
     def _add_defaults(self):
         for field in self.model_fields:
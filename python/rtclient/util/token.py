@@ -0,0 +1,166 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT license.
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections.abc import Callable
+from typing import Optional
+
+_HEADER = {"alg": "HS256", "sign_type": "SIGN", "typ": "JWT"}
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+class TokenProvider:
+    """JWT 鉴权令牌
+
+    按接口文档的客户端鉴权方式，用 `{id}.{secret}` 格式的 API Key 以 HS256 签发包含
+    api_key、exp、timestamp 的 JWT。令牌缓存到过期前 refresh_margin 秒，start() 之后会在
+    后台提前刷新，建连时 get_token() 只读取缓存。同一个 API Key 的令牌可以给任意多个
+    客户端共用，for_key() 返回进程内共享的实例。
+
+    后台刷新任务按事件循环计数：每个事件循环上 start() 与 stop() 成对调用，最后一个使用者
+    stop() 后才停止该循环上的刷新任务；事件循环关闭后，残留的任务会在下次 start() 时丢弃。
+
+    也可以直接传给 RTLowLevelClient(token_provider=...)，建连时自动带上 Authorization 请求头。
+    """
+
+    _instances: dict[tuple[str, int], "TokenProvider"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        api_key: str,
+        ttl: int = 600,
+        refresh_margin: int = 60,
+        clock: Callable[[], float] = time.time,
+    ):
+        """初始化令牌提供者
+
+        Args:
+            api_key: `{id}.{secret}` 格式的 API Key
+            ttl: 令牌有效期（秒）
+            refresh_margin: 过期前多少秒刷新
+            clock: 墙上时钟（秒），便于测试替换
+        """
+        try:
+            key_id, secret = api_key.split(".", 1)
+        except ValueError:
+            raise ValueError("API Key 格式应为 {id}.{secret}") from None
+        if refresh_margin * 2 >= ttl:
+            raise ValueError("refresh_margin 必须小于 ttl 的一半")
+        self._key_id = key_id
+        self._signer = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+        self._header = _b64url(json.dumps(_HEADER, separators=(",", ":")).encode())
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self._clock = clock
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        # 事件循环 -> [刷新任务, 使用者数]
+        self._refresh_tasks: dict[asyncio.AbstractEventLoop, list] = {}
+        self.signed = 0
+
+    @classmethod
+    def for_key(cls, api_key: str, ttl: int = 600, **kwargs) -> "TokenProvider":
+        """进程内共享的令牌提供者，相同 API Key 和 ttl 返回同一个实例"""
+        with cls._instances_lock:
+            provider = cls._instances.get((api_key, ttl))
+            if provider is None:
+                provider = cls._instances[(api_key, ttl)] = cls(api_key, ttl=ttl, **kwargs)
+            return provider
+
+    def sign(self, ttl: Optional[int] = None) -> tuple[str, float]:
+        """签发一个新令牌，不影响缓存
+
+        Returns:
+            (令牌, 过期时间戳秒)
+        """
+        now = self._clock()
+        expires_at = int(now) + (ttl or self.ttl)
+        payload = {"api_key": self._key_id, "exp": expires_at, "timestamp": int(now * 1000)}
+        signing_input = self._header + b"." + _b64url(json.dumps(payload, separators=(",", ":")).encode())
+        signer = self._signer.copy()
+        signer.update(signing_input)
+        self.signed += 1
+        return (signing_input + b"." + _b64url(signer.digest())).decode("ascii"), expires_at
+
+    def get_token(self) -> str:
+        """返回缓存的令牌，缓存即将过期时同步刷新"""
+        if self._token is None or self._clock() >= self._expires_at - self.refresh_margin:
+            self.refresh()
+        return self._token
+
+    def refresh(self) -> str:
+        """立即签发新令牌并更新缓存"""
+        token, expires_at = self.sign()
+        with self._lock:
+            self._token, self._expires_at = token, expires_at
+        return token
+
+    @property
+    def expires_at(self) -> float:
+        return self._expires_at
+
+    def headers(self) -> dict[str, str]:
+        """带鉴权信息的请求头"""
+        return {"Authorization": f"Bearer {self.get_token()}"}
+
+    def start(self):
+        """在当前事件循环中启动后台刷新，已启动时只增加使用者计数"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for other in [other for other in self._refresh_tasks if other.is_closed()]:
+                del self._refresh_tasks[other]
+            entry = self._refresh_tasks.get(loop)
+            if entry is not None and not entry[0].done():
+                entry[1] += 1
+                return
+        if self._token is None:
+            self.refresh()
+        task = loop.create_task(self._refresh_loop())
+        with self._lock:
+            self._refresh_tasks[loop] = [task, 1]
+
+    async def stop(self):
+        """减少当前事件循环上的使用者计数，没有使用者时停止后台刷新"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._refresh_tasks.get(loop)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._refresh_tasks[loop]
+        task = entry[0]
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def running(self) -> bool:
+        """当前事件循环上的后台刷新是否在运行"""
+        try:
+            entry = self._refresh_tasks.get(asyncio.get_running_loop())
+        except RuntimeError:
+            return False
+        return entry is not None and not entry[0].done()
+
+    async def _refresh_loop(self):
+        # 比 get_token() 的同步刷新点再提前一个 refresh_margin，保证建连时总能命中缓存
+        while True:
+            delay = self._expires_at - 2 * self.refresh_margin - self._clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.refresh()
@@ -2,10 +2,13 @@
 # Licensed under the MIT license.
 
 import platform
+from functools import cache
 from importlib.metadata import version
 
 
+@cache
 def get_user_agent():
+    # 读取包元数据需要扫描 site-packages，进程内只计算一次
     package_version = version("rtclient")
     python_version = platform.python_version()
     return f"zhipu-rtclient/{package_version} Python/{python_version}"
@@ -0,0 +1,334 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+import hashlib
+import multiprocessing
+import time
+import warnings
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BytesIO
+from typing import Any, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow 为可选依赖，pip install rtclient[video]
+    Image = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy 为可选依赖，pip install rtclient[video]
+    np = None
+
+
+def _thumbnail_from_jpeg(frame: bytes, size: int) -> Optional[bytes]:
+    """把 JPEG 解码为 size x size 的灰度缩略图，未安装 Pillow 时返回 None"""
+    if Image is None:
+        return None
+    with Image.open(BytesIO(frame)) as image:
+        # draft 让 JPEG 解码器直接按 1/2、1/4、1/8 缩放输出，避免解码全分辨率图像
+        image.draft("L", (size * 4, size * 4))
+        return image.convert("L").resize((size, size), Image.BILINEAR).tobytes()
+
+
+def _thumbnail_from_pixels(pixels: Any, size: int) -> bytes:
+    """把 (H, W) 或 (H, W, C) 的像素数组按块平均缩小为 size x size 的灰度缩略图"""
+    if np is None:
+        raise ImportError("传入像素数组需要安装 numpy")
+    array = np.asarray(pixels, dtype=np.float32)
+    if array.ndim == 3:
+        array = array[..., :3].mean(axis=2)
+    height, width = array.shape
+    rows = np.linspace(0, height, size + 1).astype(np.intp)
+    cols = np.linspace(0, width, size + 1).astype(np.intp)
+    # 先按行分块求和再按列分块求和，再除以块面积得到块平均值
+    blocks = np.add.reduceat(np.add.reduceat(array, rows[:-1], axis=0), cols[:-1], axis=1)
+    area = np.outer(np.diff(rows), np.diff(cols)).clip(min=1)
+    return (blocks / area).clip(0, 255).astype(np.uint8).tobytes()
+
+
+def _difference(a: bytes, b: bytes) -> float:
+    """两张等大灰度缩略图的平均绝对差，归一化到 [0, 1]"""
+    if np is not None:
+        diff = np.abs(np.frombuffer(a, np.uint8).astype(np.int16) - np.frombuffer(b, np.uint8))
+        return float(diff.mean()) / 255.0
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255.0 * len(a))
+
+
+def preprocess_frame(frame: bytes, size: Optional[tuple[int, int]], quality: int) -> str:
+    """解码、缩放、重新编码 JPEG 并做 base64 编码，在工作进程中执行
+
+    Args:
+        frame: 原始图像（任意 Pillow 支持的格式）
+        size: 目标分辨率上限 (宽, 高)，保持宽高比缩小，不放大；None 表示不缩放
+        quality: JPEG 编码质量 1~95
+
+    Returns:
+        base64 编码的 JPEG
+    """
+    if Image is None:
+        raise ImportError("视频帧预处理需要安装 Pillow")
+    with Image.open(BytesIO(frame)) as image:
+        if size is not None:
+            image.draft("RGB", size)
+            image = image.convert("RGB")
+            image.thumbnail(size, Image.BILINEAR)
+        else:
+            image = image.convert("RGB")
+        output = BytesIO()
+        image.save(output, "JPEG", quality=quality)
+    return base64.b64encode(output.getbuffer()).decode("utf-8")
+
+
+class VideoPreprocessor:
+    """在进程池中预处理视频帧
+
+    解码、缩放、JPEG 重新编码和 base64 编码都在工作进程中完成，事件循环只接收
+    可以直接放进 InputVideoFrameAppendMessage 的结果。结果按提交顺序产出；
+    进程池处理不过来、排队的帧超过 max_pending 时丢弃最旧的帧。
+
+    自建的进程池以 spawn 方式启动工作进程，用完后需要调用 close()，或者以 with / async with
+    方式使用，退出时取消排队的帧并关闭进程池。需要安装 Pillow（pip install rtclient[video]）。
+    """
+
+    def __init__(
+        self,
+        size: Optional[tuple[int, int]] = (640, 480),
+        quality: int = 70,
+        max_workers: Optional[int] = None,
+        max_pending: int = 4,
+        executor: Optional[Executor] = None,
+        rate_controller: Any = None,
+    ):
+        """初始化预处理器
+
+        Args:
+            size: 目标分辨率上限 (宽, 高)，None 表示不缩放
+            quality: JPEG 编码质量
+            max_workers: 自建进程池的进程数，传入 executor 时忽略
+            max_pending: 最多排队（含处理中）的帧数
+            executor: 可选，共享的进程池；由调用方负责关闭
+            rate_controller: 可选，RateController；设置后每帧按其当前的 jpeg_quality 编码，忽略 quality
+        """
+        self.size = size
+        self.quality = quality
+        self.rate_controller = rate_controller
+        self._max_pending = max_pending
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._max_workers = max_workers
+        self._pending: deque[asyncio.Future] = deque()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self.submitted = 0
+        self.dropped = 0
+        self.failed = 0
+        self.last_error: Optional[BaseException] = None
+
+    def submit(self, frame: bytes):
+        """提交一帧，排队已满时丢弃最旧的帧"""
+        if self._closed:
+            raise RuntimeError("VideoPreprocessor 已关闭")
+        while len(self._pending) >= self._max_pending:
+            self._pending.popleft().cancel()
+            self.dropped += 1
+        loop = asyncio.get_running_loop()
+        self._pending.append(loop.run_in_executor(self._pool(), preprocess_frame, frame, self.size, self._quality()))
+        self.submitted += 1
+        self._wakeup.set()
+
+    async def process(self, frame: bytes) -> str:
+        """单独处理一帧，不经过排队"""
+        if self._closed:
+            raise RuntimeError("VideoPreprocessor 已关闭")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), preprocess_frame, frame, self.size, self._quality())
+
+    def _quality(self) -> int:
+        if self.rate_controller is not None:
+            return self.rate_controller.decision.jpeg_quality
+        return self.quality
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            # 调用方进程中已有事件循环和线程，fork 出的子进程可能继承到被占用的锁
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(self._max_workers, mp_context=context)
+        return self._executor
+
+    async def results(self) -> AsyncIterator[str]:
+        """按提交顺序产出处理好的 base64 帧，close() 之后排队的帧处理完即结束
+
+        处理失败的帧会被跳过，并记录在 failed / last_error 中。
+        """
+        while True:
+            if not self._pending:
+                if self._closed:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            future = self._pending[0]
+            await asyncio.wait((future,))
+            if self._pending and self._pending[0] is future:
+                self._pending.popleft()
+            if future.cancelled():
+                continue
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+                self.last_error = error
+                continue
+            yield future.result()
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self.results()
+
+    def close(self, wait: bool = False):
+        """不再接受新帧，并关闭自建的进程池；调用方传入的 executor 不会被关闭
+
+        Args:
+            wait: 是否等待进程池中正在处理的帧完成、工作进程退出
+        """
+        self._closed = True
+        self._wakeup.set()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _cancel_pending(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._cancel_pending()
+        self.close(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self._cancel_pending()
+        self.close()
+
+
+class FrameGate:
+    """视频帧变化检测门控
+
+    放在 InputVideoFrameAppendMessage 发送之前：与上一次实际发送的帧比较缩小后的灰度图，
+    变化小于阈值的帧直接跳过；距离上次发送超过 max_interval_ms 时强制发送一次，
+    保证服务端始终能拿到较新的画面。字节完全相同的帧不再解码，并复用缓存的 base64 编码。
+
+    JPEG 帧的变化检测需要 Pillow（pip install rtclient[video]）；未安装时创建门控会给出
+    RuntimeWarning，之后只能跳过字节完全相同的帧。调用方已有解码后的像素时可以通过
+    pixels 传入（需要 numpy），省去一次解码。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.02,
+        max_interval_ms: Optional[int] = 5000,
+        thumbnail_size: int = 16,
+        cache_size: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """初始化门控
+
+        Args:
+            threshold: 缩略图平均绝对差（0~1）低于该值时视为画面未变化
+            max_interval_ms: 最长多久强制发送一帧，None 表示不强制
+            thumbnail_size: 变化检测使用的缩略图边长
+            cache_size: 缓存 base64 编码结果的帧数
+            clock: 单调时钟（秒），便于测试替换
+        """
+        if Image is None:
+            warnings.warn(
+                "未安装 Pillow，FrameGate 只能跳过字节完全相同的帧；请安装 rtclient[video]",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        self._threshold = threshold
+        self._max_interval = max_interval_ms / 1000 if max_interval_ms is not None else None
+        self._size = thumbnail_size
+        self._cache_size = cache_size
+        self._clock = clock
+        self._encoded: OrderedDict[bytes, str] = OrderedDict()
+        self._last_digest: Optional[bytes] = None
+        self._last_thumbnail: Optional[bytes] = None
+        self._last_sent: Optional[float] = None
+        self.frames_seen = 0
+        self.frames_sent = 0
+        self.bytes_seen = 0
+        self.bytes_sent = 0
+
+    def check(self, frame: bytes, pixels: Any = None, now: Optional[float] = None) -> Optional[str]:
+        """判断一帧是否需要发送
+
+        Args:
+            frame: JPEG 编码的帧
+            pixels: 可选，该帧解码后的像素数组
+            now: 可选，当前时间（秒），默认取 clock()
+
+        Returns:
+            需要发送时返回 base64 编码的帧，否则返回 None
+        """
+        now = self._clock() if now is None else now
+        self.frames_seen += 1
+        self.bytes_seen += len(frame)
+        digest = hashlib.blake2b(frame, digest_size=16).digest()
+        due = self._last_sent is None or (
+            self._max_interval is not None and now - self._last_sent >= self._max_interval
+        )
+
+        if digest == self._last_digest:
+            if not due:
+                return None
+            return self._send(digest, frame, self._last_thumbnail, now)
+
+        if pixels is not None:
+            thumbnail = _thumbnail_from_pixels(pixels, self._size)
+        else:
+            thumbnail = _thumbnail_from_jpeg(frame, self._size)
+        if (
+            not due
+            and thumbnail is not None
+            and self._last_thumbnail is not None
+            and _difference(thumbnail, self._last_thumbnail) < self._threshold
+        ):
+            return None
+        return self._send(digest, frame, thumbnail, now)
+
+    def reset(self):
+        """忘记上一次发送的帧，下一帧一定会发送（例如 commit 之后开始新一轮时）"""
+        self._last_digest = None
+        self._last_thumbnail = None
+        self._last_sent = None
+
+    @property
+    def skip_ratio(self) -> float:
+        """被跳过的帧所占比例"""
+        if not self.frames_seen:
+            return 0.0
+        return 1 - self.frames_sent / self.frames_seen
+
+    def _send(self, digest: bytes, frame: bytes, thumbnail: Optional[bytes], now: float) -> str:
+        encoded = self._encoded.get(digest)
+        if encoded is None:
+            encoded = base64.b64encode(frame).decode("utf-8")
+            self._encoded[digest] = encoded
+            while len(self._encoded) > self._cache_size:
+                self._encoded.popitem(last=False)
+        else:
+            self._encoded.move_to_end(digest)
+        self._last_digest = digest
+        self._last_thumbnail = thumbnail
+        self._last_sent = now
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+        return encoded
@@ -2,8 +2,6 @@
 # Licensed under the MIT license.
 
 import asyncio
-import base64
-import json
 import os
 import signal
 import sys
@@ -14,13 +12,12 @@ from dotenv import load_dotenv
 from rtclient import RTLowLevelClient
 from rtclient.models import (
     ClientVAD,
-    FunctionCallOutputItem,
-    InputAudioBufferAppendMessage,
     InputAudioBufferCommitMessage,
-    ItemCreateMessage,
     SessionUpdateMessage,
     SessionUpdateParams,
 )
+from rtclient.timing import timestamp_ms
+from rtclient.tools import ToolDispatcher
 
 shutdown_event: Optional[asyncio.Event] = None
 
@@ -29,30 +26,25 @@ def handle_shutdown(sig=None, frame=None):
         print("\n正在关闭程序...")
         shutdown_event.set()
 
-def encode_wave_to_base64(wave_file_path):
-    """将WAV文件转换为base64编码"""
-    try:
-        with open(wave_file_path, 'rb') as audio_file:
-            return base64.b64encode(audio_file.read()).decode('utf-8')
-    except Exception as e:
-        print(f"音频文件处理错误: {str(e)}")
-        return None
+def phone_call(contact_name: str = '未知姓名') -> dict:
+    """模拟电话功能的响应"""
+    return {
+        "status": "success",
+        "message": f"成功拨打电话给 {contact_name}"
+    }
 
 async def send_audio(client: RTLowLevelClient, audio_file_path: str):
-    """发送音频"""
-    base64_content = encode_wave_to_base64(audio_file_path)
-    if base64_content is None:
-        print("音频编码失败")
+    """按 100ms 切片发送音频"""
+    try:
+        with open(audio_file_path, 'rb') as audio_file:
+            audio = audio_file.read()
+        chunks = await client.send_audio(audio, chunk_ms=100)
+    except (OSError, ValueError) as e:
+        print(f"音频文件处理错误: {str(e)}")
         return
-    
-    # 发送音频数据
-    audio_message = InputAudioBufferAppendMessage(
-        audio=base64_content,
-        client_timestamp=int(asyncio.get_event_loop().time() * 1000)
-    )
-    await client.send(audio_message)
+    print(f"已发送 {chunks} 个音频片段")
 
-async def receive_messages(client: RTLowLevelClient):
+async def receive_messages(client: RTLowLevelClient, dispatcher: ToolDispatcher):
     try:
         while not client.closed:
             if shutdown_event.is_set():
@@ -111,6 +103,7 @@ async def receive_messages(client: RTLowLevelClient):
                         if hasattr(message, 'response'):
                             print(f"  Response Id: {message.response.id}")
                             print(f"  Status: {message.response.status}")
+                        dispatcher.handle(message)
                     
                     case "response.audio.delta":
                         print("模型音频增量消息")
@@ -131,31 +124,8 @@ async def receive_messages(client: RTLowLevelClient):
                         print(f"  Function Name: {message.name}")
                         print(f"  Arguments: {message.arguments}")
                         
-                        # 解析函数调用参数
-                        try:
-                            args = json.loads(message.arguments)
-                            # 模拟电话功能的响应
-                            response = {
-                                "status": "success",
-                                "message": f"成功拨打电话给 {args.get('contact_name', '未知姓名')}"
-                            }
-                            
-                            # 创建函数调用输出项
-                            output_item = FunctionCallOutputItem(
-                                output=json.dumps(response, ensure_ascii=False)
-                            )
-                            
-                            # 发送函数调用结果
-                            create_message = ItemCreateMessage(
-                                item=output_item
-                            )
-                            await client.send(create_message)
-                            
-                            # 发送 response.create 让模型生成回复
-                            await client.send_json({"type": "response.create"})
-                            
-                        except json.JSONDecodeError as e:
-                            print(f"解析函数调用参数失败: {e}")
+                        # 工具在后台执行，结果回传和 response.create 由 dispatcher 完成，不阻塞接收循环
+                        dispatcher.handle(message)
                     
                     case "heartbeat":
                         print("心跳消息")
@@ -194,12 +164,13 @@ async def with_zhipu(audio_file_path: str):
             # 发送会话配置
             if shutdown_event.is_set():
                 return
-            # phone_call_tool 电话 tool
-            phone_call_tool = {
-                "type": "function",
-                "name": "phoneCall",
-                "description": "拨打电话给指定的联系人",
-                "parameters": {
+            # phoneCall 电话 tool
+            dispatcher = ToolDispatcher(client)
+            dispatcher.register(
+                "phoneCall",
+                phone_call,
+                description="拨打电话给指定的联系人",
+                parameters={
                     "type": "object",
                     "properties": {
                         "contact_name": {
@@ -208,8 +179,8 @@ async def with_zhipu(audio_file_path: str):
                         },
                     },
                     "required": ["contact_name"]
-                }
-            }
+                },
+            )
                 
             session_message = SessionUpdateMessage(
                 session=SessionUpdateParams(
@@ -222,7 +193,7 @@ async def with_zhipu(audio_file_path: str):
                         "tts_source": "e2e",
                         "auto_search": False
                     },
-                    tools=[phone_call_tool]  # 添加电话功能工具
+                    tools=dispatcher.definitions()  # 添加电话功能工具
                 )
             )
             await client.send(session_message)
@@ -235,13 +206,13 @@ async def with_zhipu(audio_file_path: str):
                 await send_audio(client, audio_file_path)
                 # 提交音频缓冲区
                 commit_message = InputAudioBufferCommitMessage(
-                    client_timestamp=int(asyncio.get_event_loop().time() * 1000)
+                    client_timestamp=timestamp_ms()
                 )
                 await client.send(commit_message)
             
             
             send_task = asyncio.create_task(send_audio_with_commit())
-            receive_task = asyncio.create_task(receive_messages(client))
+            receive_task = asyncio.create_task(receive_messages(client, dispatcher))
             
             # 等待任务完成
             try:
@@ -2,23 +2,22 @@
 # Licensed under the MIT license.
 
 import asyncio
-import base64
 import os
 import signal
 import sys
-import wave
-from io import BytesIO
 from typing import Optional
 
 from dotenv import load_dotenv
 
 from rtclient import RTLowLevelClient
+from rtclient.audio_stream import AudioChunker, PcmFormat, parse_wav
+from rtclient.fast_messages import audio_append
 from rtclient.models import (
-    InputAudioBufferAppendMessage,
     ServerVAD,
     SessionUpdateMessage,
     SessionUpdateParams,
 )
+from rtclient.pacing import PacingScheduler
 
 shutdown_event: Optional[asyncio.Event] = None
 
@@ -28,7 +27,7 @@ def handle_shutdown(sig=None, frame=None):
         print("\n正在关闭程序...")
         shutdown_event.set()
 
-async def send_audio(client: RTLowLevelClient, audio_file_path: str):
+async def send_audio(client: RTLowLevelClient, audio_file_path: str, use_pcm: bool = False):
     """
         持续分帧发送音频：
         DefaultServerVADCfg
@@ -43,51 +42,40 @@ async def send_audio(client: RTLowLevelClient, audio_file_path: str):
         }
      """
     try:
-        # 读取音频文件
-        with wave.open(audio_file_path, 'rb') as wave_file:
-            channels = wave_file.getnchannels()
-            sample_width = wave_file.getsampwidth()
-            frame_rate = wave_file.getframerate()
-            audio_data = wave_file.readframes(wave_file.getnframes())
+        # 读取音频文件，WAV 文件头只解析一次
+        with open(audio_file_path, 'rb') as audio_file:
+            pcm_format, audio_data = parse_wav(audio_file.read())
+
+        print(
+            f"音频信息: 采样率={pcm_format.sample_rate}Hz, 声道数={pcm_format.channels}, "
+            f"位深={pcm_format.sample_width*8}位"
+        )
+        if use_pcm:
+            if pcm_format != PcmFormat():
+                raise ValueError("PCM 输入模式需要 16kHz 16bit 单声道音频")
+            # 切换为 PCM 输入，等待 session.updated 确认后再开始发送（确认由接收任务中的 recv() 处理）
+            await client.use_pcm_input(pcm_format)
 
-        print(f"音频信息: 采样率={frame_rate}Hz, 声道数={channels}, 位深={sample_width*8}位")
-        
         #  根据 servervad 的设置模拟一个较为贴合的场景, 计算相关参数, 实际使用时参数可以调整, 不必严格遵守
         frame_size = 1536  # 固定帧大小（采样点数）
         step_ms =  32     # 发送间隔（毫秒）
-        step_samples = int(frame_rate * step_ms / 1000)  # 每步采样点数
-        bytes_per_sample = sample_width * channels
-        
-        # 按步长分帧发送
-        for pos in range(0, len(audio_data), step_samples * bytes_per_sample):
-            # 提取当前帧数据
-            frame_bytes = audio_data[pos:pos + frame_size * bytes_per_sample]
-            if not frame_bytes:
-                break
-                
-            # 构造WAV格式
-            wav_io = BytesIO()
-            with wave.open(wav_io, 'wb') as wav_out:
-                wav_out.setnchannels(channels)
-                wav_out.setsampwidth(sample_width)
-                wav_out.setframerate(frame_rate)
-                wav_out.writeframes(frame_bytes)
-            
-            # 发送数据
-            wav_io.seek(0)
-            base64_data = base64.b64encode(wav_io.getvalue()).decode('utf-8')
-            message = InputAudioBufferAppendMessage(
-                audio=base64_data,
-                client_timestamp=int(asyncio.get_event_loop().time() * 1000)
-            )
-            
-            try:
-                await client.send(message)
-                await asyncio.sleep(step_ms / 1000)  # 等待下一帧
-            except Exception as e:
-                print(f"发送失败: {e}")
-                break
-                
+        frame_bytes = frame_size * pcm_format.block_align
+        step_bytes = pcm_format.chunk_bytes(step_ms)
+        # PCM 输入模式下直接发送原始帧，不再为每一帧拼接 WAV 文件头
+        chunker = AudioChunker(pcm_format, chunk_ms=pcm_format.duration_ms(frame_bytes), wav=not use_pcm)
+
+        # 按步长分帧，发送时才编码
+        messages = (
+            audio_append(chunker.encode(audio_data[pos:pos + frame_bytes]))
+            for pos in range(0, len(audio_data), step_bytes)
+        )
+        # 按绝对时间点每 step_ms 发送一帧，发送耗时不会累积成漂移
+        stream = PacingScheduler.for_loop().add(messages, client.send, interval_ms=step_ms)
+        try:
+            await stream
+        except Exception as e:
+            print(f"发送失败: {e}")
+
     except Exception as e:
         print(f"音频处理失败: {e}")
 
@@ -188,7 +176,7 @@ def get_env_var(var_name: str) -> str:
         raise OSError(f"环境变量 '{var_name}' 未设置或为空。")
     return value
 
-async def with_zhipu(audio_file_path: str):
+async def with_zhipu(audio_file_path: str, use_pcm: bool = False):
     global shutdown_event
     shutdown_event = asyncio.Event()
     
@@ -220,7 +208,7 @@ async def with_zhipu(audio_file_path: str):
             if shutdown_event.is_set():
                 return
 
-            send_task = asyncio.create_task(send_audio(client, audio_file_path))
+            send_task = asyncio.create_task(send_audio(client, audio_file_path, use_pcm))
             receive_task = asyncio.create_task(receive_messages(client))
             
             try:
@@ -243,7 +231,7 @@ async def with_zhipu(audio_file_path: str):
 if __name__ == "__main__":
     load_dotenv()
     if len(sys.argv) < 2:
-        print("使用方法: python low_level_sample_server_vad.py <音频文件>")
+        print("使用方法: python low_level_sample_server_vad.py <音频文件> [--pcm]")
         sys.exit(1)
 
     file_path = sys.argv[1]
@@ -252,7 +240,7 @@ if __name__ == "__main__":
         sys.exit(1)
 
     try:
-        asyncio.run(with_zhipu(file_path))
+        asyncio.run(with_zhipu(file_path, use_pcm="--pcm" in sys.argv[2:]))
     except KeyboardInterrupt:
         print("\n程序被用户中断")
     except Exception as e:
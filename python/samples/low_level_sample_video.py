@@ -3,7 +3,6 @@ import base64
 import os
 import signal
 import sys
-import time
 from typing import Optional
 
 from dotenv import load_dotenv
@@ -17,6 +16,8 @@ from rtclient.models import (
     SessionUpdateMessage,
     SessionUpdateParams,
 )
+from rtclient.timing import timestamp_ms
+from rtclient.video import FrameGate
 
 shutdown_event: Optional[asyncio.Event] = None
 
@@ -28,34 +29,19 @@ def handle_shutdown(sig=None, frame=None):
         shutdown_event.set()
 
 
-def encode_image_to_base64(image_path: str) -> str:
-    """
-    将图片文件转换为base64编码
-    Args:
-        image_path: 图片文件路径
-    Returns:
-        base64编码的字符串
-    """
-    try:
-        with open(image_path, 'rb') as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
-    except Exception as e:
-        print(f"图片文件处理错误: {str(e)}")
-        return None
-
-
 async def send_media(client: RTLowLevelClient, audio_file_path: str, image_file_path: str):
     """发送音频和视频帧，实现异步发送和时间戳管理"""
     # 编码音频和图片
     with open(audio_file_path, 'rb') as audio_file:
         audio_base64 = base64.b64encode(audio_file.read()).decode('utf-8')
     
-    image_base64 = encode_image_to_base64(image_file_path)
-    if image_base64 is None:
-        print("图片编码失败")
-        return
+    with open(image_file_path, 'rb') as image_file:
+        image_bytes = image_file.read()
+    # 画面没有明显变化的帧不重复上传，最长每 VIDEO_REFRESH_INTERVAL 毫秒强制刷新一次
+    VIDEO_REFRESH_INTERVAL = 2000
+    frame_gate = FrameGate(max_interval_ms=VIDEO_REFRESH_INTERVAL)
 
-    base_timestamp = int(time.time() * 1000)
+    base_timestamp = timestamp_ms()
     VIDEO_INTERVAL = 500   # 每500ms发送一帧，2fps
     
     async def send_audio():
@@ -70,11 +56,13 @@ async def send_media(client: RTLowLevelClient, audio_file_path: str, image_file_
         """异步发送视频帧"""
         video_timestamp = base_timestamp
         for _ in range(2):  # 2fps
-            video_message = InputVideoFrameAppendMessage(
-                video_frame=image_base64,
-                client_timestamp=video_timestamp
-            )
-            await client.send(video_message)
+            image_base64 = frame_gate.check(image_bytes)
+            if image_base64 is not None:
+                video_message = InputVideoFrameAppendMessage(
+                    video_frame=image_base64,
+                    client_timestamp=video_timestamp
+                )
+                await client.send(video_message)
             video_timestamp += VIDEO_INTERVAL
             await asyncio.sleep(VIDEO_INTERVAL / 1000)
     
@@ -87,7 +75,7 @@ async def send_media(client: RTLowLevelClient, audio_file_path: str, image_file_
     
     # 发送音频缓冲区提交信号
     commit_message = InputAudioBufferCommitMessage(
-        client_timestamp=int(time.time() * 1000)
+        client_timestamp=timestamp_ms()
     )
     await client.send(commit_message)
 
@@ -0,0 +1,61 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import json
+
+import pytest
+from aiohttp import WSMsgType, web
+
+SESSION = {
+    "id": "sess_1",
+    "model": "glm-realtime",
+    "modalities": ["text", "audio"],
+    "instructions": "",
+    "voice": "tongtong",
+    "input_audio_format": "wav",
+    "output_audio_format": "pcm",
+    "tool_choice": "auto",
+    "temperature": 0.8,
+    "beta_fields": {},
+}
+
+
+class FakeServer:
+    """本地 WebSocket 服务端，记录收到的消息，对 session.update 回复 session.updated"""
+
+    def __init__(self):
+        self.received: list[dict] = []
+        self.session = dict(SESSION)
+        self.url = ""
+
+    async def handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "session.created", "session": self.session})
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            data = json.loads(message.data)
+            self.received.append(data)
+            if data["type"] == "session.update":
+                self.session.update(data["session"])
+                await ws.send_json({"type": "session.updated", "session": self.session})
+        return ws
+
+    def of_type(self, msg_type: str) -> list[dict]:
+        return [message for message in self.received if message["type"] == msg_type]
+
+
+@pytest.fixture
+async def fake_server():
+    server = FakeServer()
+    app = web.Application()
+    app.router.add_get("/", server.handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    server.url = f"ws://127.0.0.1:{port}/"
+    yield server
+    await runner.cleanup()
@@ -0,0 +1,113 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+import multiprocessing
+import subprocess
+import sys
+
+import pytest
+
+from rtclient.audio_ring import _HEADER_SIZE, _SLOT, SharedAudioRing
+from rtclient.audio_stream import PcmFormat, parse_wav
+from rtclient.low_level_client import RTLowLevelClient
+
+
+def test_write_read_wraps_and_drops_when_full():
+    with SharedAudioRing.create(slots=4, slot_size=16) as ring:
+        for round_ in range(3):
+            frames = [bytes([round_ * 4 + i]) * (i + 1) for i in range(4)]
+            assert all(ring.write(frame) for frame in frames)
+            assert not ring.write(b"x")
+            assert [ring.read() for _ in range(4)] == frames
+            assert ring.read() is None
+        assert ring.dropped == 3
+
+
+def test_slot_is_not_ready_until_data_matches_generation():
+    with SharedAudioRing.create(slots=2, slot_size=8) as ring:
+        assert ring.write(b"abcd")
+        offset = _HEADER_SIZE
+        generation, crc, length = _SLOT.unpack_from(ring._buf, offset)
+        # 模拟代号已可见、数据尚未可见
+        ring._buf[offset + _SLOT.size] = ord("z")
+        assert ring.peek() is None
+        ring._buf[offset + _SLOT.size] = ord("a")
+        # 模拟代号只写了一半
+        _SLOT.pack_into(ring._buf, offset, generation | (1 << 40), crc, length)
+        assert ring.peek() is None
+        _SLOT.pack_into(ring._buf, offset, generation, crc, length)
+        assert ring.read() == b"abcd"
+
+
+def _produce(name: str, count: int):
+    ring = SharedAudioRing.attach(name)
+    sent = 0
+    while sent < count:
+        if ring.write(sent.to_bytes(4, "little") * 100):
+            sent += 1
+    ring.close()
+    ring.release()
+
+
+async def test_frames_across_processes_in_order():
+    ring = SharedAudioRing.create(slots=8, slot_size=400)
+    process = multiprocessing.get_context("spawn").Process(target=_produce, args=(ring.name, 2000))
+    process.start()
+    received = []
+    async for frame in ring.frames(poll_interval=0.001):
+        assert frame == frame[:4].tobytes() * 100
+        received.append(int.from_bytes(frame[:4], "little"))
+    process.join()
+    ring.release()
+    assert received == list(range(2000))
+
+
+async def test_send_audio_from_wraps_frames_in_wav(fake_server):
+    pcm_format = PcmFormat(16000)
+    with SharedAudioRing.create(slots=4, slot_size=640) as ring:
+        ring.write(bytes(640))
+        ring.write(bytes(320))
+        ring.close()
+        async with RTLowLevelClient(fake_server.url) as client:
+            assert await client.send_audio_from(ring, pcm_format=pcm_format) == 2
+            await client.send({"type": "input_audio_buffer.commit"})
+            while not fake_server.of_type("input_audio_buffer.commit"):
+                await asyncio.sleep(0.01)
+    appends = fake_server.of_type("input_audio_buffer.append")
+    parsed = [parse_wav(base64.b64decode(message["audio"])) for message in appends]
+    assert [(fmt, len(pcm)) for fmt, pcm in parsed] == [(pcm_format, 640), (pcm_format, 320)]
+
+
+
+async def test_send_audio_from_aligns_wav_frames_to_sample_frames(fake_server):
+    stereo = PcmFormat(16000, channels=2)
+    async with RTLowLevelClient(fake_server.url) as client:
+        with SharedAudioRing.create(slots=4, slot_size=642) as ring:
+            ring.write(bytes(640))
+            ring.write(bytes(642))
+            ring.close()
+            with pytest.raises(ValueError):
+                await client.send_audio_from(ring, pcm_format=stereo)
+        with SharedAudioRing.create(slots=4, slot_size=3) as ring:
+            ring.close()
+            with pytest.raises(ValueError):
+                await client.send_audio_from(ring, pcm_format=stereo)
+        await client.send({"type": "input_audio_buffer.commit"})
+        while not fake_server.of_type("input_audio_buffer.commit"):
+            await asyncio.sleep(0.01)
+    appends = fake_server.of_type("input_audio_buffer.append")
+    assert [len(parse_wav(base64.b64decode(message["audio"]))[1]) for message in appends] == [640]
+
+def test_attach_from_unrelated_process_does_not_unlink():
+    with SharedAudioRing.create(slots=2, slot_size=8) as ring:
+        ring.write(b"abcd")
+        code = f"from rtclient.audio_ring import SharedAudioRing; SharedAudioRing.attach({ring.name!r}).release()"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        assert "leaked" not in result.stderr and "Traceback" not in result.stderr
+        # 附加进程退出后共享内存仍然存在
+        other = SharedAudioRing.attach(ring.name)
+        assert other.read() == b"abcd"
+        other.release()
@@ -0,0 +1,140 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import base64
+import io
+import wave
+
+import pytest
+
+from rtclient.audio_stream import AudioChunker, PcmFormat, WavSink, parse_wav, split_audio, wav_header
+
+PCM_16K = PcmFormat()
+
+
+def make_wav(pcm: bytes, pcm_format: PcmFormat = PCM_16K) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(pcm_format.channels)
+        writer.setsampwidth(pcm_format.sample_width)
+        writer.setframerate(pcm_format.sample_rate)
+        writer.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def read_wav(data: str) -> tuple[PcmFormat, bytes]:
+    with wave.open(io.BytesIO(base64.b64decode(data))) as reader:
+        pcm_format = PcmFormat(reader.getframerate(), reader.getnchannels(), reader.getsampwidth())
+        return pcm_format, reader.readframes(reader.getnframes())
+
+
+def test_wav_header_matches_wave_module():
+    pcm = bytes(range(256)) * 4
+    assert wav_header(PCM_16K, len(pcm)) + pcm == make_wav(pcm)
+
+
+def test_chunk_bytes_is_frame_aligned():
+    stereo = PcmFormat(sample_rate=44100, channels=2)
+    assert stereo.chunk_bytes(10) == 441 * 4
+    assert stereo.chunk_bytes(0.001) == 4
+    assert PCM_16K.duration_ms(PCM_16K.chunk_bytes(100)) == 100
+
+
+def test_wav_chunks_are_complete_wav_files():
+    pcm = bytes(range(256)) * 25
+    chunker = AudioChunker(PCM_16K, chunk_ms=100)
+    chunks = list(chunker.chunks(pcm))
+    assert len(chunks) == 2
+    decoded = [read_wav(chunk) for chunk in chunks]
+    assert all(pcm_format == PCM_16K for pcm_format, _ in decoded)
+    assert [len(frames) for _, frames in decoded] == [3200, 3200]
+    assert b"".join(frames for _, frames in decoded) == pcm
+
+
+def test_short_last_chunk_gets_its_own_header():
+    pcm = bytes(3200 + 320)
+    chunker = AudioChunker(PCM_16K, chunk_ms=100)
+    *_, last = chunker.chunks(pcm)
+    assert read_wav(last)[1] == bytes(320)
+    # 文件头随片段长度变化后，完整片段仍然使用正确的大小
+    assert len(read_wav(chunker.encode(bytes(3200)))[1]) == 3200
+
+
+def test_pcm_chunks_have_no_header():
+    pcm = bytes(range(200)) * 17
+    chunker = AudioChunker(PCM_16K, chunk_ms=100, wav=False)
+    assert b"".join(base64.b64decode(chunk) for chunk in chunker.chunks(pcm)) == pcm
+
+
+def test_encode_rejects_oversized_and_partial_frames():
+    chunker = AudioChunker(PCM_16K, chunk_ms=10)
+    with pytest.raises(ValueError):
+        chunker.encode(bytes(chunker.chunk_bytes + 2))
+    with pytest.raises(ValueError):
+        AudioChunker(PCM_16K, chunk_ms=10, wav=False).encode(bytes(3))
+
+
+def test_parse_wav_skips_unknown_chunks_and_partial_frames():
+    pcm = bytes(range(100))
+    data = bytearray(make_wav(pcm))
+    # 在 fmt 和 data 之间插入一个奇数长度的 LIST 块（带填充字节）
+    data[36:36] = b"LIST" + (3).to_bytes(4, "little") + b"abc\x00"
+    data += b"\x01"
+    pcm_format, view = parse_wav(bytes(data))
+    assert pcm_format == PCM_16K
+    assert bytes(view) == pcm
+
+
+def test_parse_wav_streaming_size():
+    pcm = bytes(range(64))
+    data = bytearray(make_wav(pcm))
+    data[40:44] = (0).to_bytes(4, "little")
+    assert bytes(parse_wav(bytes(data))[1]) == pcm
+
+
+@pytest.mark.parametrize("data", [b"RIFF", b"RIFF\x00\x00\x00\x00WAVX", wav_header(PCM_16K, 0)[:36]])
+def test_parse_wav_rejects_invalid_files(data):
+    with pytest.raises(ValueError):
+        parse_wav(data)
+
+
+def test_split_audio_reads_format_from_wav():
+    stereo = PcmFormat(sample_rate=8000, channels=2)
+    pcm = bytes(stereo.chunk_bytes(250))
+    chunker, view = split_audio(make_wav(pcm, stereo), chunk_ms=100)
+    assert chunker.pcm_format == stereo
+    assert bytes(view) == pcm
+    assert len(list(chunker.chunks(view))) == 3
+
+
+def test_split_audio_raw_pcm():
+    with pytest.raises(ValueError):
+        split_audio(bytes(320))
+    with pytest.raises(ValueError):
+        split_audio(bytes(321), pcm_format=PCM_16K)
+    chunker, view = split_audio(bytes(320), pcm_format=PCM_16K, wav=False)
+    assert not chunker.wav
+    assert len(view) == 320
+
+
+def test_split_audio_checks_wav_against_pcm_input_format():
+    data = make_wav(bytes(320), PcmFormat(sample_rate=24000))
+    with pytest.raises(ValueError):
+        split_audio(data, pcm_format=PCM_16K, wav=False)
+    # 带文件头发送时以文件本身的格式为准
+    assert split_audio(data, pcm_format=PCM_16K)[0].pcm_format.sample_rate == 24000
+
+
+async def test_record_finishes_file_when_stream_fails(tmp_path):
+    path = tmp_path / "out.wav"
+
+    async def stream():
+        yield {"type": "response.audio.delta", "delta": base64.b64encode(bytes(641)).decode()}
+        raise ConnectionError("连接断开")
+
+    sink = WavSink(path, PCM_16K)
+    with pytest.raises(ConnectionError):
+        await sink.record(stream())
+    assert sink.closed
+    with wave.open(str(path)) as reader:
+        assert reader.getnframes() == 320
@@ -0,0 +1,145 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import pytest
+
+from rtclient.context_budget import ContextBudget
+from rtclient.conversation import ConversationStore
+from rtclient.models import (
+    FunctionCallItem,
+    FunctionCallOutputItem,
+    InputAudioContentPart,
+    InputTextContentPart,
+    SystemMessageItem,
+    UserMessageItem,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.value = 0.0
+
+    def __call__(self) -> float:
+        return self.value
+
+
+def _user(item_id, text):
+    return UserMessageItem(id=item_id, content=[InputTextContentPart(text=text)])
+
+
+def _done(response_id, input_tokens, cached_tokens=0, text_tokens=0):
+    usage = {
+        "input_tokens": input_tokens,
+        "output_tokens": 5,
+        "input_token_details": {"cached_tokens": cached_tokens, "text_tokens": text_tokens},
+    }
+    return {"type": "response.done", "response": {"id": response_id, "status": "completed", "usage": usage}}
+
+
+def _store(*items):
+    store = ConversationStore()
+    previous = None
+    for item in items:
+        store.put(item, previous_item_id=previous)
+        previous = item.id
+    return store
+
+
+def _texts(params):
+    return [part.text for item in params.input_items for part in getattr(item, "content", None) or ()]
+
+
+def test_records_usage_and_ttft():
+    clock = FakeClock()
+    budget = ContextBudget(ConversationStore(), max_input_tokens=100, clock=clock)
+    budget.handle({"type": "response.created", "response": {"id": "resp_1"}})
+    clock.value = 0.25
+    budget.handle({"type": "response.text.delta", "response_id": "resp_1"})
+    clock.value = 0.5
+    budget.handle({"type": "response.text.delta", "response_id": "resp_1"})
+    budget.handle(_done("resp_1", 40, cached_tokens=10))
+    turn = budget.turns[0]
+    assert (turn.input_tokens, turn.cached_tokens, turn.output_tokens) == (40, 10, 5)
+    assert turn.ttft_ms == pytest.approx(250)
+    assert not turn.managed
+    assert budget.stats()["cached_ratio"] == pytest.approx(0.25)
+
+
+async def test_unmanaged_until_input_tokens_reach_limit():
+    budget = ContextBudget(_store(_user("a", "hi")), max_input_tokens=100)
+    assert await budget.response_params() is None
+    assert (await budget.response_params(instructions="x")).input_items is None
+    budget.handle(_done("resp_1", 99))
+    assert not budget.managed
+    budget.handle(_done("resp_2", 100))
+    assert budget.managed
+    assert budget.last_input_tokens == 100
+
+
+async def test_managed_context_strips_audio_and_ids():
+    audio = UserMessageItem(id="b", content=[InputAudioContentPart(audio="AAAA", transcript="你好")])
+    store = _store(SystemMessageItem(id="s", content=[InputTextContentPart(text="规则")]), _user("a", "hi"), audio)
+    budget = ContextBudget(store, max_input_tokens=100)
+    budget.handle(_done("resp_1", 100))
+    params = await budget.response_params(instructions="x")
+    assert params.instructions == "x"
+    assert _texts(params) == ["规则", "hi", "你好"]
+    assert all(item.id == "" for item in params.input_items)
+    assert not any(isinstance(part, InputAudioContentPart) for item in params.input_items for part in item.content)
+    # 原对话项不受影响
+    assert isinstance(store.get("b").content[0], InputAudioContentPart)
+
+
+async def test_trim_summarizes_dropped_items_and_keeps_prefix_stable():
+    calls = []
+
+    async def summarizer(items, previous):
+        calls.append(([item.id for item in items], previous))
+        return "摘要"
+
+    system = SystemMessageItem(id="s", content=[InputTextContentPart(text="S" * 10)])
+    store = _store(system, *(_user(f"u{i}", "x" * 20) for i in range(1, 7)))
+    budget = ContextBudget(store, max_input_tokens=100, summarizer=summarizer, chars_per_token=1.0)
+    budget.handle(_done("resp_1", 100))
+
+    params = await budget.response_params()
+    assert calls == [(["u1", "u2", "u3", "u4"], None)]
+    assert budget.trims == 1
+    assert _texts(params) == ["S" * 10, "此前的对话摘要：摘要", "x" * 20, "x" * 20]
+
+    store.put(_user("u7", "y" * 20), previous_item_id="u6")
+    params = await budget.response_params()
+    assert budget.trims == 1
+    assert _texts(params)[:4] == ["S" * 10, "此前的对话摘要：摘要", "x" * 20, "x" * 20]
+    assert _texts(params)[-1] == "y" * 20
+
+
+async def test_trim_does_not_start_window_with_function_output():
+    store = _store(
+        _user("a", "x" * 60),
+        FunctionCallItem(id="b", name="f", call_id="call_1", arguments="{}"),
+        FunctionCallOutputItem(id="c", call_id="call_1", output="o" * 10),
+        _user("d", "x" * 30),
+    )
+    budget = ContextBudget(store, max_input_tokens=80, chars_per_token=1.0)
+    budget.handle(_done("resp_1", 100))
+    params = await budget.response_params()
+    assert [item.type for item in params.input_items] == ["message"]
+    assert _texts(params) == ["x" * 30]
+
+
+async def test_chars_per_token_is_calibrated_from_managed_turns():
+    budget = ContextBudget(_store(_user("a", "x" * 40)), max_input_tokens=10, chars_per_token=1.0)
+    budget.handle(_done("resp_1", 100))
+    await budget.response_params()
+    budget.handle({"type": "response.created", "response": {"id": "resp_2"}})
+    budget.handle(_done("resp_2", 20, text_tokens=20))
+    assert budget.chars_per_token == pytest.approx(0.8 + 0.2 * 2)
+    turn = budget.turns[-1]
+    assert turn.managed
+    assert turn.context_items == 1
+
+
+def test_target_ratio_must_be_in_range():
+    with pytest.raises(ValueError):
+        ContextBudget(ConversationStore(), target_ratio=0)
@@ -0,0 +1,75 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import pytest
+
+from rtclient.conversation import ConversationStore, has_audio, strip_audio
+from rtclient.models import (
+    FunctionCallItem,
+    InputAudioContentPart,
+    InputTextContentPart,
+    ItemCreatedMessage,
+    ResponseMessageItem,
+    UserMessageItem,
+)
+
+
+def _user(item_id, text):
+    return UserMessageItem(id=item_id, content=[InputTextContentPart(text=text)])
+
+
+def test_put_keeps_previous_item_order():
+    store = ConversationStore()
+    store.put(_user("a", "1"))
+    store.put(_user("c", "3"), previous_item_id="a")
+    store.put(_user("b", "2"), previous_item_id="a")
+    assert [item.id for item in store] == ["a", "b", "c"]
+    assert store.previous_id("c") == "b"
+
+
+def test_put_rejects_item_without_id():
+    store = ConversationStore()
+    with pytest.raises(ValueError):
+        store.put(UserMessageItem(content=[InputTextContentPart(text="x")]))
+    assert len(store) == 0
+
+
+def test_created_item_without_id_is_ignored():
+    store = ConversationStore()
+    store.handle(
+        ItemCreatedMessage(
+            event_id="e1",
+            previous_item_id=None,
+            item=ResponseMessageItem(id=None, status="completed", role="user", content=[]),
+        )
+    )
+    assert len(store) == 0
+
+
+def test_update_reindexes_call_id_and_relinks():
+    store = ConversationStore()
+    store.put(_user("a", "1"))
+    store.put(_user("b", "2"), previous_item_id="a")
+    store.put(FunctionCallItem(id="c", name="f", call_id="call_old", arguments="{}"), previous_item_id="b")
+    store.put(FunctionCallItem(id="c", name="f", call_id="call_new", arguments="{}"), previous_item_id="a")
+
+    assert store.function_call("call_old") is None
+    assert store.function_call("call_new").id == "c"
+    assert [item.id for item in store] == ["a", "c", "b"]
+    assert store.previous_id("b") == "c"
+    store.remove("b")
+    assert [item.id for item in store] == ["a", "c"]
+
+
+def test_strip_audio_keeps_transcript():
+    item = UserMessageItem(id="a", content=[InputAudioContentPart(audio="AAAA", transcript="你好")])
+    stripped = strip_audio(item)
+    assert has_audio(item)
+    assert not has_audio(stripped)
+    assert stripped.content[0].text == "你好"
+    assert not has_audio(_user("b", "hi"))
+
+    store = ConversationStore()
+    store.put(item)
+    store.compact()
+    assert not has_audio(store.get("a"))
@@ -0,0 +1,118 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+
+from rtclient.dispatcher import EventDispatcher, LaneOverflow
+
+
+def _created(response_id):
+    return {"type": "response.created", "response": {"id": response_id}}
+
+
+def _delta(response_id, delta=""):
+    return {"type": "response.text.delta", "response_id": response_id, "delta": delta}
+
+
+def _done(response_id):
+    return {"type": "response.done", "response": {"id": response_id}}
+
+
+async def test_slow_delta_handler_finishes_before_done():
+    dispatcher = EventDispatcher(concurrent=True)
+    order = []
+
+    @dispatcher.on("response.created")
+    def on_created(message):
+        order.append("created")
+
+    @dispatcher.on("response.text.delta")
+    async def on_delta(message):
+        await asyncio.sleep(0.05)
+        order.append("delta")
+
+    @dispatcher.on("response.done")
+    def on_done(message):
+        order.append("done")
+
+    for message in (_created("resp_1"), _delta("resp_1"), _done("resp_1")):
+        await dispatcher.dispatch(message)
+    await dispatcher.join()
+    assert order == ["created", "delta", "done"]
+
+
+async def test_responses_run_in_separate_lanes():
+    dispatcher = EventDispatcher(concurrent=True)
+    order = []
+    release = asyncio.Event()
+
+    @dispatcher.on("response.text.delta")
+    async def on_delta(message):
+        if message["response_id"] == "slow":
+            await release.wait()
+        order.append(message["response_id"])
+
+    await dispatcher.dispatch(_delta("slow"))
+    await dispatcher.dispatch(_delta("fast"))
+    await asyncio.sleep(0.01)
+    assert order == ["fast"]
+    assert dispatcher.stats()["lanes"] == 1
+    release.set()
+    await dispatcher.join()
+    assert order == ["fast", "slow"]
+
+
+async def test_full_lane_drops_and_reports():
+    errors = []
+    dispatcher = EventDispatcher(
+        concurrent=True, max_queue=2, on_error=lambda error, message, handler: errors.append(error)
+    )
+    release = asyncio.Event()
+
+    @dispatcher.on("response.text.delta")
+    async def on_delta(message):
+        await release.wait()
+
+    for index in range(5):
+        await dispatcher.dispatch(_delta("resp_1", str(index)))
+    stats = dispatcher.stats()
+    assert (stats["dropped"], stats["max_queued"]) == (3, 2)
+    assert len(errors) == 3 and all(isinstance(error, LaneOverflow) for error in errors)
+    release.set()
+    await dispatcher.join()
+
+
+async def test_handler_error_and_timeout_do_not_stop_dispatch():
+    errors = []
+    dispatcher = EventDispatcher(on_error=lambda error, message, handler: errors.append(type(error)))
+    handled = []
+
+    @dispatcher.on("response.text.delta", timeout=0.01)
+    async def slow(message):
+        await asyncio.sleep(1)
+
+    @dispatcher.on("response.text.delta")
+    def failing(message):
+        raise ValueError("boom")
+
+    @dispatcher.on("*")
+    def everything(message):
+        handled.append(message["type"])
+
+    await dispatcher.dispatch(_delta("resp_1"))
+    await dispatcher.dispatch(_done("resp_1"))
+    assert errors == [TimeoutError, ValueError]
+    assert handled == ["response.text.delta", "response.done"]
+    assert (dispatcher.timeouts, dispatcher.errors) == (1, 1)
+
+
+async def test_errors_are_logged_by_default(caplog):
+    dispatcher = EventDispatcher()
+
+    @dispatcher.on("response.done")
+    def failing(message):
+        raise ValueError("boom")
+
+    await dispatcher.dispatch(_done("resp_1"))
+    records = [record for record in caplog.records if record.name == "rtclient.dispatcher"]
+    assert len(records) == 1 and isinstance(records[0].exc_info[1], ValueError)
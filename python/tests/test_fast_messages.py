@@ -0,0 +1,17 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import pytest
+from message_cases import build_cases
+
+CASES = build_cases(frame_bytes=1024)
+
+
+@pytest.mark.parametrize("name", CASES)
+@pytest.mark.parametrize("options", [{}, {"exclude_none": True}, {"exclude_unset": True}])
+def test_fast_message_matches_validated(name, options):
+    validated, fast = CASES[name]
+    expected, actual = validated(), fast()
+    assert type(expected) is type(actual)
+    assert expected.model_fields_set == actual.model_fields_set
+    assert expected.model_dump_json(**options) == actual.model_dump_json(**options)
@@ -0,0 +1,137 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rtclient.audio_stream import PcmFormat, parse_wav, wav_header
+from rtclient.fast_messages import audio_append
+from rtclient.low_level_client import DEFAULT_OFFLOAD_THRESHOLD, RTLowLevelClient, create_encode_executor
+from rtclient.rate_control import RateController
+from rtclient.util.token import TokenProvider
+
+
+async def test_close_stops_token_refresh(fake_server):
+    provider = TokenProvider("id.secret")
+    async with RTLowLevelClient(fake_server.url, token_provider=provider):
+        assert provider.running
+    assert not provider.running
+
+
+async def test_ping_requires_rtt_measurement(fake_server):
+    async with RTLowLevelClient(fake_server.url) as client:
+        assert client.ws._autoping
+        with pytest.raises(RuntimeError):
+            await client.ping()
+
+
+async def test_ping_with_rate_controller(fake_server):
+    async with RTLowLevelClient(fake_server.url, rate_controller=RateController()) as client:
+        assert not client.ws._autoping
+        async def receive():
+            async for _ in client:
+                pass
+
+        receiver = asyncio.create_task(receive())
+        rtt = await client.ping(timeout=2)
+        assert rtt >= 0
+        receiver.cancel()
+
+
+async def test_small_messages_are_encoded_inline_by_default():
+    client = RTLowLevelClient("ws://unused")
+    await client.encode(audio_append("A" * (DEFAULT_OFFLOAD_THRESHOLD // 2)))
+    assert client.offloaded_messages == 0
+    await client.close()
+
+
+async def test_offload_can_be_disabled():
+    client = RTLowLevelClient("ws://unused", offload_threshold=None)
+    await client.encode(audio_append("A" * (DEFAULT_OFFLOAD_THRESHOLD * 2)))
+    assert client.offloaded_messages == 0
+    await client.close()
+
+
+async def test_large_message_is_encoded_in_process_pool():
+    client = RTLowLevelClient("ws://unused", offload_threshold=1024)
+    message = audio_append("A" * 4096)
+    assert await client.encode(message) == message.model_dump_json()
+    assert await client.encode(audio_append("AAAA")) == audio_append("AAAA").model_dump_json()
+    assert client.offloaded_messages == 1
+    await client.close()
+
+
+async def test_close_shuts_down_own_executor_only():
+    shared = ThreadPoolExecutor(1)
+    client = RTLowLevelClient("ws://unused", offload_threshold=1024, encode_executor=shared)
+    await client.encode(audio_append("A" * 4096))
+    await client.close()
+    assert shared.submit(len, "abc").result() == 3
+    shared.shutdown()
+
+    executor = create_encode_executor()
+    executor.shutdown()
+    with pytest.raises(RuntimeError):
+        executor.submit(len, "abc")
+
+
+async def receive_all(client):
+    async for _ in client:
+        pass
+
+
+async def sent_appends(client, fake_server) -> list[bytes]:
+    await client.send({"type": "input_audio_buffer.commit"})
+    while not fake_server.of_type("input_audio_buffer.commit"):
+        await asyncio.sleep(0.01)
+    return [base64.b64decode(message["audio"]) for message in fake_server.of_type("input_audio_buffer.append")]
+
+
+async def test_wav_mode_wraps_every_chunk(fake_server):
+    pcm_format = PcmFormat(sample_rate=24000)
+    audio = wav_header(pcm_format, 4800 * 2 + 480) + bytes(4800 * 2 + 480)
+    async with RTLowLevelClient(fake_server.url) as client:
+        assert await client.send_audio(audio, chunk_ms=100) == 3
+        appends = await sent_appends(client, fake_server)
+    parsed = [parse_wav(data) for data in appends]
+    assert [(fmt, len(pcm)) for fmt, pcm in parsed] == [(pcm_format, 4800), (pcm_format, 4800), (pcm_format, 480)]
+
+
+async def test_pcm_input_sends_headerless_frames(fake_server):
+    async with RTLowLevelClient(fake_server.url) as client:
+        with pytest.raises(RuntimeError):
+            await client.send_pcm(bytes(640))
+        receiver = asyncio.create_task(receive_all(client))
+        await asyncio.wait_for(client.use_pcm_input(), 2)
+        assert fake_server.session["input_audio_format"] == "pcm"
+        await client.send_pcm(bytes(640))
+        await client.send_pcm(memoryview(bytearray(320)))
+        with pytest.raises(ValueError):
+            await client.send_pcm(bytes(3))
+        # 原始 PCM 和 WAV 文件都按 PCM 切分，不带文件头
+        assert await client.send_audio(bytes(3200 + 320)) == 2
+        assert await client.send_audio(wav_header(PcmFormat(), 640) + bytes(640)) == 1
+        with pytest.raises(ValueError):
+            await client.send_audio(wav_header(PcmFormat(sample_rate=8000), 640) + bytes(640))
+        appends = await sent_appends(client, fake_server)
+        receiver.cancel()
+    assert [len(data) for data in appends] == [640, 320, 3200, 320, 640]
+    assert not any(data.startswith(b"RIFF") for data in appends)
+
+def test_importing_client_does_not_load_optional_features():
+    modules = [
+        "rtclient.models",
+        "rtclient.audio_ring",
+        "rtclient.pacing",
+        "rtclient.session",
+        "multiprocessing.shared_memory",
+        "concurrent.futures.process",
+    ]
+    code = f"import sys; from rtclient import RTLowLevelClient; print([m for m in {modules!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
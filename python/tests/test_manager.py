@@ -0,0 +1,69 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+
+import pytest
+
+from rtclient.fast_messages import audio_commit
+from rtclient.manager import SessionLimitError, SessionManager
+
+
+async def _ignore(session, message):
+    pass
+
+
+async def test_close_drains_queued_messages(fake_server):
+    async with SessionManager(fake_server.url, max_sessions=1) as manager:
+        session = await manager.open(_ignore, session_id="s1")
+        for index in range(5):
+            await session.send(audio_commit(event_id=f"evt_{index}"))
+        with pytest.raises(SessionLimitError):
+            await manager.open(_ignore)
+        await session.close(timeout=2)
+        assert session.closed and session.state == "closed"
+        assert session.messages_sent == 5
+        assert len(manager) == 0
+        with pytest.raises(RuntimeError):
+            await session.send(audio_commit())
+    await asyncio.sleep(0.05)
+    assert [message["event_id"] for message in fake_server.of_type("input_audio_buffer.commit")] == [
+        f"evt_{index}" for index in range(5)
+    ]
+
+
+async def test_reopen_same_id_after_abort(fake_server):
+    async with SessionManager(fake_server.url) as manager:
+        session = await manager.open(_ignore, session_id="s1")
+        session.abort()
+        await asyncio.wait_for(session.wait_closed(), 2)
+        assert manager.get("s1") is None
+        reopened = await manager.open(_ignore, session_id="s1")
+        assert reopened is not session and manager.get("s1") is reopened
+        assert manager.opened == 2
+
+
+async def test_send_on_full_queue_fails_when_writer_dies(fake_server):
+    async with SessionManager(fake_server.url, max_queue=1) as manager:
+        session = await manager.open(_ignore)
+        release = asyncio.Event()
+
+        async def broken_send_str(data):
+            await release.wait()
+            raise ConnectionResetError("reset")
+
+        session.client.send_str = broken_send_str
+        await session.send(audio_commit())  # 被写任务取走，阻塞在 send_str
+        await asyncio.sleep(0)
+        await session.send(audio_commit())  # 占满队列
+        blocked = asyncio.create_task(session.send(audio_commit()))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        release.set()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(blocked, 2)
+        await session.wait_closed()
+        assert isinstance(session.error, ConnectionResetError)
+        with pytest.raises(RuntimeError):
+            await session.send(audio_commit())
+        await asyncio.wait_for(session.close(), 1)
@@ -0,0 +1,68 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+
+import pytest
+
+from rtclient.pacing import PacingScheduler
+
+
+async def test_frames_follow_absolute_schedule():
+    loop = asyncio.get_running_loop()
+    scheduler = PacingScheduler()
+    sent_at = []
+
+    async def send(frame):
+        sent_at.append(loop.time())
+
+    start = loop.time()
+    assert await scheduler.add(range(10), send, interval_ms=10, start=start) == 10
+    assert sent_at[-1] - start == pytest.approx(0.09, abs=0.03)
+
+
+async def test_blocked_send_does_not_delay_other_streams():
+    loop = asyncio.get_running_loop()
+    scheduler = PacingScheduler()
+    unblocked = asyncio.Event()
+    blocked_frames = []
+
+    async def blocked_send(frame):
+        # 模拟写缓冲区积压：第一帧一直发不出去
+        await unblocked.wait()
+        blocked_frames.append(frame)
+
+    async def send(frame):
+        pass
+
+    blocked = scheduler.add(range(5), blocked_send, interval_ms=10)
+    start = loop.time()
+    other = scheduler.add(range(10), send, interval_ms=10, start=start)
+    assert await asyncio.wait_for(other, 1) == 10
+    assert loop.time() - start < 0.2
+    assert blocked.frames_issued == 1 and blocked.frames_sent == 0
+
+    # 恢复后按顺序补发剩余的帧
+    unblocked.set()
+    assert await asyncio.wait_for(blocked, 1) == 5
+    assert blocked_frames == list(range(5))
+
+
+async def test_cancel_and_send_error():
+    scheduler = PacingScheduler()
+
+    async def send(frame):
+        if frame == 3:
+            raise ConnectionResetError("closed")
+
+    with pytest.raises(ConnectionResetError):
+        await scheduler.add(range(10), send, interval_ms=1)
+
+    stream = scheduler.add(range(1000), send, interval_ms=1000)
+    await asyncio.sleep(0.01)
+    stream.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await stream
+    await asyncio.sleep(0)
+    assert len(scheduler) == 0
+    await scheduler.aclose()
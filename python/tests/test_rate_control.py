@@ -0,0 +1,76 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+
+from rtclient.audio_stream import PcmFormat
+from rtclient.low_level_client import RTLowLevelClient
+from rtclient.rate_control import RateController
+
+
+class _FakeClient:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.pings = 0
+        self.write_buffer_size = 0
+
+    @property
+    def closed(self):
+        return not self.errors
+
+    async def ping(self, timeout):
+        self.pings += 1
+        error = self.errors.pop(0)
+        if error is not None:
+            raise error
+        return 0.01
+
+
+def test_congestion_and_recovery_use_configured_steps():
+    controller = RateController(
+        quality_range=(30, 85),
+        audio_chunk_range=(32, 200),
+        quality_decrease=20,
+        audio_chunk_increase_factor=2,
+        quality_increase=1,
+        audio_chunk_decrease_ms=8,
+        recover_after=1,
+    )
+    controller.observe_write_buffer(controller.max_write_buffer + 1)
+    decision = controller.update()
+    assert (decision.jpeg_quality, decision.audio_chunk_ms) == (65, 64)
+    controller.observe_write_buffer(0)
+    decision = controller.update()
+    assert (decision.jpeg_quality, decision.audio_chunk_ms) == (66, 56)
+
+
+async def test_run_treats_connection_error_as_congestion_and_stops_when_closed():
+    client = _FakeClient([None, ConnectionResetError("reset"), None])
+    controller = RateController(rtt_tolerance_ms=100)
+    await controller.run(client, interval=0, ping_timeout=2.0)
+    assert client.pings == 3
+    assert controller.congestion_events == 1
+
+
+async def test_client_feeds_controller_and_applies_decisions(fake_server):
+    controller = RateController(fps_range=(1.0, 2.0), audio_chunk_range=(40, 200))
+    async with RTLowLevelClient(fake_server.url, rate_controller=controller) as client:
+        async def receive():
+            async for _ in client:
+                pass
+
+        receiver = asyncio.create_task(receive())
+        await client.ping(timeout=2)
+        assert controller.rtt is not None
+
+        # 1 秒的 16kHz 16bit PCM 按控制器的 40ms 分片
+        assert await client.send_audio(b"\x00\x00" * 16000, pcm_format=PcmFormat()) == 25
+        assert controller.queue_delay is not None
+
+        controller.decision.video_fps = 1.0
+        assert await client.send_video_frame("AAAA")
+        assert not await client.send_video_frame("AAAA")
+        rate_task = client._rate_task
+        receiver.cancel()
+    await asyncio.sleep(0)
+    assert rate_task.done()
@@ -0,0 +1,163 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+
+import pytest
+
+from rtclient.low_level_client import RTLowLevelClient
+from rtclient.response_stream import ResponseStreamOverflow, ResponseStreams
+
+
+def created(response_id: str) -> dict:
+    return {"type": "response.created", "response": {"id": response_id, "status": "in_progress"}}
+
+
+def done(response_id: str) -> dict:
+    return {"type": "response.done", "response": {"id": response_id, "status": "completed"}}
+
+
+def delta(response_id: str, msg_type: str = "response.text.delta", value: str = "hi") -> dict:
+    return {"type": msg_type, "response_id": response_id, "delta": value}
+
+
+async def collect(stream) -> list:
+    return [message async for message in stream]
+
+
+async def test_next_response_is_bound_on_created():
+    streams = ResponseStreams()
+    stream = streams.open()
+    streams.handle(delta("resp_0"))
+    streams.handle(created("resp_1"))
+    streams.handle(delta("resp_1", value="a"))
+    streams.handle(created("resp_2"))
+    streams.handle(delta("resp_2"))
+    streams.handle(done("resp_1"))
+    messages = await collect(stream)
+    assert stream.response_id == "resp_1"
+    assert [message["type"] for message in messages] == ["response.text.delta", "response.done"]
+    assert stream.response == done("resp_1")["response"]
+    assert stream.closed
+    assert len(streams) == 0
+
+
+async def test_consumer_waits_for_events():
+    streams = ResponseStreams()
+    stream = streams.open("resp_1")
+    consumer = asyncio.create_task(collect(stream))
+    await asyncio.sleep(0)
+    streams.handle(delta("resp_1"))
+    await asyncio.sleep(0)
+    streams.handle(done("resp_1"))
+    assert len(await asyncio.wait_for(consumer, 1)) == 2
+
+
+async def test_overflow_error_ends_iteration():
+    streams = ResponseStreams()
+    stream = streams.open("resp_1", max_queue=2)
+    for i in range(3):
+        streams.handle(delta("resp_1", value=str(i)))
+    assert len(streams) == 0
+    with pytest.raises(ResponseStreamOverflow):
+        await collect(stream)
+    assert stream.closed
+
+
+async def test_overflow_drop_oldest_keeps_latest_and_done():
+    streams = ResponseStreams()
+    stream = streams.open("resp_1", max_queue=2, overflow="drop_oldest")
+    for i in range(5):
+        streams.handle(delta("resp_1", value=str(i)))
+    streams.handle(done("resp_1"))
+    messages = await collect(stream)
+    assert [message.get("delta") for message in messages] == ["4", None]
+    assert stream.dropped == 4
+
+
+async def test_close_discards_queue_and_unregisters():
+    streams = ResponseStreams()
+    stream = streams.open("resp_1")
+    streams.handle(delta("resp_1"))
+    stream.close()
+    assert len(streams) == 0
+    assert await collect(stream) == []
+    streams.handle(delta("resp_1"))
+    assert await collect(stream) == []
+
+
+async def test_close_wakes_waiting_consumer():
+    streams = ResponseStreams()
+    stream = streams.open()
+    consumer = asyncio.create_task(collect(stream))
+    await asyncio.sleep(0)
+    stream.close()
+    assert await asyncio.wait_for(consumer, 1) == []
+    assert len(streams) == 0
+
+
+async def test_cancelled_consumer_closes_stream():
+    streams = ResponseStreams()
+    stream = streams.open("resp_1")
+    consumer = asyncio.create_task(collect(stream))
+    await asyncio.sleep(0)
+    consumer.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consumer
+    assert stream.closed
+    assert len(streams) == 0
+
+
+async def test_reopening_response_closes_previous_subscriber():
+    streams = ResponseStreams()
+    first = streams.open("resp_1")
+    second = streams.open("resp_1")
+    assert first.closed
+    streams.handle(done("resp_1"))
+    assert len(await collect(second)) == 1
+
+
+async def test_connection_close_ends_streams_after_queued_events():
+    streams = ResponseStreams()
+    bound = streams.open("resp_1")
+    waiting = streams.open()
+    streams.handle(delta("resp_1"))
+    streams.close()
+    assert len(await collect(bound)) == 1
+    assert await collect(waiting) == []
+
+
+async def test_audio_and_text_filter_deltas():
+    streams = ResponseStreams()
+    audio = streams.open("resp_1")
+    text = streams.open("resp_2")
+    for response_id, stream in (("resp_1", audio), ("resp_2", text)):
+        streams.handle(delta(response_id, "response.audio.delta", base64.b64encode(b"\x01\x02").decode()))
+        streams.handle(delta(response_id, "response.audio_transcript.delta", "你好"))
+        streams.handle(delta(response_id, "response.text.delta", ""))
+        streams.handle(done(response_id))
+    assert [chunk async for chunk in audio.audio()] == [b"\x01\x02"]
+    assert [chunk async for chunk in text.text()] == ["你好"]
+
+
+async def test_leaving_audio_iterator_early_closes_stream():
+    streams = ResponseStreams()
+    stream = streams.open("resp_1")
+    for _ in range(2):
+        streams.handle(delta("resp_1", "response.audio.delta", "AAAA"))
+    chunks = stream.audio()
+    async for _ in chunks:
+        break
+    await chunks.aclose()
+    assert stream.closed
+    assert len(streams) == 0
+
+
+async def test_client_close_ends_response_streams(fake_server):
+    client = RTLowLevelClient(fake_server.url)
+    await client.connect()
+    stream = client.response_stream()
+    consumer = asyncio.create_task(collect(stream))
+    await client.close()
+    assert await asyncio.wait_for(consumer, 1) == []
@@ -0,0 +1,111 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import json
+
+import pytest
+
+from rtclient.models import Session, SessionCreatedMessage, SessionUpdatedMessage, SessionUpdateParams
+from rtclient.session import SessionConfigRegistry, SessionUpdater
+
+
+class _FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+def _session(**fields):
+    base = dict(
+        id="sess_1",
+        model="glm-realtime",
+        modalities={"text", "audio"},
+        instructions="",
+        voice="tongtong",
+        input_audio_format="wav",
+        output_audio_format="pcm",
+        tool_choice="auto",
+        temperature=0.8,
+        beta_fields={},
+    )
+    return Session(**{**base, **fields})
+
+
+async def _settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+async def test_update_sends_only_changed_fields():
+    client = _FakeClient()
+    updater = SessionUpdater(client)
+    updater.handle(SessionCreatedMessage(event_id="e0", session=_session()))
+    future = updater.update(SessionUpdateParams(voice="tongtong", instructions="hi"))
+    await _settle()
+    assert client.sent[0]["session"] == {"instructions": "hi"}
+    updater.handle(SessionUpdatedMessage(event_id="e1", session=_session(instructions="hi")))
+    assert (await future).instructions == "hi"
+
+
+async def test_foreign_update_ack_does_not_resolve_in_flight_update():
+    client = _FakeClient()
+    updater = SessionUpdater(client)
+    updater.handle(SessionCreatedMessage(event_id="e0", session=_session()))
+    future = updater.update(SessionUpdateParams(instructions="hi"))
+    await _settle()
+    # 其他途径发出的 session.update 先被确认
+    updater.handle(SessionUpdatedMessage(event_id="e1", session=_session(input_audio_format="pcm")))
+    assert not future.done()
+    updater.handle(
+        SessionUpdatedMessage(event_id="e2", session=_session(input_audio_format="pcm", instructions="hi"))
+    )
+    session = await future
+    assert (session.instructions, session.input_audio_format) == ("hi", "pcm")
+
+
+async def test_invalid_pending_update_fails_future():
+    updater = SessionUpdater(_FakeClient())
+    future = updater.update(SessionUpdateParams(instructions="hi"))
+    updater._pending["temperature"] = "not a number"
+    with pytest.raises(ValueError):
+        await asyncio.wait_for(future, 1)
+
+
+async def test_update_matching_in_flight_waits_for_its_ack():
+    client = _FakeClient()
+    updater = SessionUpdater(client)
+    updater.handle(SessionCreatedMessage(event_id="e0", session=_session()))
+    first = updater.update(SessionUpdateParams(instructions="hi"))
+    await _settle()
+    second = updater.update(SessionUpdateParams(instructions="hi"))
+    await _settle()
+    assert len(client.sent) == 1
+    assert not second.done()
+    updater.handle(SessionUpdatedMessage(event_id="e1", session=_session(instructions="hi")))
+    assert (await first).instructions == "hi"
+    assert (await asyncio.wait_for(second, 1)).instructions == "hi"
+
+
+def test_registry_hits_by_identity_without_revalidating(monkeypatch):
+    registry = SessionConfigRegistry()
+    config = {"instructions": "客服", "voice": "tongtong"}
+    prepared = registry.register(config, name="support")
+    monkeypatch.setattr(SessionConfigRegistry, "content_key", None)
+    assert registry.register(config, name="support") is prepared
+    assert registry.get("support") is prepared
+    monkeypatch.undo()
+    # 内容相同的新对象按内容哈希去重
+    assert registry.register(dict(config)) is prepared
+    assert len(registry) == 1
+
+
+def test_prepared_frame_generates_event_ids():
+    prepared = SessionConfigRegistry().register(SessionUpdateParams(instructions="hi"))
+    first, second = json.loads(prepared.frame()), json.loads(prepared.frame(client_timestamp=5))
+    assert first["event_id"] and first["event_id"] != second["event_id"]
+    assert second["client_timestamp"] == 5
+    assert first["session"] == {"instructions": "hi"} and first["type"] == "session.update"
+    assert json.loads(prepared.frame("evt_1"))["event_id"] == "evt_1"
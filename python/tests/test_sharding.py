@@ -0,0 +1,45 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import queue
+
+from rtclient.sharding import ShardOptions, _ShardWorker
+
+
+async def _next_event(events: queue.Queue, kind: str, timeout: float = 5.0) -> tuple:
+    loop = asyncio.get_running_loop()
+    while True:
+        event = await asyncio.wait_for(loop.run_in_executor(None, events.get), timeout)
+        if event[0] == kind:
+            return event
+
+
+async def _start_worker(url: str):
+    commands, events = queue.Queue(), queue.Queue()
+    worker = _ShardWorker(0, ShardOptions(url=url, metrics_interval=60), commands, events)
+    task = asyncio.create_task(worker.run())
+    await _next_event(events, "ready")
+    return worker, task, commands, events
+
+
+async def test_cancel_closes_session_opened_after_timeout(fake_server):
+    worker, task, commands, events = await _start_worker(fake_server.url)
+    commands.put(("open", "1", "s1", None))
+    assert (await _next_event(events, "opened"))[4] is None
+    # 管理进程已经超时放弃，建连结果晚到
+    commands.put(("cancel", "1", "s1"))
+    assert (await _next_event(events, "closed"))[2] == "s1"
+    assert worker._manager.get("s1") is None
+    commands.put(("stop", 1))
+    await asyncio.wait_for(task, 5)
+
+
+async def test_cancel_before_open_completes_leaves_no_session(fake_server):
+    worker, task, commands, events = await _start_worker(fake_server.url)
+    commands.put(("open", "1", "s1", None))
+    commands.put(("cancel", "1", "s1"))
+    commands.put(("stop", 1))
+    await asyncio.wait_for(task, 5)
+    assert len(worker._manager) == 0
+    assert not worker._opening
@@ -0,0 +1,102 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import warnings
+
+import pytest
+
+np = pytest.importorskip("numpy")
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    audioop = pytest.importorskip("audioop")
+
+from rtclient.audio_stream import PcmFormat  # noqa: E402
+from rtclient.telephony import TELEPHONY_FORMAT, Resampler, TelephonyBridge, g711_decode, g711_encode  # noqa: E402
+
+CODECS = {"pcmu": (audioop.ulaw2lin, audioop.lin2ulaw), "pcma": (audioop.alaw2lin, audioop.lin2alaw)}
+
+
+def tone(rate: int, seconds: float = 1.0, frequency: float = 440, amplitude: float = 8000):
+    return (amplitude * np.sin(2 * np.pi * frequency * np.arange(int(rate * seconds)) / rate)).astype(np.int16)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_g711_decode_matches_audioop(codec):
+    decode, _ = CODECS[codec]
+    payload = bytes(range(256))
+    assert g711_decode(payload, codec).tobytes() == decode(payload, 2)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_g711_encode_matches_audioop_for_every_sample(codec):
+    _, encode = CODECS[codec]
+    pcm = np.arange(-32768, 32768, dtype=np.int16)
+    assert g711_encode(pcm, codec) == encode(pcm.tobytes(), 2)
+    assert g711_encode(pcm.tobytes(), codec) == encode(pcm.tobytes(), 2)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_g711_round_trip_is_stable(codec):
+    # μ-law 的 0x7F 和 0xFF 都解码为 0，比较解码后的采样值
+    decoded = g711_decode(bytes(range(256)), codec)
+    np.testing.assert_array_equal(g711_decode(g711_encode(decoded, codec), codec), decoded)
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        g711_decode(b"\x00", "g729")
+
+
+@pytest.mark.parametrize(
+    "in_rate, out_rate", [(8000, 16000), (8000, 24000), (16000, 8000), (24000, 8000), (44100, 8000)]
+)
+def test_resampler_matches_audioop_ratecv(in_rate, out_rate):
+    samples = tone(in_rate)
+    resampler = Resampler(in_rate, out_rate)
+    output = resampler.process(samples)
+    reference, _ = audioop.ratecv(samples.tobytes(), 2, 1, in_rate, out_rate, None)
+    reference = np.frombuffer(reference, dtype=np.int16)
+    assert abs(len(output) - len(reference)) <= 2
+    # audioop 没有群延迟，按 delay 对齐后比较，跳过两端的滤波器暂态
+    index = np.arange(500, len(reference) - 500)
+    aligned = np.interp(index + resampler.delay, np.arange(len(output)), output)
+    rms = np.sqrt(np.mean((aligned - reference[index]) ** 2))
+    assert rms < 0.02 * 8000 / np.sqrt(2)
+
+
+def test_resampler_chunks_match_whole_signal():
+    samples = tone(8000)
+    whole = Resampler(8000, 24000).process(samples)
+    resampler = Resampler(8000, 24000)
+    sizes = [160, 1, 37, 160, 0, 999]
+    chunks, start = [], 0
+    for size in sizes:
+        chunks.append(resampler.process(samples[start:start + size]))
+        start += size
+    chunks.append(resampler.process(samples[start:]))
+    np.testing.assert_allclose(np.concatenate(chunks), whole, atol=1e-2)
+
+
+def test_resampler_reset_clears_history():
+    resampler = Resampler(16000, 8000)
+    first = resampler.process(tone(16000, 0.1))
+    resampler.process(tone(16000, 0.05, frequency=1000))
+    resampler.reset()
+    np.testing.assert_array_equal(resampler.process(tone(16000, 0.1)), first)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_bridge_round_trip_through_audioop(codec):
+    decode, encode = CODECS[codec]
+    bridge = TelephonyBridge(object(), output_format=TELEPHONY_FORMAT, codec=codec, input_format=TELEPHONY_FORMAT)
+    payload = encode(tone(8000, 0.02).tobytes(), 2)
+    # 采样率相同时不做重采样，结果与 audioop 逐字节一致
+    assert bridge.decode_inbound(payload) == decode(payload, 2)
+    frames = bridge.encode_outbound(decode(payload, 2)[:-1])
+    assert frames == []
+    assert bridge.encode_outbound(decode(payload, 2)[-1:]) == [payload]
+
+
+def test_bridge_rejects_stereo():
+    with pytest.raises(ValueError):
+        TelephonyBridge(object(), output_format=PcmFormat(channels=2))
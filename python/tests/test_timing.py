@@ -0,0 +1,140 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import base64
+import time
+
+import pytest
+
+from rtclient.audio_stream import AudioChunker, PcmFormat
+from rtclient.fast_messages import audio_append
+from rtclient.timing import Clock, LatencyTracker, stamp
+
+
+class FakeClock(Clock):
+    def __init__(self, start: float = 1000.0):
+        self.value = start
+
+    def now(self) -> float:
+        return self.value
+
+
+def pcm_append(duration_ms: float, pcm_format: PcmFormat = PcmFormat()) -> dict:
+    audio = base64.b64encode(bytes(pcm_format.chunk_bytes(duration_ms))).decode("ascii")
+    return {"type": "input_audio_buffer.append", "audio": audio}
+
+
+def test_clock_is_wall_time_advancing_monotonically(monkeypatch):
+    clock = Clock()
+    assert clock.now() == pytest.approx(time.time(), abs=0.1)
+    before = clock.now_ms()
+    # 墙上时间被校时回拨不影响时钟
+    monkeypatch.setattr(time, "time", lambda: 0.0)
+    assert clock.now_ms() >= before
+
+
+def test_stamp_fills_missing_timestamp_only():
+    clock = FakeClock(12.345)
+    message = {"type": "response.create"}
+    stamped = stamp(message, clock)
+    assert stamped["client_timestamp"] == 12345
+    assert "client_timestamp" not in message
+    assert stamp({"client_timestamp": 1}, clock)["client_timestamp"] == 1
+    assert stamp(audio_append("AAAA"), clock).client_timestamp == 12345
+
+
+def test_audio_position_counts_pcm_and_wav_appends():
+    tracker = LatencyTracker(clock=FakeClock())
+    tracker.on_send(pcm_append(100))
+    assert tracker.audio_position_ms == pytest.approx(100)
+    # 带文件头的片段按文件头中的格式计算，不计 44 字节的文件头
+    chunker = AudioChunker(PcmFormat(sample_rate=8000), chunk_ms=50)
+    tracker.on_send(audio_append(chunker.encode(bytes(chunker.chunk_bytes))))
+    assert tracker.audio_position_ms == pytest.approx(150)
+    tracker.on_send({"type": "input_audio_buffer.append", "audio": ""})
+    assert tracker.audio_position_ms == pytest.approx(150)
+
+
+def test_sent_at_finds_chunk_containing_position():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    for _ in range(3):
+        tracker.on_send(pcm_append(100))
+        clock.value += 0.1
+    assert tracker.sent_at(50) == pytest.approx(1000.0)
+    assert tracker.sent_at(100) == pytest.approx(1000.0)
+    assert tracker.sent_at(250) == pytest.approx(1000.2)
+    assert tracker.sent_at(301) is None
+
+
+def test_rtt_is_window_minimum():
+    tracker = LatencyTracker(rtt_window=2)
+    assert tracker.rtt is None
+    for rtt in (0.01, 0.05, 0.03):
+        tracker.add_rtt(rtt)
+    assert tracker.rtt == pytest.approx(0.03)
+
+
+def test_vad_turn_breakdown_sums_to_total():
+    clock = FakeClock()
+    turns = []
+    tracker = LatencyTracker(clock=clock, on_turn=turns.append)
+    tracker.add_rtt(0.04)
+    for _ in range(10):
+        tracker.on_send(pcm_append(100))
+        clock.value += 0.1
+    # 说话在第 5 片（1000.4 发出）中结束，服务端在 1001.0 判定，1001.3 收到首个增量
+    tracker.handle({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": 450, "item_id": "item_1"})
+    tracker.handle({"type": "response.created", "response": {"id": "resp_1"}})
+    clock.value += 0.3
+    tracker.handle({"type": "response.audio.delta", "response_id": "resp_1"})
+    turn = turns[0]
+    assert (turn.response_id, turn.item_id, turn.audio_end_ms) == ("resp_1", "item_1", 450)
+    assert turn.total_ms == pytest.approx(900)
+    assert turn.upload_ms == turn.download_ms == pytest.approx(20)
+    assert turn.vad_ms == pytest.approx(560)
+    assert turn.model_ms == pytest.approx(300)
+    assert turn.upload_ms + turn.vad_ms + turn.model_ms + turn.download_ms == pytest.approx(turn.total_ms)
+    assert turn.rtt_ms == pytest.approx(40)
+    # 同一响应后续的增量不再计入
+    tracker.handle({"type": "response.audio.delta", "response_id": "resp_1"})
+    assert len(tracker.turns) == 1
+
+
+def test_manual_turn_is_anchored_at_commit():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    tracker.on_send({"type": "input_audio_buffer.commit"})
+    clock.value += 0.05
+    tracker.handle({"type": "response.created", "response": {"id": "resp_1"}})
+    clock.value += 0.15
+    tracker.handle({"type": "response.text.delta", "response_id": "resp_1"})
+    turn = tracker.turns[0]
+    assert turn.total_ms == pytest.approx(200)
+    assert (turn.upload_ms, turn.vad_ms, turn.download_ms) == (0, 0, 0)
+    assert turn.model_ms == pytest.approx(200)
+    assert turn.rtt_ms is None
+
+
+def test_cancelled_response_is_forgotten():
+    tracker = LatencyTracker(clock=FakeClock())
+    tracker.on_send({"type": "response.create"})
+    tracker.handle({"type": "response.created", "response": {"id": "resp_1"}})
+    tracker.handle({"type": "response.done", "response": {"id": "resp_1"}})
+    tracker.handle({"type": "response.audio.delta", "response_id": "resp_1"})
+    assert not tracker.turns
+
+
+def test_stats_percentiles():
+    clock = FakeClock()
+    tracker = LatencyTracker(clock=clock)
+    assert tracker.stats()["total_p50_ms"] is None
+    for i in range(10):
+        tracker.on_send({"type": "response.create"})
+        tracker.handle({"type": "response.created", "response": {"id": f"resp_{i}"}})
+        clock.value += (i + 1) / 1000
+        tracker.handle({"type": "response.text.delta", "response_id": f"resp_{i}"})
+    stats = tracker.stats()
+    assert stats["turns"] == 10
+    assert stats["total_p50_ms"] == pytest.approx(6)
+    assert stats["total_p90_ms"] == pytest.approx(10)
@@ -0,0 +1,56 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+import base64
+import json
+
+from rtclient.util.token import TokenProvider
+
+
+def _payload(token: str) -> dict:
+    part = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)))
+
+
+def test_token_is_cached_until_refresh_margin():
+    now = [1000.0]
+    provider = TokenProvider("id.secret", ttl=600, refresh_margin=60, clock=lambda: now[0])
+    token = provider.get_token()
+    assert _payload(token)["api_key"] == "id"
+    now[0] += 500
+    assert provider.get_token() == token
+    now[0] += 50
+    assert provider.get_token() != token
+    assert provider.signed == 2
+
+
+async def test_refresh_task_is_reference_counted():
+    provider = TokenProvider("id.secret")
+    provider.start()
+    provider.start()
+    await provider.stop()
+    assert provider.running
+    await provider.stop()
+    assert not provider.running
+    assert not provider._refresh_tasks
+
+
+def test_refresh_restarts_on_new_event_loop():
+    provider = TokenProvider("id.secret")
+
+    async def start():
+        provider.start()
+        return provider.running
+
+    # 第一个事件循环关闭时没有调用 stop()
+    assert asyncio.run(start())
+
+    async def restart():
+        provider.start()
+        running = provider.running
+        await provider.stop()
+        return running
+
+    assert asyncio.run(restart())
+    assert not provider._refresh_tasks
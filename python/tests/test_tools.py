@@ -0,0 +1,137 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+
+from rtclient.models import Response, ResponseDoneMessage, ResponseFunctionCallArgumentsDoneMessage
+from rtclient.tools import ToolDispatcher, ToolResultCache
+
+
+class _FakeClient:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, message):
+        if self.fail:
+            raise ConnectionResetError("closed")
+        self.sent.append(message)
+
+
+def _call(response_id="resp_1", call_id="call_1"):
+    return ResponseFunctionCallArgumentsDoneMessage(
+        event_id="e1",
+        response_id=response_id,
+        item_id="item_1",
+        output_index=0,
+        call_id=call_id,
+        name="add",
+        arguments='{"a": 1, "b": 2}',
+    )
+
+
+def _done(response_id="resp_1", status="completed"):
+    return ResponseDoneMessage(event_id="e2", response=Response(id=response_id, status=status, output=[]))
+
+
+async def test_output_then_response_create_after_done():
+    client = _FakeClient()
+    dispatcher = ToolDispatcher(client)
+    dispatcher.register("add", lambda a, b: a + b, executor="inline")
+    dispatcher.handle(_call())
+    dispatcher.handle(_done())
+    await dispatcher.wait()
+    assert [message.type for message in client.sent] == ["conversation.item.create", "response.create"]
+    assert client.sent[0].item.output == "3"
+    assert not dispatcher._responses
+
+
+async def test_send_failure_is_reported_and_evicted():
+    errors = []
+    dispatcher = ToolDispatcher(_FakeClient(fail=True), on_error=lambda error, message: errors.append(error))
+    dispatcher.register("add", lambda a, b: a + b, executor="inline")
+    dispatcher.handle(_call())
+    await dispatcher.wait()
+    assert len(errors) == 1 and isinstance(errors[0], ConnectionResetError)
+    assert not dispatcher._responses
+
+
+async def test_cancelled_response_is_not_continued():
+    client = _FakeClient()
+    dispatcher = ToolDispatcher(client)
+    started = asyncio.Event()
+
+    async def slow_add(a, b):
+        started.set()
+        await asyncio.sleep(0.01)
+        return a + b
+
+    dispatcher.register("add", slow_add)
+    dispatcher.handle(_call())
+    await started.wait()
+    dispatcher.handle(_done(status="cancelled"))
+    assert not dispatcher._responses
+    await dispatcher.wait()
+    assert [message.type for message in client.sent] == ["conversation.item.create"]
+
+
+async def test_cancel_before_call_starts():
+    client = _FakeClient()
+    dispatcher = ToolDispatcher(client)
+    dispatcher.register("add", lambda a, b: a + b, executor="inline")
+    task = dispatcher.handle(_call())
+    dispatcher.handle(_done(status="cancelled"))
+    await dispatcher.wait()
+    assert task.exception() is None
+    assert client.sent == []
+    assert not dispatcher._responses
+
+
+async def test_send_failure_is_logged_by_default(caplog):
+    dispatcher = ToolDispatcher(_FakeClient(fail=True))
+    dispatcher.register("add", lambda a, b: a + b, executor="inline")
+    dispatcher.handle(_call())
+    await dispatcher.wait()
+    assert any(record.name == "rtclient.tools" and record.exc_info for record in caplog.records)
+
+
+def test_cache_key_normalises_arguments_and_expires():
+    now = [0.0]
+    cache = ToolResultCache(max_entries=2, clock=lambda: now[0])
+    key = ToolResultCache.make_key("weather", {"city": "北京", "unit": "c"})
+    assert key == ToolResultCache.make_key("weather", {"unit": "c", "city": "北京"})
+    cache.set(key, "晴", ttl=10)
+    assert cache.get("weather", key) == "晴"
+    now[0] = 11
+    assert cache.get("weather", key) is None
+    assert cache.stats()["weather"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ToolResultCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, key, ttl=60)
+    cache.get("t", "a")
+    cache.set("c", "c", ttl=60)
+    assert (cache.get("t", "a"), cache.get("t", "b"), len(cache)) == ("a", None, 2)
+
+
+async def test_cached_tool_runs_once_and_errors_are_not_cached():
+    calls = []
+
+    def add(a, b):
+        calls.append((a, b))
+        return a + b
+
+    def broken():
+        calls.append(None)
+        raise RuntimeError("down")
+
+    dispatcher = ToolDispatcher(_FakeClient(), cache=ToolResultCache())
+    dispatcher.register("add", add, executor="inline", cache_ttl=60)
+    dispatcher.register("broken", broken, executor="inline", cache_ttl=60)
+    assert await dispatcher.call("add", '{"a": 1, "b": 2}') == "3"
+    assert await dispatcher.call("add", '{"b": 2, "a": 1}') == "3"
+    await dispatcher.call("broken", "")
+    await dispatcher.call("broken", "")
+    assert calls == [(1, 2), None, None]
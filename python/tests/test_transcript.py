@@ -0,0 +1,48 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import asyncio
+
+from rtclient.models import ResponseAudioTranscriptDeltaMessage, ResponseAudioTranscriptDoneMessage
+from rtclient.transcript import TranscriptAggregator
+
+
+def _delta(text, response_id="r1"):
+    return ResponseAudioTranscriptDeltaMessage(response_id=response_id, item_id="i1", content_index=0, delta=text)
+
+
+def _done(text, response_id="r1"):
+    return ResponseAudioTranscriptDoneMessage(response_id=response_id, item_id="i1", content_index=0, transcript=text)
+
+
+def test_deltas_are_joined_on_done():
+    transcripts = TranscriptAggregator()
+    transcripts.handle(_delta("你好"))
+    transcripts.handle(_delta("，世界"))
+    assert transcripts.get("r1", "i1") == "你好，世界"
+    event = transcripts.handle(_done("你好，世界！"))
+    assert event.final and event.text == "你好，世界！" and event.delta == "！"
+    assert transcripts.active_count == 0
+
+
+async def test_overflow_drops_partials_but_keeps_finals_and_end():
+    transcripts = TranscriptAggregator(queue_size=2)
+    events = []
+    ready = asyncio.Event()
+
+    async def consume():
+        ready.set()
+        async for event in transcripts.stream():
+            events.append(event)
+
+    consumer = asyncio.create_task(consume())
+    await ready.wait()
+    for i in range(5):
+        transcripts.handle(_delta(str(i)))
+    transcripts.handle(_done("01234"))
+    transcripts.close()
+    await asyncio.wait_for(consumer, 1)
+
+    assert transcripts.dropped_events == 3
+    assert [event.delta for event in events if not event.final] == ["0", "1"]
+    assert events[-1].final and events[-1].text == "01234"
@@ -0,0 +1,63 @@
+# Copyright (c) ZhiPu Corporation.
+# Licensed under the MIT License.
+
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+
+from rtclient import video
+from rtclient.video import FrameGate, VideoPreprocessor
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _jpeg(color, size=(64, 48)) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, "JPEG")
+    return output.getvalue()
+
+
+def test_gate_skips_unchanged_and_sends_changed_frames():
+    gate = FrameGate(threshold=0.02, max_interval_ms=1000)
+    gray = _jpeg((128, 128, 128))
+    assert gate.check(gray, now=0.0) == base64.b64encode(gray).decode()
+    assert gate.check(gray, now=0.1) is None
+    assert gate.check(_jpeg((129, 128, 128)), now=0.2) is None
+    assert gate.check(_jpeg((250, 250, 250)), now=0.3) is not None
+    assert gate.check(_jpeg((250, 250, 250)), now=1.4) is not None
+    assert gate.frames_seen == 5 and gate.frames_sent == 3
+
+
+def test_gate_warns_without_pillow(monkeypatch):
+    monkeypatch.setattr(video, "Image", None)
+    with pytest.warns(RuntimeWarning):
+        FrameGate()
+
+
+async def test_preprocessor_scales_and_keeps_order():
+    with ThreadPoolExecutor(2) as executor:
+        async with VideoPreprocessor(size=(32, 24), executor=executor, max_pending=8) as preprocessor:
+            for color in ((255, 0, 0), (0, 255, 0), (0, 0, 255)):
+                preprocessor.submit(_jpeg(color, (320, 240)))
+            preprocessor.close()
+            results = [result async for result in preprocessor]
+        # 调用方传入的 executor 不会被关闭
+        assert executor.submit(int).result() == 0
+    assert len(results) == 3
+    with Image.open(BytesIO(base64.b64decode(results[2]))) as image:
+        assert image.size == (32, 24)
+        red, green, blue = image.convert("RGB").getpixel((16, 12))
+        assert blue > 200 and red < 50
+
+
+async def test_preprocessor_close_shuts_down_own_pool():
+    with VideoPreprocessor(size=(16, 12), max_workers=1) as preprocessor:
+        encoded = await preprocessor.process(_jpeg((10, 20, 30)))
+        assert base64.b64decode(encoded)[:2] == b"\xff\xd8"
+        executor = preprocessor._executor
+    with pytest.raises(RuntimeError):
+        executor.submit(int)
+    with pytest.raises(RuntimeError):
+        preprocessor.submit(b"")